@@ -0,0 +1,41 @@
+from typing import List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import models
+from database.dataset import API_KEY_PREFIX
+
+
+async def get_dataset_size(session_maker: async_sessionmaker) -> Tuple[int, int]:
+    """Корутина для получения числа пользователей и твитов в БД."""
+
+    async with session_maker() as db:
+        result = await db.execute(
+            select(
+                select(func.coalesce(func.max(models.User.id), 0)).scalar_subquery(),
+                select(func.coalesce(func.max(models.Tweet.id), 0)).scalar_subquery(),
+            )
+        )
+        users, tweets = result.one()
+        return users, tweets
+
+
+async def get_users(session_maker: async_sessionmaker) -> List[Tuple[int, str]]:
+    """
+    Корутина для получения пар (ID пользователя, api-key) из БД.
+
+    ID синтетических пользователей сдвинуты на уже занятые, поэтому
+    api-key bench{k} не совпадает с ID k. Пользователи синтетического
+    набора идут первыми в порядке ID, то есть в порядке убывания
+    популярности, за ними - остальные, например тестовые.
+    """
+
+    async with session_maker() as db:
+        result = await db.execute(
+            select(models.UserApiKey.user_id, models.UserApiKey.api_key).order_by(
+                models.UserApiKey.api_key.startswith(API_KEY_PREFIX).desc(),
+                models.UserApiKey.user_id,
+            )
+        )
+        return [(user_id, api_key) for user_id, api_key in result]
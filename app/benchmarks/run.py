@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import (
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from benchmarks.dataset import get_dataset_size, get_users
+from common import get_async_session, get_read_session
+from config import settings
+from database import models
+from database.config import create_engine
+from database.dataset import DatasetConfig, get_popularity, seed_dataset
+from instrumentation import instrument_engine
+from routes import app
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+DEFAULT_MIX = {"feed": 50, "profile": 20, "like": 15, "follow": 10, "upload": 5}
+
+
+class BenchmarkConfig(BaseModel):
+    """Параметры нагрузки."""
+
+    concurrency: int = 10
+    requests: int = 1000
+    duration: Optional[float] = None
+    mix: Dict[str, int] = DEFAULT_MIX
+    upload_size: int = 16 * 1024
+    follow_skew: float = DatasetConfig().follow_skew
+    seed: int = 0
+
+
+class Sample(NamedTuple):
+    """Результат одного запроса."""
+
+    scenario: str
+    status_code: int
+    latency: float
+    queries: int
+
+
+class Workload:
+    """
+    Класс для выбора случайных пользователей и твитов для запросов.
+
+    users - пары (ID пользователя, api-key) из БД в порядке убывания
+    популярности, поэтому нагрузка не зависит от сдвига ID при загрузке.
+    """
+
+    def __init__(
+        self,
+        users: List[Tuple[int, str]],
+        tweets: int,
+        config: BenchmarkConfig,
+        seed: int,
+    ) -> None:
+        self.rng = random.Random(seed)
+        self.users = [user_id for user_id, _ in users]
+        self.api_keys = [api_key for _, api_key in users]
+        self.tweets = tweets
+        self.config = config
+        self.cum_weights = get_popularity(
+            DatasetConfig(users=len(users), follow_skew=config.follow_skew)
+        )
+
+    def headers(self) -> Dict[str, str]:
+        """Метод для получения заголовков случайного пользователя."""
+
+        return {"api-key": self.rng.choice(self.api_keys)}
+
+    def popular_user(self) -> int:
+        """Метод для выбора пользователя с учётом его популярности."""
+
+        return self.rng.choices(self.users, cum_weights=self.cum_weights)[0]
+
+    def tweet(self) -> int:
+        """Метод для выбора случайного твита."""
+
+        return self.rng.randint(1, self.tweets)
+
+
+async def get_feed(client: httpx.AsyncClient, workload: Workload) -> httpx.Response:
+    """Корутина для запроса ленты твитов."""
+
+    return await client.get("/api/tweets", headers=workload.headers())
+
+
+async def get_profile(client: httpx.AsyncClient, workload: Workload) -> httpx.Response:
+    """Корутина для запроса профиля пользователя."""
+
+    return await client.get(
+        f"/api/users/{workload.popular_user()}", headers=workload.headers()
+    )
+
+
+async def add_like(client: httpx.AsyncClient, workload: Workload) -> httpx.Response:
+    """Корутина для проставления лайка на твит."""
+
+    return await client.post(
+        f"/api/tweets/{workload.tweet()}/likes", headers=workload.headers()
+    )
+
+
+async def start_following(
+    client: httpx.AsyncClient, workload: Workload
+) -> httpx.Response:
+    """Корутина для подписки на пользователя."""
+
+    return await client.post(
+        f"/api/users/{workload.popular_user()}/follow", headers=workload.headers()
+    )
+
+
+async def upload_media(client: httpx.AsyncClient, workload: Workload) -> httpx.Response:
+    """Корутина для загрузки файла."""
+
+    content = workload.rng.randbytes(workload.config.upload_size)
+    return await client.post(
+        "/api/medias",
+        files={"file": ("benchmark.bin", content, "application/octet-stream")},
+        headers=workload.headers(),
+    )
+
+
+SCENARIOS: Dict[
+    str, Callable[[httpx.AsyncClient, Workload], Awaitable[httpx.Response]]
+] = {
+    "feed": get_feed,
+    "profile": get_profile,
+    "like": add_like,
+    "follow": start_following,
+    "upload": upload_media,
+}
+
+
+def percentile(latencies: Sequence[float], percent: int) -> float:
+    """Функция для получения перцентиля задержки в миллисекундах."""
+
+    if len(latencies) == 1:
+        return latencies[0] * 1000
+    return statistics.quantiles(latencies, n=100)[percent - 1] * 1000
+
+
+def make_report(samples: List[Sample], elapsed: float) -> Dict[str, Dict]:
+    """
+    Функция для подсчёта результатов по сценариям и в целом.
+
+    errors - число ответов с кодом 5xx, queries - среднее число
+    запросов к БД на HTTP-запрос по заголовку Server-Timing.
+    """
+
+    groups: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        groups.setdefault(sample.scenario, []).append(sample)
+    groups["total"] = samples
+
+    report = {}
+    for scenario, group in groups.items():
+        if not group:
+            continue
+        latencies = [sample.latency for sample in group]
+        report[scenario] = {
+            "requests": len(group),
+            "errors": sum(sample.status_code >= 500 for sample in group),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "rps": round(len(group) / elapsed, 1),
+            "queries": round(statistics.mean(s.queries for s in group), 2),
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict]) -> None:
+    """Функция для вывода результатов в виде таблицы."""
+
+    columns = ["requests", "errors", "p50_ms", "p95_ms", "p99_ms", "rps", "queries"]
+    print(f"{'scenario':<10}" + "".join(f"{column:>10}" for column in columns))
+    for scenario, row in report.items():
+        print(f"{scenario:<10}" + "".join(f"{row[column]:>10}" for column in columns))
+
+
+async def run_benchmark(
+    app: FastAPI, session_maker: async_sessionmaker, config: BenchmarkConfig
+) -> Dict[str, Dict]:
+    """
+    Корутина для нагрузки приложения конкурентными клиентами.
+
+    Приложение вызывается напрямую через ASGI без сети и без событий
+    startup/shutdown, поэтому копии изображений не создаются.
+    """
+
+    async def override_get_async_session() -> AsyncGenerator:
+        async with session_maker.begin() as session:
+            yield session
+
+    users = await get_users(session_maker)
+    _, tweets = await get_dataset_size(session_maker)
+    scenarios = list(config.mix)
+    weights = [config.mix[scenario] for scenario in scenarios]
+    samples: List[Sample] = []
+    remaining = config.requests
+    start = time.perf_counter()
+    deadline = start + config.duration if config.duration else None
+
+    async def worker(client: httpx.AsyncClient, seed: int) -> None:
+        nonlocal remaining
+        workload = Workload(users, tweets, config, seed)
+        while remaining > 0 and (deadline is None or time.perf_counter() < deadline):
+            remaining -= 1
+            (scenario,) = workload.rng.choices(scenarios, weights=weights)
+            request_start = time.perf_counter()
+            response = await SCENARIOS[scenario](client, workload)
+            latency = time.perf_counter() - request_start
+            match = QUERIES.search(response.headers.get("Server-Timing", ""))
+            queries = int(match[1]) if match else 0
+            samples.append(Sample(scenario, response.status_code, latency, queries))
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # type: ignore
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            await asyncio.gather(
+                *(
+                    worker(client, config.seed + number)
+                    for number in range(config.concurrency)
+                )
+            )
+    finally:
+        app.dependency_overrides = overrides
+
+    return make_report(samples, time.perf_counter() - start)
+
+
+def get_engine(db_url: str) -> AsyncEngine:
+    """Функция для создания движка БД по URL с подсчётом запросов."""
+
+    engine = create_engine(db_url)
+    instrument_engine(engine)
+    return engine
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Функция для разбора доли сценариев вида 'feed=50,profile=20'."""
+
+    mix = {}
+    for part in value.split(","):
+        scenario, weight = part.split("=")
+        if scenario not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario: {scenario}")
+        mix[scenario] = int(weight)
+    return mix
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Функция для разбора аргументов командной строки."""
+
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API микроблога.")
+    parser.add_argument("--db-url", help="по умолчанию - временная БД SQLite")
+    parser.add_argument(
+        "--no-seed", action="store_true", help="использовать БД как есть"
+    )
+    parser.add_argument("--users", type=int, default=DatasetConfig().users)
+    parser.add_argument("--avg-follows", type=int, default=DatasetConfig().avg_follows)
+    parser.add_argument(
+        "--tweets-per-user", type=int, default=DatasetConfig().tweets_per_user
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=BenchmarkConfig().concurrency
+    )
+    parser.add_argument("--requests", type=int, default=BenchmarkConfig().requests)
+    parser.add_argument("--duration", type=float, help="ограничение времени, сек")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="файл для сохранения результатов")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+    """
+    Корутина для запуска нагрузочного теста из командной строки.
+
+    Без --db-url данные создаются во временной БД SQLite, которая удаляется
+    после теста. Загруженные файлы всегда пишутся во временную директорию.
+    """
+
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="microblog_bench_") as tmp_dir:
+        db_url = args.db_url or f"sqlite+aiosqlite:///{tmp_dir}/benchmark.db"
+        engine = get_engine(db_url)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        media_dir, upload_tmp_dir = settings.MEDIA_DIR, settings.UPLOAD_TMP_DIR
+        settings.MEDIA_DIR = os.path.join(tmp_dir, "images")
+        settings.UPLOAD_TMP_DIR = os.path.join(tmp_dir, "uploads")
+        try:
+            if not args.no_seed:
+                async with engine.begin() as conn:
+                    await conn.run_sync(models.Base.metadata.create_all)
+                users, _ = await get_dataset_size(session_maker)
+                if users:
+                    raise SystemExit(f"{db_url} is not empty, use --no-seed")
+                dataset = DatasetConfig(
+                    users=args.users,
+                    avg_follows=args.avg_follows,
+                    tweets_per_user=args.tweets_per_user,
+                    seed=args.seed + DatasetConfig().seed,
+                )
+                await seed_dataset(session_maker, dataset)
+
+            config = BenchmarkConfig(
+                concurrency=args.concurrency,
+                requests=args.requests,
+                duration=args.duration,
+                mix=args.mix,
+                seed=args.seed,
+            )
+            report = await run_benchmark(app, session_maker, config)
+        finally:
+            settings.MEDIA_DIR, settings.UPLOAD_TMP_DIR = media_dir, upload_tmp_dir
+            await engine.dispose()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
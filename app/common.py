@@ -1,13 +1,38 @@
-from typing import AsyncGenerator, List, Type
+import base64
+import itertools
+import json
+import math
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
-from fastapi import Depends
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import orjson
+from fastapi import Cookie, Depends, Header, Request, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import InstrumentedAttribute
 
+import follow_graph
+import likes_buffer
 import schemas
+from config import settings
 from database import models
-from database.config import async_session
+from database.bulk import dialect_insert
+from database.config import async_session, replica_engines
 
 
 async def get_async_session() -> AsyncGenerator:
@@ -23,46 +48,622 @@ async def get_async_session() -> AsyncGenerator:
             await session.close()
 
 
+class ReplicaPool:
+    """
+    Класс для выбора реплики БД для запросов на чтение.
+
+    round_robin - реплики выбираются по очереди, least_busy - выбирается
+    реплика с наименьшим числом выданных соединений пула (при равенстве
+    - по очереди).
+    """
+
+    def __init__(self, engines: List[AsyncEngine], strategy: str) -> None:
+        self.engines = engines
+        self.session_makers = [
+            async_sessionmaker(
+                engine, expire_on_commit=False, autocommit=False, autoflush=False
+            )
+            for engine in engines
+        ]
+        self.strategy = strategy
+        self.counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> async_sessionmaker:
+        """Метод для выбора фабрики сессий реплики."""
+
+        start = next(self.counter) % len(self.engines)
+        if self.strategy != "least_busy":
+            return self.session_makers[start]
+
+        order = itertools.chain(range(start, len(self.engines)), range(start))
+        index = min(order, key=lambda i: self.engines[i].pool.checkedout())  # type: ignore
+        return self.session_makers[index]
+
+
+replica_pool = ReplicaPool(replica_engines, settings.DB_REPLICA_STRATEGY)
+
+
+API_KEY_GENERATION_ID = 1
+
+
 def get_user_id_from_api_key(api_key: str) -> select:
-    """Функция для получения ID пользователя по его api-key"""
+    """
+    Функция для получения ID пользователя по его api-key
+    вместе с текущим поколением api-key.
+    """
+
+    return select(
+        select(models.UserApiKey.user_id)
+        .where(models.UserApiKey.api_key == api_key)
+        .scalar_subquery(),
+        get_api_key_generation().scalar_subquery(),
+    )
+
+
+def get_api_key_generation() -> select:
+    """Функция для получения поколения api-key."""
+
+    return select(models.ApiKeyGeneration.generation).where(
+        models.ApiKeyGeneration.id == API_KEY_GENERATION_ID
+    )
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    clock - источник времени в секундах, по умолчанию time.monotonic.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        """Метод для получения значения из кэша, None - если его нет или оно устарело."""
+
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < self.clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Метод для сохранения значения в кэш с вытеснением самой старой записи."""
+
+        self._data[key] = (value, self.clock() + self.ttl)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Метод для удаления значения из кэша."""
+
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Метод для очистки кэша."""
+
+        self._data.clear()
+
+
+class ApiKeyCache(TTLCache):
+    """
+    Кэш ID пользователей по api-key, общий для запросов процесса.
+
+    Кэш сбрасывается, когда меняется поколение api-key в БД (см.
+    invalidate_api_key). Поколение читается вместе с api-key при промахе
+    и не чаще раза в check_interval секунд при попаданиях, поэтому смена
+    или отзыв ключа вступает в силу во всех процессах не позже, чем
+    через check_interval.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        check_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(maxsize, ttl, clock)
+        self.check_interval = check_interval
+        self.generation: Optional[int] = None
+        self.checked_at: Optional[float] = None
+
+    def is_check_due(self) -> bool:
+        """Метод для проверки, что поколение api-key пора сверить с БД."""
+
+        return (
+            self.checked_at is None
+            or self.clock() - self.checked_at >= self.check_interval
+        )
+
+    def set_generation(self, generation: Optional[int]) -> None:
+        """Метод для сверки поколения api-key из БД с поколением кэша."""
+
+        generation = generation or 0
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+        self.checked_at = self.clock()
+
+    async def get_user_id(self, db: AsyncSession, api_key: str) -> Optional[int]:
+        """Метод для получения ID пользователя по api-key, None - если его нет."""
+
+        user_id = self.get(api_key)
+        if user_id is not None and self.is_check_due():
+            result = await db.execute(get_api_key_generation())
+            self.set_generation(result.scalar())
+            user_id = self.get(api_key)
+
+        if user_id is None:
+            result = await db.execute(get_user_id_from_api_key(api_key))
+            user_id, generation = result.one()
+            self.set_generation(generation)
+            if user_id is not None:
+                self.set(api_key, user_id)
+        return user_id
+
+
+api_keys_cache = ApiKeyCache(
+    settings.API_KEY_CACHE_SIZE,
+    settings.API_KEY_CACHE_TTL,
+    settings.API_KEY_CACHE_CHECK_INTERVAL,
+)
+# cookie со временем последнего изменения данных клиентом (unix time):
+LAST_WRITE_COOKIE = "last_write"
+
+
+def set_last_write(response: Response) -> None:
+    """
+    Функция для сохранения времени изменения данных в cookie клиента.
+
+    Cookie приходит с каждым следующим запросом в любой процесс приложения,
+    поэтому окно чтения из основной БД не зависит от того, какой процесс
+    принял изменение.
+    """
+
+    response.set_cookie(
+        LAST_WRITE_COOKIE,
+        repr(time.time()),
+        max_age=math.ceil(settings.DB_READ_YOUR_WRITES_WINDOW),
+        httponly=True,
+        samesite="strict",
+    )
+
+
+def wrote_recently(last_write: Optional[str]) -> bool:
+    """Функция для проверки, что клиент изменял данные в окне чтения из основной БД."""
+
+    try:
+        written_at = float(last_write)
+    except (TypeError, ValueError):
+        return False
+    return time.time() - written_at < settings.DB_READ_YOUR_WRITES_WINDOW
+
+
+async def get_read_session(
+    last_write: Optional[str] = Cookie(None, alias=LAST_WRITE_COOKIE)
+) -> AsyncGenerator:
+    """
+    Корутина для создания асинхронного генератора сессии БД для чтения.
+
+    Если заданы реплики (DB_READ_REPLICA_URLS), сессия создаётся на одной
+    из них. Клиент, изменявший данные в последние
+    DB_READ_YOUR_WRITES_WINDOW секунд (см. set_last_write), читает из
+    основной БД, чтобы видеть свои изменения несмотря на отставание реплик.
+    """
+
+    if replica_pool and not wrote_recently(last_write):
+        session_maker = replica_pool.choose()
+    else:
+        session_maker = async_session
+
+    async with session_maker() as session:
+        yield session
+
+
+async def get_current_user_id(
+    request: Request,
+    response: Response,
+    api_key: str = Header(alias="api-key"),
+    db: AsyncSession = Depends(get_async_session),
+) -> int:
+    """
+    Корутина для получения ID текущего пользователя по его api-key.
+
+    Результат кэшируется, поэтому обращение к БД происходит только
+    при первом запросе с этим api-key, после истечения API_KEY_CACHE_TTL
+    и для сверки поколения api-key раз в API_KEY_CACHE_CHECK_INTERVAL.
+    Изменяющие запросы при включенных репликах открывают для клиента
+    окно чтения из основной БД (см. get_read_session).
+    """
 
-    return select(models.UserApiKey.user_id).where(models.UserApiKey.api_key == api_key)
+    user_id = await api_keys_cache.get_user_id(db, api_key)
+    if user_id is None:
+        raise MicroblogException(
+            status_code=401,
+            error_type=PermissionError,
+            error_message="Invalid api-key",
+        )
+
+    if replica_pool and request.method not in ("GET", "HEAD"):
+        set_last_write(response)
+    return user_id
+
+
+async def invalidate_api_key(db: AsyncSession, api_key: Optional[str] = None) -> None:
+    """
+    Корутина для сброса кэша api-key при его смене или отзыве.
+
+    Вызывается в транзакции, меняющей api_keys: увеличивает поколение
+    api-key в БД, поэтому остальные процессы сбрасывают свои кэши не позже,
+    чем через API_KEY_CACHE_CHECK_INTERVAL. В текущем процессе api-key
+    удаляется из кэша сразу, без аргумента кэш очищается полностью.
+    """
+
+    table = models.ApiKeyGeneration
+    await db.execute(
+        dialect_insert(db, table)
+        .values(id=API_KEY_GENERATION_ID, generation=1)
+        .on_conflict_do_update(
+            index_elements=[table.id], set_={"generation": table.generation + 1}
+        )
+    )
+    if api_key is None:
+        api_keys_cache.clear()
+    else:
+        api_keys_cache.pop(api_key)
+
+
+def encode_cursor(date_time: datetime, tweet_id: int) -> str:
+    """Функция для формирования непрозрачного курсора по дате и ID твита."""
+
+    raw = f"{date_time.isoformat()}|{tweet_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Функция для получения даты и ID твита из курсора."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_time, tweet_id = raw.split("|")
+        return datetime.fromisoformat(date_time), int(tweet_id)
+    except ValueError:
+        raise MicroblogException(
+            status_code=400, error_type=ValueError, error_message="Invalid cursor"
+        )
+
+
+def paginate_tweets(
+    query: select,
+    limit: Optional[int],
+    cursor: Optional[str],
+    date_time_column: InstrumentedAttribute = models.Tweet.date_time,
+    tweet_id_column: InstrumentedAttribute = models.Tweet.id,
+) -> select:
+    """
+    Функция для постраничной (keyset) выборки твитов.
+
+    Твиты упорядочиваются по дате и ID, курсор указывает на последний твит
+    предыдущей страницы. Запрашивается на один твит больше лимита, чтобы
+    определить наличие следующей страницы. Вместо колонок твита можно
+    передать их копии из присоединённой таблицы, чтобы выборка шла по её
+    индексу.
+    """
+
+    query = query.order_by(date_time_column.desc(), tweet_id_column.desc())
+    if cursor is not None:
+        date_time, tweet_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                date_time_column < date_time,
+                and_(date_time_column == date_time, tweet_id_column < tweet_id),
+            )
+        )
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def get_next_cursor(
+    tweets: Sequence[Row], limit: Optional[int]
+) -> Tuple[Sequence[Row], Optional[str]]:
+    """Функция для формирования курсора следующей страницы."""
+
+    if limit is None or len(tweets) <= limit:
+        return tweets, None
+    tweets = tweets[:limit]
+    last = tweets[-1]
+    return tweets, encode_cursor(last.date_time, last.id)
+
+
+def select_tweets() -> select:
+    """
+    Функция для получения запроса твитов вместе с данными автора.
+
+    Выбираются только колонки, нужные для вывода ленты, без загрузки
+    связанных объектов ORM.
+    """
+
+    return select(
+        models.Tweet.id,
+        models.Tweet.content,
+        models.Tweet.date_time,
+        models.Tweet.author_id,
+        models.User.name.label("author_name"),
+    ).join(models.User, models.Tweet.author_id == models.User.id)
+
+
+async def get_tweets_relations(
+    tweets: Sequence[Row], db: AsyncSession
+) -> Tuple[Dict[int, list], Dict[int, list], Dict[int, list]]:
+    """
+    Корутина для получения вложений и лайкнувших пользователей твитов.
+
+    Данные загружаются двумя запросами по списку ID уже выбранных твитов,
+    поэтому число запросов не зависит от длины ленты, а запрос ленты
+    не выполняется повторно. Возвращает словари по ID твита: ссылки на вложения,
+    их уменьшенные копии и лайкнувших пользователей в виде словарей.
+    Лайки дополняются ещё не записанными операциями буфера лайков.
+    """
+
+    attachments = defaultdict(list)
+    attachment_variants = defaultdict(list)
+    likes = defaultdict(list)
+    if tweets:
+        tweet_ids = [tweet.id for tweet in tweets]
+
+        result = await db.execute(
+            select(
+                models.Attachment.tweet_id,
+                models.Attachment.link,
+                models.Attachment.variants,
+            )
+            .where(models.Attachment.tweet_id.in_(tweet_ids))
+            .order_by(models.Attachment.id)
+        )
+        for tweet_id, link, variants in result:
+            attachments[tweet_id].append(link)
+            attachment_variants[tweet_id].append(variants or {})
+
+        result = await db.execute(
+            select(models.Like.tweet_id, models.User.id, models.User.name)
+            .join(models.User, models.Like.user_id == models.User.id)
+            .where(models.Like.tweet_id.in_(tweet_ids))
+            .order_by(models.Like.id)
+        )
+        for tweet_id, user_id, name in result:
+            likes[tweet_id].append({"name": name, "user_id": user_id})
+
+        if likes_buffer.buffer is not None:
+            likes_buffer.buffer.merge(likes, tweet_ids)
+
+    return attachments, attachment_variants, likes
+
+
+async def get_tweets_info(
+    tweets: Sequence[Row], db: AsyncSession
+) -> List[schemas.Tweet]:
+    """Корутина для получения полной информации о твитах."""
+
+    attachments, attachment_variants, likes = await get_tweets_relations(tweets, db)
+    return [
+        schemas.Tweet(
+            id=tweet.id,
+            content=tweet.content,
+            attachments=attachments[tweet.id],
+            attachment_variants=attachment_variants[tweet.id],
+            author=schemas.UserShort(id=tweet.author_id, name=tweet.author_name),
+            likes=[
+                schemas.UserForLikes(id=like["user_id"], name=like["name"])
+                for like in likes[tweet.id]
+            ],
+        )
+        for tweet in tweets
+    ]
+
+
+async def get_tweets_payload(tweets: Sequence[Row], db: AsyncSession) -> List[dict]:
+    """
+    Корутина для получения полной информации о твитах без схем pydantic.
+
+    Словари собираются напрямую из строк результата в порядке полей
+    схемы schemas.Tweet, поэтому их JSON совпадает с JSON схемы.
+    """
+
+    attachments, attachment_variants, likes = await get_tweets_relations(tweets, db)
+    return [
+        {
+            "id": tweet.id,
+            "content": tweet.content,
+            "attachments": attachments[tweet.id],
+            "attachment_variants": attachment_variants[tweet.id],
+            "author": {"name": tweet.author_name, "id": tweet.author_id},
+            "likes": likes[tweet.id],
+        }
+        for tweet in tweets
+    ]
+
+
+async def get_tweets_response(
+    tweets: Sequence[Row], db: AsyncSession, next_cursor: Optional[str]
+) -> Union[schemas.ResultTweets, Response]:
+    """
+    Корутина для формирования ответа со страницей твитов.
+
+    При FEED_FAST_SERIALIZATION ответ собирается без схем pydantic.
+    """
+
+    if settings.FEED_FAST_SERIALIZATION:
+        content = {
+            "result": True,
+            "tweets": await get_tweets_payload(tweets, db),
+        }
+        if next_cursor is not None:
+            content["next_cursor"] = next_cursor
+        return Response(dump_json(content), media_type="application/json")
+
+    return schemas.ResultTweets(
+        tweets=await get_tweets_info(tweets, db), next_cursor=next_cursor
+    )
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Функция для быстрого кодирования ответа в JSON.
+
+    Результат побайтово совпадает с JSONResponse. Строки, которые orjson
+    не может закодировать (например, одиночные суррогаты), кодируются json.
+    """
+
+    try:
+        return orjson.dumps(content)
+    except orjson.JSONEncodeError:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def get_batch_results(
+    ids: Sequence[int], created: Sequence[int], found: Sequence[int]
+) -> List[schemas.BatchItemResult]:
+    """
+    Функция для формирования результатов пакетного запроса.
+
+    created - ID, для которых созданы записи, found - существующие ID.
+    """
+
+    created_ids, found_ids = set(created), set(found)
+    results = []
+    for id in ids:
+        if id in created_ids:
+            status = "created"
+        elif id in found_ids:
+            status = "exists"
+        else:
+            status = "not_found"
+        results.append(schemas.BatchItemResult(id=id, status=status))
+    return results
 
 
 async def get_follows(
-    follows_id: List[int], db: AsyncSession = Depends(get_async_session)
-) -> List:
-    """Корутина для получения списка подписок/подписчиков пользователя."""
+    db: AsyncSession,
+    user_column: InstrumentedAttribute,
+    follow_column: InstrumentedAttribute,
+    user_id: int,
+    limit: Optional[int] = None,
+) -> List[schemas.UserShort]:
+    """
+    Корутина для получения подписок/подписчиков пользователя.
+
+    user_column - колонка Follow с ID пользователя, follow_column - колонка
+    с ID подписки/подписчика. Выбираются только id и name.
+    """
 
-    follows_query = await db.execute(
-        select(models.User).where(models.User.id.in_(follows_id))
+    query = (
+        select(models.User.id, models.User.name)
+        .join(models.Follow, follow_column == models.User.id)
+        .where(user_column == user_id)
+        .order_by(models.User.id)
     )
-    follows_obj = follows_query.scalars().all()
-    return [schemas.UserShort(**jsonable_encoder(follower)) for follower in follows_obj]
+    if limit is not None:
+        query = query.limit(limit)
+
+    result = await db.execute(query)
+    return [schemas.UserShort(id=row.id, name=row.name) for row in result]
+
+
+async def get_users_short(db: AsyncSession, ids: List[int]) -> List[schemas.UserShort]:
+    """Корутина для получения id и name пользователей по ID из графа подписок."""
+
+    if not ids:
+        return []
+    result = await db.execute(
+        select(models.User.id, models.User.name)
+        .where(models.User.id.in_(ids))
+        .order_by(models.User.id)
+    )
+    return [schemas.UserShort(id=row.id, name=row.name) for row in result]
 
 
 async def get_user_info(
-    query: select, db: AsyncSession = Depends(get_async_session)
+    user_id: int,
+    db: AsyncSession = Depends(get_async_session),
+    limit: Optional[int] = None,
 ) -> schemas.ResultUser:
-    """Корутина для получения полной информации о пользователе."""
+    """
+    Корутина для получения полной информации о пользователе.
 
-    result = await db.execute(query)
-    user_obj = result.scalars().first()
+    Выполняет три запроса: пользователь со счётчиками, подписчики и подписки.
+    При заданном limit списки обрезаются, полное число берётся из счётчиков.
+    Если включен граф подписок, ID подписчиков и подписок берутся из него.
+    """
 
-    followers_id = [follow.follower_user_id for follow in user_obj.followers]
-    followers = await get_follows(followers_id, db)
+    result = await db.execute(
+        select(
+            models.User.id,
+            models.User.name,
+            models.User.follower_count,
+            models.User.following_count,
+            models.User.tweet_count,
+        ).where(models.User.id == user_id)
+    )
+    user_row = result.first()
+    if user_row is None:
+        raise MicroblogException(
+            status_code=404, error_type=ValueError, error_message="No such user"
+        )
 
-    followings_id = [follow.following_user_id for follow in user_obj.followings]
-    followings = await get_follows(followings_id, db)
+    follower_ids = follow_graph.get_followers(user_id, limit)
+    if follower_ids is not None:
+        followers = await get_users_short(db, follower_ids)
+    else:
+        followers = await get_follows(
+            db,
+            models.Follow.following_user_id,
+            models.Follow.follower_user_id,
+            user_id,
+            limit,
+        )
+    following_ids = follow_graph.get_followings(user_id, limit)
+    if following_ids is not None:
+        following = await get_users_short(db, following_ids)
+    else:
+        following = await get_follows(
+            db,
+            models.Follow.follower_user_id,
+            models.Follow.following_user_id,
+            user_id,
+            limit,
+        )
 
     user = schemas.UserFull(
-        id=user_obj.id, name=user_obj.name, followers=followers, following=followings
+        id=user_row.id,
+        name=user_row.name,
+        followers=followers,
+        following=following,
+        followers_count=user_row.follower_count,
+        following_count=user_row.following_count,
+        tweets_count=user_row.tweet_count,
     )
     return schemas.ResultUser(user=user)
 
 
 class MicroblogException(Exception):
-
     """Кастомный класс исключений для приложения."""
 
     def __init__(
@@ -1,4 +1,5 @@
 import os
+from typing import List, Literal
 
 from pydantic_settings import BaseSettings
 
@@ -8,12 +9,66 @@ class Settings(BaseSettings):
 
     APP_NAME: str = "microblog"
     TESTING: bool = False
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_KEEPALIVE: int = 5
+    SERVER_BACKLOG: int = 2048
+    SERVER_TIMEOUT: int = 30
+    SERVER_GRACEFUL_TIMEOUT: int = 30
     APP_DIR: str = os.path.dirname(__file__)
     STATIC_DIR: str = os.path.join(APP_DIR, "static")
     MEDIA_DIR: str = os.path.join(STATIC_DIR, "images")
     STATIC_PATH: str = "/static"
     MEDIA_PATH: str = os.path.join(STATIC_PATH, "images")
-    LOGGING_CONFIG_PATH: str = os.path.join(APP_DIR, "logging/logging_config.ini")
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT: int = 0
+    DB_READ_REPLICA_URLS: List[str] = []
+    DB_REPLICA_STRATEGY: Literal["round_robin", "least_busy"] = "round_robin"
+    DB_READ_YOUR_WRITES_WINDOW: float = 5
+    API_KEY_CACHE_SIZE: int = 10000
+    API_KEY_CACHE_TTL: float = 300
+    API_KEY_CACHE_CHECK_INTERVAL: float = 1
+    FEED_PAGE_SIZE: int = 20
+    FEED_MAX_PAGE_SIZE: int = 100
+    FEED_FAST_SERIALIZATION: bool = True
+    SEARCH_MAX_QUERY_LENGTH: int = 200
+    PROFILE_MAX_FOLLOWS_LIMIT: int = 1000
+    BATCH_MAX_SIZE: int = 500
+    LIKE_BUFFER_ENABLED: bool = False
+    LIKE_BUFFER_MAX_SIZE: int = 1000
+    LIKE_BUFFER_FLUSH_INTERVAL: float = 1.0
+    LIKE_BUFFER_FLUSH_TIMEOUT: float = 60
+    FOLLOW_GRAPH_ENABLED: bool = False
+    FOLLOW_GRAPH_MAX_BYTES: int = 256 * 1024 * 1024
+    FOLLOW_GRAPH_MAX_DELTA: int = 100000
+    FOLLOW_GRAPH_CHECK_INTERVAL: float = 300
+    TIMELINE_ENABLED: bool = False
+    TIMELINE_MAX_LENGTH: int = 800
+    TIMELINE_TRIM_INTERVAL: int = 50
+    TIMELINE_FANOUT_THRESHOLD: int = 5000
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024
+    UPLOAD_MAX_OVERHEAD: int = 64 * 1024
+    UPLOAD_TMP_DIR: str = os.path.join(APP_DIR, "uploads")
+    MEDIA_VARIANTS_ENABLED: bool = True
+    MEDIA_VARIANTS_WORKERS: int = 2
+    MEDIA_VARIANTS_QUALITY: int = 80
+    MEDIA_THUMBNAIL_SIZE: int = 320
+    MEDIA_WEB_SIZE: int = 1280
+    INSTRUMENTATION_ENABLED: bool = True
+    QUERY_BUDGET: int = 0
+    METRICS_ENABLED: bool = True
+    LOGGING_DIR: str = os.path.join(APP_DIR, "logging")
+    LOGGING_CONFIG_PATH: str = os.path.join(LOGGING_DIR, "logging_config.ini")
 
 
 settings = Settings()
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from database import models
+from database.config import async_session
+
+
+async def increment(
+    db: AsyncSession, column: InstrumentedAttribute, ids: Any, delta: int = 1
+) -> None:
+    """
+    Корутина для изменения счётчика на delta у записей с указанными ID.
+
+    Выполняется в транзакции запроса, поэтому счётчик меняется вместе
+    с лайком, подпиской или твитом. ids - список ID или подзапрос.
+    """
+
+    model = column.class_
+    await db.execute(
+        update(model).where(model.id.in_(ids)).values({column.key: column + delta})
+    )
+
+
+def count_likes() -> select:
+    """Функция для подсчёта лайков твита по таблице лайков."""
+
+    return (
+        select(func.count(models.Like.id))
+        .where(models.Like.tweet_id == models.Tweet.id)
+        .scalar_subquery()
+    )
+
+
+def count_followers() -> select:
+    """Функция для подсчёта подписчиков пользователя по таблице подписок."""
+
+    return (
+        select(func.count(models.Follow.id))
+        .where(models.Follow.following_user_id == models.User.id)
+        .scalar_subquery()
+    )
+
+
+def count_followings() -> select:
+    """Функция для подсчёта подписок пользователя по таблице подписок."""
+
+    return (
+        select(func.count(models.Follow.id))
+        .where(models.Follow.follower_user_id == models.User.id)
+        .scalar_subquery()
+    )
+
+
+def count_tweets() -> select:
+    """Функция для подсчёта твитов пользователя по таблице твитов."""
+
+    return (
+        select(func.count(models.Tweet.id))
+        .where(models.Tweet.author_id == models.User.id)
+        .scalar_subquery()
+    )
+
+
+async def recount_counters(db: AsyncSession, batch_size: int = 1000) -> None:
+    """
+    Корутина для пересчёта всех счётчиков по дочерним таблицам.
+
+    Записи обновляются диапазонами ID по batch_size, каждый диапазон
+    фиксируется отдельной транзакцией, чтобы не держать долгих блокировок.
+    """
+
+    for model, values in (
+        (models.Tweet, {"like_count": count_likes()}),
+        (
+            models.User,
+            {
+                "follower_count": count_followers(),
+                "following_count": count_followings(),
+                "tweet_count": count_tweets(),
+            },
+        ),
+    ):
+        result = await db.execute(select(func.max(model.id)))
+        max_id = result.scalar() or 0
+        for first_id in range(1, max_id + 1, batch_size):
+            await db.execute(
+                update(model)
+                .where(model.id.between(first_id, first_id + batch_size - 1))
+                .values(values)
+            )
+            await db.commit()
+
+
+async def main() -> None:
+    """Корутина для запуска пересчёта счётчиков из командной строки."""
+
+    async with async_session() as db:
+        await recount_counters(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+import csv
+import itertools
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import JSON, DateTime, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Insert
+
+from database import models
+
+# таблицы в порядке загрузки, чтобы внешние ключи ссылались на готовые строки:
+TABLES = [
+    models.User,
+    models.UserApiKey,
+    models.Follow,
+    models.Tweet,
+    models.Like,
+    models.Attachment,
+]
+
+
+def dialect_insert(db: AsyncSession, model: Any) -> Insert:
+    """
+    Функция для получения INSERT диалекта БД сессии.
+
+    В отличие от общего insert поддерживает on_conflict_do_nothing.
+    """
+
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def batched(rows: Iterable[Tuple], size: int) -> Iterator[List[Tuple]]:
+    """Функция-генератор для разбиения строк на пачки по size."""
+
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def get_id_tables(model: Any, columns: List[str]) -> List[Optional[str]]:
+    """
+    Функция для получения таблиц, на ID которых ссылаются колонки.
+
+    Для первичного ключа это сама таблица, для внешнего - таблица,
+    на которую он ссылается, для остальных колонок - None.
+    """
+
+    id_tables = []
+    for name in columns:
+        column = model.__table__.c[name]
+        if column.primary_key:
+            id_tables.append(model.__tablename__)
+        elif column.foreign_keys:
+            id_tables.append(next(iter(column.foreign_keys)).column.table.name)
+        else:
+            id_tables.append(None)
+    return id_tables
+
+
+async def get_id_offsets(db: AsyncSession) -> Dict[str, int]:
+    """Корутина для получения максимальных ID таблиц перед загрузкой."""
+
+    offsets = {}
+    for model in TABLES:
+        result = await db.execute(select(func.coalesce(func.max(model.id), 0)))
+        offsets[model.__tablename__] = result.scalar()
+    return offsets
+
+
+def shift_ids(
+    model: Any, columns: List[str], rows: Iterable[Tuple], offsets: Dict[str, int]
+) -> Iterator[Tuple]:
+    """
+    Функция-генератор для сдвига ID загружаемых строк на offsets.
+
+    Загружаемые данные нумеруются с 1, сдвиг на максимальные ID таблиц
+    исключает конфликты с уже существующими строками, например
+    с тестовыми пользователями.
+    """
+
+    shifts = [
+        offsets.get(table, 0) if table else 0 for table in get_id_tables(model, columns)
+    ]
+    if not any(shifts):
+        yield from rows
+        return
+    for row in rows:
+        yield tuple(
+            value + shift if shift and value is not None else value
+            for value, shift in zip(row, shifts)
+        )
+
+
+async def load_rows(
+    db: AsyncSession,
+    model: Any,
+    columns: List[str],
+    rows: Iterable[Tuple],
+    batch_size: int = 10000,
+) -> int:
+    """
+    Корутина для потоковой загрузки строк в таблицу.
+
+    В PostgreSQL строки передаются через COPY asyncpg, в остальных БД -
+    через executemany. Строки читаются пачками по batch_size, поэтому
+    расход памяти не зависит от объёма данных. Возвращает число строк.
+    """
+
+    count = 0
+    if db.bind.dialect.name == "postgresql":
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        for batch in batched(rows, batch_size):
+            await raw_connection.driver_connection.copy_records_to_table(
+                model.__tablename__, records=batch, columns=columns
+            )
+            count += len(batch)
+    else:
+        for batch in batched(rows, batch_size):
+            await db.execute(insert(model), [dict(zip(columns, row)) for row in batch])
+            count += len(batch)
+    return count
+
+
+async def reset_sequences(db: AsyncSession) -> None:
+    """
+    Корутина для сдвига последовательностей ID PostgreSQL после загрузки
+    строк с явными ID, чтобы новые записи не конфликтовали с ними.
+    """
+
+    if db.bind.dialect.name != "postgresql":
+        return
+    for model in TABLES:
+        table = model.__tablename__
+        await db.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"coalesce(max(id), 1)) FROM {table}"
+            )
+        )
+
+
+async def load_tables(
+    db: AsyncSession,
+    tables: Iterable[Tuple[Any, List[str], Iterable[Tuple]]],
+    batch_size: int = 10000,
+) -> Dict[str, int]:
+    """
+    Корутина для загрузки строк нескольких таблиц.
+
+    tables - (модель, колонки, строки) в порядке TABLES. ID строк
+    сдвигаются на максимальные ID таблиц до начала загрузки, каждая
+    таблица фиксируется отдельной транзакцией. Возвращает число строк
+    по таблицам.
+    """
+
+    offsets = await get_id_offsets(db)
+    counts = {}
+    for model, columns, rows in tables:
+        counts[model.__tablename__] = await load_rows(
+            db, model, columns, shift_ids(model, columns, rows, offsets), batch_size
+        )
+        await db.commit()
+
+    await reset_sequences(db)
+    await db.commit()
+    return counts
+
+
+def get_converter(model: Any, name: str) -> Callable[[str], Any]:
+    """Функция для получения преобразователя значения колонки из CSV."""
+
+    column_type = model.__table__.c[name].type
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat
+    if isinstance(column_type, JSON):
+        return json.loads
+    return column_type.python_type
+
+
+def read_csv(model: Any, path: str) -> Tuple[List[str], Iterator[Tuple]]:
+    """
+    Функция для чтения строк таблицы из CSV-файла с заголовком.
+
+    Заголовок содержит имена колонок, пустые значения читаются как NULL.
+    Возвращает колонки и генератор строк, файл читается по мере загрузки.
+    """
+
+    with open(path, newline="") as file:
+        columns = next(csv.reader(file))
+    converters = [get_converter(model, name) for name in columns]
+
+    def rows() -> Iterator[Tuple]:
+        with open(path, newline="") as file:
+            reader = csv.reader(file)
+            next(reader)
+            for row in reader:
+                yield tuple(
+                    convert(value) if value != "" else None
+                    for convert, value in zip(converters, row)
+                )
+
+    return columns, rows()
@@ -1,7 +1,16 @@
 from os import environ
+from typing import Any, Dict
 
 import dotenv
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from config import settings
+from instrumentation import instrument_engine
 
 dotenv.load_dotenv()
 
@@ -13,7 +22,48 @@ DB_URL = (
     f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
 )
 
-async_engine = create_async_engine(DB_URL, echo=True)
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Функция для создания движка БД по настройкам приложения.
+
+    DB_STATEMENT_CACHE_SIZE - размер кэша подготовленных выражений asyncpg,
+    DB_STATEMENT_TIMEOUT - statement_timeout сервера в мс (0 - без ограничения).
+    Оба параметра передаются только драйверу asyncpg. Для SQLite, например
+    в нагрузочном тесте, не задаётся и размер пула: aiosqlite открывает
+    соединение на каждую сессию (NullPool).
+    """
+
+    options: Dict[str, Any] = {}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if make_url(url).drivername == "postgresql+asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)
+            },
+        }
+
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        **options,
+    )
+
+
+async_engine = create_engine(DB_URL)
+instrument_engine(async_engine)
+# реплики только для чтения, см. common.get_read_session:
+replica_engines = [create_engine(url) for url in settings.DB_READ_REPLICA_URLS]
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine)
 async_session = async_sessionmaker(
     async_engine, expire_on_commit=False, autocommit=False, autoflush=False
 )
@@ -1,9 +1,17 @@
+import argparse
 import asyncio
+import os
+from typing import Optional, Sequence
 
 from sqlalchemy import select
 
-from config import async_session
-from models import Follow, User, UserApiKey
+from config import settings
+from counters import recount_counters
+from database import bulk
+from database.config import async_session
+from database.dataset import DatasetConfig, get_api_key, seed_dataset
+from database.models import Follow, User, UserApiKey
+from timelines import backfill_timelines
 
 users = [User(name=name) for name in ("Irina", "Alex", "Olga", "John")]
 
@@ -26,9 +34,20 @@ follows = [
     Follow(follower_user_id=4, following_user_id=3),
 ]
 
+# счётчики тестовых пользователей задаются сразу, без пересчёта по таблицам:
+for user_id, user in enumerate(users, start=1):
+    user.follower_count = sum(f.following_user_id == user_id for f in follows)
+    user.following_count = sum(f.follower_user_id == user_id for f in follows)
+    user.tweet_count = 0
+
 
 async def create_test_users() -> None:
-    """Корутина для создания пользователей."""
+    """
+    Корутина для создания пользователей.
+
+    Запускается при каждом старте контейнера, поэтому при уже созданных
+    пользователях ничего не пишет в БД.
+    """
 
     async with async_session.begin() as session:
         response = await session.execute(
@@ -41,5 +60,113 @@ async def create_test_users() -> None:
             )
 
 
+async def is_api_key_loaded(api_key: str) -> bool:
+    """Корутина для проверки, загружен ли уже пользователь с этим api-key."""
+
+    async with async_session() as session:
+        response = await session.execute(
+            select(UserApiKey).where(UserApiKey.api_key == api_key)
+        )
+        return response.scalars().first() is not None
+
+
+def get_first_api_key(path: str) -> Optional[str]:
+    """Функция для получения первого api-key из файла api_keys.csv."""
+
+    columns, rows = bulk.read_csv(UserApiKey, path)
+    row = next(rows, None)
+    if row is None or "api_key" not in columns:
+        return None
+    return row[columns.index("api_key")]
+
+
+async def create_synthetic_users(config: DatasetConfig, batch_size: int) -> None:
+    """
+    Корутина для загрузки синтетического набора данных.
+
+    Повторный запуск ничего не делает, если набор уже загружен.
+    """
+
+    if await is_api_key_loaded(get_api_key(1)):
+        print("Synthetic dataset is already loaded")
+        return
+
+    counts = await seed_dataset(async_session, config, batch_size)
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+
+
+async def import_csv(directory: str, batch_size: int) -> None:
+    """
+    Корутина для загрузки строк из CSV-файлов <таблица>.csv директории.
+
+    Файлы с заголовком из имён колонок загружаются в порядке внешних
+    ключей, ID в файлах нумеруются с 1 и сдвигаются на уже занятые.
+    Повторный запуск ничего не делает, если первый api-key из api_keys.csv
+    уже есть в БД.
+    """
+
+    api_keys_path = os.path.join(directory, f"{UserApiKey.__tablename__}.csv")
+    if os.path.exists(api_keys_path):
+        api_key = get_first_api_key(api_keys_path)
+        if api_key is not None and await is_api_key_loaded(api_key):
+            print("CSV data is already loaded")
+            return
+
+    tables = []
+    for model in bulk.TABLES:
+        path = os.path.join(directory, f"{model.__tablename__}.csv")
+        if os.path.exists(path):
+            tables.append((model, *bulk.read_csv(model, path)))
+
+    async with async_session() as session:
+        counts = await bulk.load_tables(session, tables, batch_size)
+        await recount_counters(session)
+        if settings.TIMELINE_ENABLED:
+            await backfill_timelines(session)
+
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Функция для разбора аргументов командной строки."""
+
+    parser = argparse.ArgumentParser(
+        description="Создание тестовых пользователей и загрузка данных."
+    )
+    parser.add_argument(
+        "--users", type=int, default=0, help="число синтетических пользователей"
+    )
+    parser.add_argument("--avg-follows", type=int, default=DatasetConfig().avg_follows)
+    parser.add_argument(
+        "--tweets-per-user", type=int, default=DatasetConfig().tweets_per_user
+    )
+    parser.add_argument("--from-dir", help="директория с CSV-файлами таблиц")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Корутина для запуска из командной строки.
+
+    Тестовые пользователи создаются всегда и первыми, поэтому их ID
+    не зависят от загружаемых данных.
+    """
+
+    args = parse_args(argv)
+    await create_test_users()
+    if args.users:
+        config = DatasetConfig(
+            users=args.users,
+            avg_follows=args.avg_follows,
+            tweets_per_user=args.tweets_per_user,
+        )
+        await create_synthetic_users(config, args.batch_size)
+    if args.from_dir:
+        await import_csv(args.from_dir, args.batch_size)
+
+
 if __name__ == "__main__":
-    asyncio.run(create_test_users())
+    asyncio.run(main())
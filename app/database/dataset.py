@@ -0,0 +1,161 @@
+import hashlib
+import itertools
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import settings
+from counters import recount_counters
+from database import bulk, models
+from timelines import backfill_timelines
+
+START_DATE = datetime(2024, 1, 1)
+API_KEY_PREFIX = "bench"
+
+
+class DatasetConfig(BaseModel):
+    """Параметры синтетического набора данных."""
+
+    users: int = 1000
+    avg_follows: int = 20
+    follow_skew: float = 1.1
+    tweets_per_user: int = 10
+    likes_per_tweet: int = 3
+    attachment_ratio: float = 0.1
+    days: int = 30
+    seed: int = 42
+
+
+def get_api_key(user_id: int) -> str:
+    """Функция для получения api-key пользователя синтетического набора."""
+
+    return f"{API_KEY_PREFIX}{user_id}"
+
+
+def get_popularity(config: DatasetConfig) -> List[float]:
+    """
+    Функция для получения накопленных весов популярности пользователей.
+
+    Популярность убывает по закону Ципфа: пользователь с ID 1 самый
+    популярный, вес пользователя k пропорционален 1 / k ** follow_skew.
+    """
+
+    weights = (
+        1 / user_id**config.follow_skew for user_id in range(1, config.users + 1)
+    )
+    return list(itertools.accumulate(weights))
+
+
+def generate_users(config: DatasetConfig) -> Iterator[Tuple[int, str]]:
+    """Функция-генератор строк таблицы users: (id, name)."""
+
+    for user_id in range(1, config.users + 1):
+        yield user_id, f"user{user_id}"
+
+
+def generate_api_keys(config: DatasetConfig) -> Iterator[Tuple[int, str, int]]:
+    """Функция-генератор строк таблицы api_keys: (id, api_key, user_id)."""
+
+    for user_id in range(1, config.users + 1):
+        yield user_id, get_api_key(user_id), user_id
+
+
+def generate_follows(config: DatasetConfig) -> Iterator[Tuple[int, int]]:
+    """
+    Функция-генератор строк таблицы follows: (follower_user_id, following_user_id).
+
+    Число подписок пользователя распределено экспоненциально вокруг
+    avg_follows, авторы выбираются по популярности, поэтому число
+    подписчиков подчиняется степенному закону.
+    """
+
+    rng = random.Random(config.seed)
+    population = range(1, config.users + 1)
+    cum_weights = get_popularity(config)
+    for follower_id in population:
+        count = min(int(rng.expovariate(1 / config.avg_follows)), config.users - 1)
+        followings = set()
+        while len(followings) < count:
+            (following_id,) = rng.choices(population, cum_weights=cum_weights)
+            if following_id != follower_id:
+                followings.add(following_id)
+        for following_id in sorted(followings):
+            yield follower_id, following_id
+
+
+def generate_tweets(config: DatasetConfig) -> Iterator[Tuple[int, str, datetime, int]]:
+    """Функция-генератор строк таблицы tweets: (id, content, date_time, author_id)."""
+
+    rng = random.Random(config.seed + 1)
+    period = timedelta(days=config.days).total_seconds()
+    tweets_count = config.users * config.tweets_per_user
+    for tweet_id in range(1, tweets_count + 1):
+        author_id = rng.randint(1, config.users)
+        date_time = START_DATE + timedelta(seconds=period * tweet_id / tweets_count)
+        yield tweet_id, f"tweet {tweet_id} by user{author_id}", date_time, author_id
+
+
+def generate_likes(config: DatasetConfig) -> Iterator[Tuple[int, int]]:
+    """Функция-генератор строк таблицы likes: (tweet_id, user_id)."""
+
+    rng = random.Random(config.seed + 2)
+    tweets_count = config.users * config.tweets_per_user
+    for tweet_id in range(1, tweets_count + 1):
+        count = min(int(rng.expovariate(1 / config.likes_per_tweet)), config.users)
+        for user_id in sorted(rng.sample(range(1, config.users + 1), count)):
+            yield tweet_id, user_id
+
+
+def generate_attachments(config: DatasetConfig) -> Iterator[Tuple[int, str, int, str]]:
+    """Функция-генератор строк таблицы attachments: (id, link, tweet_id, content_hash)."""
+
+    rng = random.Random(config.seed + 3)
+    tweets_count = config.users * config.tweets_per_user
+    attachment_id = 0
+    for tweet_id in range(1, tweets_count + 1):
+        if rng.random() < config.attachment_ratio:
+            attachment_id += 1
+            content_hash = hashlib.sha256(str(attachment_id).encode()).hexdigest()
+            link = f"{settings.MEDIA_PATH}/{content_hash[:2]}/{content_hash}.jpg"
+            yield attachment_id, link, tweet_id, content_hash
+
+
+TABLES = [
+    (models.User, ["id", "name"], generate_users),
+    (models.UserApiKey, ["id", "api_key", "user_id"], generate_api_keys),
+    (models.Follow, ["follower_user_id", "following_user_id"], generate_follows),
+    (models.Tweet, ["id", "content", "date_time", "author_id"], generate_tweets),
+    (models.Like, ["tweet_id", "user_id"], generate_likes),
+    (
+        models.Attachment,
+        ["id", "link", "tweet_id", "content_hash"],
+        generate_attachments,
+    ),
+]
+
+
+async def seed_dataset(
+    session_maker: async_sessionmaker, config: DatasetConfig, batch_size: int = 10000
+) -> Dict[str, int]:
+    """
+    Корутина для загрузки синтетического набора данных в БД.
+
+    Строки загружаются потоково (COPY в PostgreSQL), ID сдвигаются
+    на уже занятые. После загрузки пересчитываются счётчики и, если
+    включены, заполняются материализованные ленты. Возвращает число
+    строк по таблицам.
+    """
+
+    async with session_maker() as db:
+        counts = await bulk.load_tables(
+            db,
+            ((model, columns, generate(config)) for model, columns, generate in TABLES),
+            batch_size,
+        )
+        await recount_counters(db)
+        if settings.TIMELINE_ENABLED:
+            await backfill_timelines(db)
+    return counts
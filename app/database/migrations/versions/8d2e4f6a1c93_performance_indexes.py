@@ -0,0 +1,59 @@
+"""Performance indexes
+
+Revision ID: 8d2e4f6a1c93
+Revises: 3b8f1c2d9a47
+Create Date: 2026-10-18 11:03:47.219845
+
+Indexes are built with CREATE INDEX CONCURRENTLY on PostgreSQL, so the
+migration runs outside of a transaction and does not block writes. If a
+concurrent build fails, PostgreSQL leaves an INVALID index behind: drop it
+and run the migration again. Duplicate api-keys must be removed before
+the upgrade, otherwise the unique index cannot be built.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4f6a1c93'
+down_revision: Union[str, None] = '3b8f1c2d9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_tweets_author_id_date_time', 'tweets', ['author_id', 'date_time']),
+    ('ix_likes_user_id', 'likes', ['user_id']),
+    ('ix_attachments_tweet_id', 'attachments', ['tweet_id']),
+    ('ix_follows_following_user_id', 'follows', ['following_user_id']),
+]
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+        if is_postgresql:
+            op.create_index('uq_api_keys_api_key', 'api_keys', ['api_key'], unique=True, postgresql_concurrently=True)
+            op.execute(
+                'ALTER TABLE api_keys ADD CONSTRAINT uq_api_keys_api_key '
+                'UNIQUE USING INDEX uq_api_keys_api_key'
+            )
+
+    if not is_postgresql:
+        with op.batch_alter_table('api_keys') as batch_op:
+            batch_op.create_unique_constraint('uq_api_keys_api_key', ['api_key'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('api_keys') as batch_op:
+        batch_op.drop_constraint('uq_api_keys_api_key', type_='unique')
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""Api key generation
+
+Revision ID: c6e8a0b2d4f7
+Revises: a2c4e6f8b0d1
+Create Date: 2026-10-18 19:42:08.513920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e8a0b2d4f7'
+down_revision: Union[str, None] = 'a2c4e6f8b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    table = op.create_table('api_key_generation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(table, [{'id': 1, 'generation': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('api_key_generation')
@@ -0,0 +1,86 @@
+"""Tweets full-text search
+
+Revision ID: f3a5c7e9b1d2
+Revises: d7f9b1c3e5a8
+Create Date: 2026-10-18 16:05:12.734905
+
+On PostgreSQL the migration does not rewrite or lock the tweets table for
+long: a plain nullable tsvector column is added (a catalog-only change),
+a trigger keeps it up to date for new and edited tweets, existing tweets
+are backfilled in batches of BATCH_SIZE ids, each in its own transaction,
+and the GIN index is built with CREATE INDEX CONCURRENTLY. Tweets that are
+not backfilled yet are simply not found. If the concurrent build fails,
+PostgreSQL leaves an INVALID index behind: drop it and run the migration
+again. On SQLite an FTS5 table synchronized by triggers is created instead.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a5c7e9b1d2'
+down_revision: Union[str, None] = 'd7f9b1c3e5a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE tweets_fts USING fts5"
+    "(content, content='tweets', content_rowid='id')",
+    "CREATE TRIGGER tweets_fts_insert AFTER INSERT ON tweets BEGIN "
+    "INSERT INTO tweets_fts (rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER tweets_fts_delete AFTER DELETE ON tweets BEGIN "
+    "INSERT INTO tweets_fts (tweets_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER tweets_fts_update AFTER UPDATE OF content ON tweets BEGIN "
+    "INSERT INTO tweets_fts (tweets_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); "
+    "INSERT INTO tweets_fts (rowid, content) VALUES (new.id, new.content); END",
+    "INSERT INTO tweets_fts (tweets_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    # колонки нет в модели (см. SEARCH_DDL в database/models.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+        return
+
+    op.execute('ALTER TABLE tweets ADD COLUMN search_vector tsvector')
+    op.execute(
+        'CREATE TRIGGER tweets_search_vector_update '
+        'BEFORE INSERT OR UPDATE OF content ON tweets FOR EACH ROW '
+        "EXECUTE FUNCTION tsvector_update_trigger(search_vector, 'pg_catalog.simple', content)"
+    )
+
+    with op.get_context().autocommit_block():
+        max_id = op.get_bind().execute(sa.text('SELECT max(id) FROM tweets')).scalar() or 0
+        for start in range(0, max_id, BATCH_SIZE):
+            op.execute(
+                sa.text(
+                    "UPDATE tweets SET search_vector = to_tsvector('simple', content) "
+                    'WHERE id > :start AND id <= :end AND search_vector IS NULL'
+                ).bindparams(start=start, end=start + BATCH_SIZE)
+            )
+        op.create_index(
+            'ix_tweets_search_vector', 'tweets', ['search_vector'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        for name in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER tweets_fts_{name}')
+        op.execute('DROP TABLE tweets_fts')
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tweets_search_vector', table_name='tweets', postgresql_concurrently=True)
+    op.execute('DROP TRIGGER tweets_search_vector_update ON tweets')
+    op.drop_column('tweets', 'search_vector')
@@ -1,11 +1,15 @@
 from sqlalchemy import (
+    DDL,
+    JSON,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
+    event,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.decl_api import DeclarativeMeta, registry
@@ -27,17 +31,24 @@ class User(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(20), nullable=False)
+    # версии твитов и подписок пользователя, используются для ETag:
+    content_version = Column(Integer, nullable=False, default=0, server_default="0")
+    follow_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # счётчики, поддерживаются endpoint-ами и пересчитываются модулем counters:
+    follower_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+    tweet_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     # на кого он подписан:
     followings = relationship(
-        "Follow", primaryjoin="User.id==Follow.follower_user_id", lazy="selectin"
+        "Follow", primaryjoin="User.id==Follow.follower_user_id", lazy="raise"
     )
     # кто на него подписан:
     followers = relationship(
-        "Follow", primaryjoin="User.id==Follow.following_user_id", lazy="selectin"
+        "Follow", primaryjoin="User.id==Follow.following_user_id", lazy="raise"
     )
     tweets = relationship(
-        "Tweet", back_populates="author", cascade="all, delete", lazy="selectin"
+        "Tweet", back_populates="author", cascade="all, delete", lazy="raise"
     )
 
 
@@ -50,9 +61,22 @@ class UserApiKey(Base):
     api_key = Column(String)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
-    user = relationship(
-        "User", primaryjoin="UserApiKey.user_id==User.id", lazy="selectin"
-    )
+    user = relationship("User", primaryjoin="UserApiKey.user_id==User.id", lazy="raise")
+    __table_args__ = (UniqueConstraint("api_key", name="uq_api_keys_api_key"),)
+
+
+class ApiKeyGeneration(Base):
+    """
+    Модель, описывающая поколение api-key.
+
+    Единственная строка, поколение увеличивается при смене или отзыве
+    ключей, чтобы процессы приложения сбросили свои кэши api-key.
+    """
+
+    __tablename__ = "api_key_generation"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class Follow(Base):
@@ -68,7 +92,10 @@ class Follow(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
-    __table_args__ = (UniqueConstraint("follower_user_id", "following_user_id"),)
+    __table_args__ = (
+        UniqueConstraint("follower_user_id", "following_user_id"),
+        Index("ix_follows_following_user_id", "following_user_id"),
+    )
 
 
 class Tweet(Base):
@@ -80,14 +107,97 @@ class Tweet(Base):
     content = Column(Text, nullable=False)
     date_time = Column(DateTime, nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # версия лайков и вложений твита, используется для ETag:
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
-    author = relationship(
-        "User", primaryjoin="Tweet.author_id==User.id", lazy="selectin"
-    )
+    author = relationship("User", primaryjoin="Tweet.author_id==User.id", lazy="raise")
     attachments = relationship(
-        "Attachment", primaryjoin="Tweet.id==Attachment.tweet_id", lazy="selectin"
+        "Attachment", primaryjoin="Tweet.id==Attachment.tweet_id", lazy="raise"
+    )
+    likes = relationship("Like", primaryjoin="Tweet.id==Like.tweet_id", lazy="raise")
+    __table_args__ = (Index("ix_tweets_author_id_date_time", "author_id", "date_time"),)
+
+
+class TweetTag(Base):
+    """Модель, описывающая хэштег твита."""
+
+    __tablename__ = "tweet_tags"
+
+    id = Column(Integer, primary_key=True)
+    tweet_id = Column(
+        Integer, ForeignKey("tweets.id", ondelete="CASCADE"), nullable=False
+    )
+    # в нижнем регистре, без символа #:
+    tag = Column(String(100), nullable=False)
+    # дата твита, для постраничной выборки по индексу без чтения твитов:
+    date_time = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tweet_id", "tag"),
+        Index("ix_tweet_tags_tag_date_time", "tag", "date_time", "tweet_id"),
+    )
+
+
+class Mention(Base):
+    """Модель, описывающая упоминание пользователя в твите."""
+
+    __tablename__ = "mentions"
+
+    id = Column(Integer, primary_key=True)
+    tweet_id = Column(
+        Integer, ForeignKey("tweets.id", ondelete="CASCADE"), nullable=False
     )
-    likes = relationship("Like", primaryjoin="Tweet.id==Like.tweet_id", lazy="selectin")
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    date_time = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tweet_id", "user_id"),
+        Index("ix_mentions_user_id_date_time", "user_id", "date_time", "tweet_id"),
+    )
+
+
+# Полнотекстовый поиск по твитам (см. search.py). В PostgreSQL - колонка
+# tsvector, заполняемая триггером, с GIN-индексом (для существующих БД
+# создаётся миграцией без перезаписи таблицы), в SQLite - внешняя таблица
+# FTS5, синхронизируемая триггерами. В модели колонки и таблицы нет, так как
+# они разные для разных БД.
+SEARCH_CONFIG = "simple"
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE tweets ADD COLUMN search_vector tsvector",
+        "CREATE TRIGGER tweets_search_vector_update "
+        "BEFORE INSERT OR UPDATE OF content ON tweets FOR EACH ROW "
+        "EXECUTE FUNCTION tsvector_update_trigger"
+        f"(search_vector, 'pg_catalog.{SEARCH_CONFIG}', content)",
+        "CREATE INDEX ix_tweets_search_vector ON tweets USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE tweets_fts USING fts5"
+        "(content, content='tweets', content_rowid='id')",
+        "CREATE TRIGGER tweets_fts_insert AFTER INSERT ON tweets BEGIN "
+        "INSERT INTO tweets_fts (rowid, content) VALUES (new.id, new.content); END",
+        "CREATE TRIGGER tweets_fts_delete AFTER DELETE ON tweets BEGIN "
+        "INSERT INTO tweets_fts (tweets_fts, rowid, content) "
+        "VALUES ('delete', old.id, old.content); END",
+        "CREATE TRIGGER tweets_fts_update AFTER UPDATE OF content ON tweets BEGIN "
+        "INSERT INTO tweets_fts (tweets_fts, rowid, content) "
+        "VALUES ('delete', old.id, old.content); "
+        "INSERT INTO tweets_fts (rowid, content) VALUES (new.id, new.content); END",
+    ],
+}
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Tweet.__table__, "after_create", DDL(statement).execute_if(dialect=dialect)
+        )
+event.listen(
+    Tweet.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tweets_fts").execute_if(dialect="sqlite"),
+)
 
 
 class Attachment(Base):
@@ -98,6 +208,14 @@ class Attachment(Base):
     id = Column(Integer, primary_key=True)
     link = Column(String(100), nullable=False)
     tweet_id = Column(Integer, ForeignKey("tweets.id", ondelete="SET NULL"))
+    content_hash = Column(String(64))
+    # уменьшенные копии изображения, {"thumbnail": link, "web": link}:
+    variants = Column(JSON)
+
+    __table_args__ = (
+        Index("ix_attachments_tweet_id", "tweet_id"),
+        Index("ix_attachments_content_hash", "content_hash"),
+    )
 
 
 class Like(Base):
@@ -113,5 +231,31 @@ class Like(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
-    user = relationship("User", primaryjoin="Like.user_id==User.id", lazy="selectin")
-    __table_args__ = (UniqueConstraint("tweet_id", "user_id"),)
+    user = relationship("User", primaryjoin="Like.user_id==User.id", lazy="raise")
+    __table_args__ = (
+        UniqueConstraint("tweet_id", "user_id"),
+        Index("ix_likes_user_id", "user_id"),
+    )
+
+
+class TimelineEntry(Base):
+    """Модель, описывающая запись материализованной ленты пользователя."""
+
+    __tablename__ = "timeline_entries"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    tweet_id = Column(
+        Integer, ForeignKey("tweets.id", ondelete="CASCADE"), nullable=False
+    )
+    author_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    date_time = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "tweet_id"),
+        Index("ix_timeline_entries_user_id_date_time", "user_id", "date_time"),
+    )
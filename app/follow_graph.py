@@ -0,0 +1,468 @@
+import asyncio
+import bisect
+import logging
+from array import array
+from contextlib import suppress
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from database import models
+from database.config import async_session
+
+logger = logging.getLogger(__name__)
+
+# байт на смещение (array "q") и на ID в списке смежности (array "i"):
+OFFSET_SIZE = array("q").itemsize
+TARGET_SIZE = array("i").itemsize
+
+
+class Adjacency:
+    """
+    Класс для хранения одного направления графа подписок.
+
+    Списки смежности хранятся в формате CSR: ID связанных пользователей
+    всех пользователей подряд в одном отсортированном по пользователям
+    массиве targets, список пользователя u - targets[offsets[u]:offsets[u + 1]].
+    Изменения после загрузки хранятся в added/removed до перезагрузки графа.
+    """
+
+    __slots__ = ("offsets", "targets", "added", "removed")
+
+    def __init__(self, offsets: array, targets: array) -> None:
+        self.offsets = offsets
+        self.targets = targets
+        self.added: Dict[int, Set[int]] = {}
+        self.removed: Dict[int, Set[int]] = {}
+
+    def get_bounds(self, user_id: int) -> Tuple[int, int]:
+        """Метод для получения границ списка пользователя в targets."""
+
+        if 0 <= user_id < len(self.offsets) - 1:
+            return self.offsets[user_id], self.offsets[user_id + 1]
+        return 0, 0
+
+    def has_base(self, user_id: int, target: int) -> bool:
+        """Метод для проверки наличия связи в загруженной части бинарным поиском."""
+
+        start, end = self.get_bounds(user_id)
+        index = bisect.bisect_left(self.targets, target, start, end)
+        return index < end and self.targets[index] == target
+
+    def get(self, user_id: int) -> List[int]:
+        """Метод для получения отсортированного списка связанных пользователей."""
+
+        start, end = self.get_bounds(user_id)
+        base = self.targets[start:end].tolist()
+        added = self.added.get(user_id)
+        removed = self.removed.get(user_id)
+        if not added and not removed:
+            return base
+        return sorted(set(base).difference(removed or ()).union(added or ()))
+
+    def contains(self, user_id: int, target: int) -> bool:
+        """Метод для проверки наличия связи."""
+
+        if target in self.added.get(user_id, ()):
+            return True
+        if target in self.removed.get(user_id, ()):
+            return False
+        return self.has_base(user_id, target)
+
+    def add(self, user_id: int, target: int) -> None:
+        """Метод для добавления связи, которой нет."""
+
+        removed = self.removed.get(user_id)
+        if removed is not None and target in removed:
+            removed.discard(target)
+        else:
+            self.added.setdefault(user_id, set()).add(target)
+
+    def remove(self, user_id: int, target: int) -> None:
+        """Метод для удаления существующей связи."""
+
+        added = self.added.get(user_id)
+        if added is not None and target in added:
+            added.discard(target)
+        else:
+            self.removed.setdefault(user_id, set()).add(target)
+
+
+class FollowGraph:
+    """
+    Граф подписок в памяти процесса.
+
+    followings - на кого подписан пользователь, followers - кто подписан
+    на пользователя. Для сверки с БД поддерживается контрольная сумма:
+    число подписок и суммы ID подписчиков и авторов.
+    """
+
+    def __init__(
+        self,
+        followings: Adjacency,
+        followers: Adjacency,
+        checksum: Tuple[int, int, int],
+    ) -> None:
+        self.followings = followings
+        self.followers = followers
+        self.checksum = checksum
+        # число изменений после загрузки:
+        self.delta_size = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Размер массивов графа в байтах без учёта изменений после загрузки."""
+
+        return sum(
+            len(values) * values.itemsize
+            for adjacency in (self.followings, self.followers)
+            for values in (adjacency.offsets, adjacency.targets)
+        )
+
+    def get_followings(self, user_id: int) -> List[int]:
+        """Метод для получения ID авторов, на которых подписан пользователь."""
+
+        return self.followings.get(user_id)
+
+    def get_followers(self, user_id: int) -> List[int]:
+        """Метод для получения ID подписчиков пользователя."""
+
+        return self.followers.get(user_id)
+
+    def is_following(self, user_id: int, author_id: int) -> bool:
+        """Метод для проверки подписки пользователя на автора."""
+
+        return self.followings.contains(user_id, author_id)
+
+    def add(self, user_id: int, author_id: int) -> None:
+        """Метод для добавления подписки, повторное добавление ничего не меняет."""
+
+        if self.is_following(user_id, author_id):
+            return
+        self.followings.add(user_id, author_id)
+        self.followers.add(author_id, user_id)
+        count, follower_sum, following_sum = self.checksum
+        self.checksum = (count + 1, follower_sum + user_id, following_sum + author_id)
+        self.delta_size += 1
+
+    def remove(self, user_id: int, author_id: int) -> None:
+        """Метод для удаления подписки, удаление отсутствующей ничего не меняет."""
+
+        if not self.is_following(user_id, author_id):
+            return
+        self.followings.remove(user_id, author_id)
+        self.followers.remove(author_id, user_id)
+        count, follower_sum, following_sum = self.checksum
+        self.checksum = (count - 1, follower_sum - user_id, following_sum - author_id)
+        self.delta_size += 1
+
+
+def get_checksum() -> select:
+    """Функция для получения контрольной суммы подписок в БД."""
+
+    return select(
+        func.count(models.Follow.id),
+        func.coalesce(func.sum(models.Follow.follower_user_id), 0),
+        func.coalesce(func.sum(models.Follow.following_user_id), 0),
+    )
+
+
+def estimate_size(max_user_id: int, follows_count: int) -> int:
+    """Функция для оценки размера графа в байтах."""
+
+    return 2 * ((max_user_id + 2) * OFFSET_SIZE + follows_count * TARGET_SIZE)
+
+
+async def transpose(
+    offsets: array, targets: array, counts: array, batch_size: int
+) -> Adjacency:
+    """
+    Корутина для построения обратного направления графа.
+
+    counts[u + 1] - число связей, ведущих к пользователю u. Пользователи
+    обходятся по возрастанию ID, поэтому списки получаются
+    отсортированными. Каждые batch_size пользователей управление
+    возвращается циклу событий.
+    """
+
+    size = len(offsets) - 1
+    for user_id in range(size):
+        counts[user_id + 1] += counts[user_id]
+
+    positions = counts[:-1]
+    reverse = array("i", bytes(len(targets) * TARGET_SIZE))
+    for user_id in range(size):
+        for index in range(offsets[user_id], offsets[user_id + 1]):
+            target = targets[index]
+            reverse[positions[target]] = user_id
+            positions[target] += 1
+        if user_id % batch_size == 0:
+            await asyncio.sleep(0)
+    return Adjacency(counts, reverse)
+
+
+async def load_follow_graph(
+    db: AsyncSession, max_bytes: int, batch_size: int = 10000
+) -> Optional[FollowGraph]:
+    """
+    Корутина для загрузки графа подписок одним потоковым проходом по таблице.
+
+    Подписки читаются пачками по batch_size в порядке (подписчик, автор),
+    поэтому списки подписок строятся сразу отсортированными. Возвращает
+    None, если граф не помещается в max_bytes.
+    """
+
+    result = await db.execute(
+        select(
+            select(func.coalesce(func.max(models.User.id), 0)).scalar_subquery(),
+            select(func.count(models.Follow.id)).scalar_subquery(),
+        )
+    )
+    max_user_id, follows_count = result.one()
+    size = estimate_size(max_user_id, follows_count)
+    if size > max_bytes:
+        logger.warning(
+            "Follow graph needs %s bytes, more than %s, not loaded", size, max_bytes
+        )
+        return None
+
+    user_count = max_user_id + 1
+    offsets = array("q", bytes((user_count + 1) * OFFSET_SIZE))
+    counts = array("q", bytes((user_count + 1) * OFFSET_SIZE))
+    targets = array("i")
+    follower_sum = following_sum = 0
+    # подписки пользователей, созданных после чтения max_user_id, пропускаются,
+    # расхождение исправит следующая сверка с БД:
+    stream = await db.stream(
+        select(models.Follow.follower_user_id, models.Follow.following_user_id)
+        .where(
+            models.Follow.follower_user_id <= max_user_id,
+            models.Follow.following_user_id <= max_user_id,
+        )
+        .order_by(models.Follow.follower_user_id, models.Follow.following_user_id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in stream.partitions():
+        for follower_id, following_id in partition:
+            targets.append(following_id)
+            offsets[follower_id + 1] += 1
+            counts[following_id + 1] += 1
+            follower_sum += follower_id
+            following_sum += following_id
+    for user_id in range(user_count):
+        offsets[user_id + 1] += offsets[user_id]
+
+    followers = await transpose(offsets, targets, counts, batch_size)
+    return FollowGraph(
+        Adjacency(offsets, targets),
+        followers,
+        (len(targets), follower_sum, following_sum),
+    )
+
+
+class FollowGraphIndex:
+    """
+    Класс для поддержки графа подписок в актуальном состоянии.
+
+    Граф загружается в фоне после запуска и обновляется endpoint-ами
+    подписки после фиксации транзакции. Раз в FOLLOW_GRAPH_CHECK_INTERVAL секунд
+    контрольная сумма графа сверяется с БД, при расхождении (например,
+    из-за подписок в другом процессе) или при накоплении
+    FOLLOW_GRAPH_MAX_DELTA изменений граф перезагружается. Пока граф
+    перезагружается, изменения записываются в журнал и применяются к
+    новому графу.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = async_session,
+        max_bytes: int = settings.FOLLOW_GRAPH_MAX_BYTES,
+        max_delta: int = settings.FOLLOW_GRAPH_MAX_DELTA,
+        interval: float = settings.FOLLOW_GRAPH_CHECK_INTERVAL,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_bytes = max_bytes
+        self.max_delta = max_delta
+        self.interval = interval
+        self.graph: Optional[FollowGraph] = None
+        # граф не загружен, так как не помещается в max_bytes:
+        self.over_budget = False
+        self.journal: Optional[List[Tuple[bool, int, int]]] = None
+        self.reload_event = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def add(self, user_id: int, author_ids: List[int]) -> None:
+        """Метод для добавления подписок пользователя на авторов."""
+
+        for author_id in author_ids:
+            self.apply(True, user_id, author_id)
+
+    def remove(self, user_id: int, author_id: int) -> None:
+        """Метод для удаления подписки пользователя на автора."""
+
+        self.apply(False, user_id, author_id)
+
+    def apply(self, following: bool, user_id: int, author_id: int) -> None:
+        """Метод для применения изменения к графу и журналу перезагрузки."""
+
+        if self.journal is not None:
+            self.journal.append((following, user_id, author_id))
+        if self.graph is None:
+            return
+        if following:
+            self.graph.add(user_id, author_id)
+        else:
+            self.graph.remove(user_id, author_id)
+        if self.graph.delta_size >= self.max_delta:
+            self.reload_event.set()
+
+    async def reload(self) -> None:
+        """Корутина для загрузки графа из БД с применением изменений за время загрузки."""
+
+        self.journal = []
+        try:
+            async with self.session_factory() as db:
+                graph = await load_follow_graph(db, self.max_bytes)
+            if graph is not None:
+                for following, user_id, author_id in self.journal:
+                    if following:
+                        graph.add(user_id, author_id)
+                    else:
+                        graph.remove(user_id, author_id)
+                graph.delta_size = 0
+                logger.info("Follow graph loaded, %s bytes", graph.nbytes)
+            self.graph = graph
+            self.over_budget = graph is None
+        finally:
+            self.journal = None
+
+    async def check(self) -> bool:
+        """
+        Корутина для сверки графа с БД, возвращает True при совпадении.
+
+        Если граф изменился во время запроса к БД, сверка считается успешной
+        и повторяется в следующий раз. Незагруженный граф считается
+        устаревшим, если он не превышает бюджет памяти (например, при
+        запуске БД была недоступна).
+        """
+
+        if self.graph is None:
+            return self.over_budget
+        checksum = self.graph.checksum
+        async with self.session_factory() as db:
+            result = await db.execute(get_checksum())
+            db_checksum = tuple(result.one())
+        if self.graph is None or self.graph.checksum != checksum:
+            return True
+        return db_checksum == checksum
+
+    async def run(self) -> None:
+        """Корутина для периодической сверки и перезагрузки графа."""
+
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.reload_event.wait(), self.interval)
+            try:
+                if self.reload_event.is_set() or not await self.check():
+                    if self.graph is not None:
+                        logger.warning("Follow graph is out of date, reloading")
+                    self.reload_event.clear()
+                    await self.reload()
+            except Exception:
+                logger.exception("Follow graph check failed")
+
+    async def start(self) -> None:
+        """
+        Корутина для запуска загрузки графа и периодической сверки в фоне.
+
+        Запуск процесса не ждёт загрузки: пока граф не загружен, запросы
+        обслуживаются через БД. Если загрузить граф не удалось, загрузка
+        повторяется при следующей сверке.
+        """
+
+        self.reload_event.set()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Корутина для остановки периодической сверки."""
+
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+
+# больше ID не передаются в запрос списком, запрос идёт через таблицу подписок:
+MAX_QUERY_IDS = 5000
+
+index: Optional[FollowGraphIndex] = None
+
+
+def get_graph() -> Optional[FollowGraph]:
+    """Функция для получения графа подписок, None - если он выключен или не загружен."""
+
+    return index.graph if index is not None else None
+
+
+def limit_ids(ids: List[int], limit: Optional[int]) -> Optional[List[int]]:
+    """Функция для обрезки списка ID до limit, None - если он длиннее MAX_QUERY_IDS."""
+
+    ids = ids[:limit]
+    return ids if len(ids) <= MAX_QUERY_IDS else None
+
+
+def get_followings(user_id: int, limit: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Функция для получения ID авторов, на которых подписан пользователь, из графа.
+
+    None - если граф недоступен или авторов больше MAX_QUERY_IDS.
+    """
+
+    graph = get_graph()
+    return limit_ids(graph.get_followings(user_id), limit) if graph else None
+
+
+def get_followers(user_id: int, limit: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Функция для получения ID подписчиков пользователя из графа.
+
+    None - если граф недоступен или подписчиков больше MAX_QUERY_IDS.
+    """
+
+    graph = get_graph()
+    return limit_ids(graph.get_followers(user_id), limit) if graph else None
+
+
+async def start_follow_graph() -> None:
+    """Корутина для запуска загрузки графа подписок, если он включен в настройках."""
+
+    global index
+    if settings.FOLLOW_GRAPH_ENABLED and index is None:
+        index = FollowGraphIndex()
+        await index.start()
+
+
+async def stop_follow_graph() -> None:
+    """Корутина для остановки сверки графа подписок и его отключения."""
+
+    global index
+    if index is not None:
+        await index.stop()
+        index = None
+
+
+def add_follows(user_id: int, author_ids: List[int]) -> None:
+    """Функция для добавления подписок в граф после фиксации транзакции."""
+
+    if index is not None:
+        index.add(user_id, author_ids)
+
+
+def remove_follow(user_id: int, author_id: int) -> None:
+    """Функция для удаления подписки из графа после фиксации транзакции."""
+
+    if index is not None:
+        index.remove(user_id, author_id)
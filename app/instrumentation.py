@@ -0,0 +1,135 @@
+import logging
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+sys.path.append(settings.LOGGING_DIR)
+from logging_adapter import JsonAdapter
+
+logger = JsonAdapter(logging.getLogger(__name__), {})
+
+
+class RequestStats:
+    """Класс для накопления статистики запросов к БД в рамках HTTP-запроса."""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_time = 0.0
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def before_cursor_execute(conn: Any, *args: Any) -> None:
+    """Обработчик события движка перед выполнением запроса."""
+
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn: Any, *args: Any) -> None:
+    """Обработчик события движка после выполнения запроса."""
+
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def handle_error(context: Any) -> None:
+    """
+    Обработчик ошибки выполнения запроса.
+
+    after_cursor_execute при ошибке не вызывается, поэтому время начала
+    запроса удаляется здесь.
+    """
+
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Функция для подключения подсчёта запросов и их времени к движку БД."""
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+def get_server_timing(stats: RequestStats, total: float) -> str:
+    """Функция для формирования значения заголовка Server-Timing."""
+
+    return (
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+        f"total;dur={total * 1000:.2f}"
+    )
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware для учёта числа запросов к БД и их времени.
+
+    Результат добавляется в заголовок Server-Timing и в лог. Если число
+    запросов превышает QUERY_BUDGET (0 - без ограничения), запись в лог
+    делается с уровнем WARNING.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.INSTRUMENTATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = get_server_timing(stats, time.perf_counter() - start)
+                MutableHeaders(scope=message).append("Server-Timing", timing)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stats.reset(token)
+            self.log(scope, status_code, stats, time.perf_counter() - start)
+
+    @staticmethod
+    def log(scope: Scope, status_code: int, stats: RequestStats, total: float) -> None:
+        """Метод для записи в лог статистики HTTP-запроса."""
+
+        level = logging.INFO
+        if 0 < settings.QUERY_BUDGET < stats.queries:
+            level = logging.WARNING
+        logger.log(
+            level,
+            "request",
+            fields={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "queries": stats.queries,
+                "db_ms": round(stats.db_time * 1000, 2),
+                "total_ms": round(total * 1000, 2),
+            },
+        )
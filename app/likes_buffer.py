@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import suppress
+from multiprocessing.managers import BaseManager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, exists, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import counters
+import versions
+from config import settings
+from database import models
+from database.bulk import dialect_insert
+from database.config import async_session
+
+STOP_POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+class PendingLike(NamedTuple):
+    """Ожидающая записи операция: поставить (liked=True) или снять лайк."""
+
+    liked: bool
+    name: str
+
+
+class LikeStore:
+    """
+    Класс для хранения несохранённых операций с лайками.
+
+    Операции хранятся по ключу (tweet_id, user_id), новая операция над
+    ключом заменяет предыдущую, поэтому противоположные операции
+    схлопываются в последнюю, а запись в БД идемпотентна. Методы выполняются
+    под блокировкой, поэтому хранилище может разделяться процессами
+    приложения через LikeManager. Запись в БД в каждый момент ведёт только
+    один процесс, операции которого лежат в flushing до её окончания.
+    """
+
+    def __init__(
+        self, flush_timeout: float = settings.LIKE_BUFFER_FLUSH_TIMEOUT
+    ) -> None:
+        self.lock = threading.Lock()
+        self.pending: Dict[Tuple[int, int], PendingLike] = {}
+        # операции, которые записываются в БД в данный момент:
+        self.flushing: Dict[Tuple[int, int], PendingLike] = {}
+        self.flush_token: Optional[str] = None
+        self.flush_started = 0.0
+        self.flush_timeout = flush_timeout
+
+    def record(self, key: Tuple[int, int], like: PendingLike) -> int:
+        """Метод для добавления операции, возвращает число ожидающих операций."""
+
+        with self.lock:
+            self.pending[key] = like
+            return len(self.pending)
+
+    def get_ops(
+        self, keys: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], PendingLike]:
+        """Метод для получения последних несохранённых операций по ключам."""
+
+        with self.lock:
+            operations = {}
+            for key in keys:
+                like = self.pending.get(key) or self.flushing.get(key)
+                if like is not None:
+                    operations[key] = like
+            return operations
+
+    def get_tweet_ops(
+        self, tweet_ids: Iterable[int]
+    ) -> Dict[Tuple[int, int], PendingLike]:
+        """Метод для получения последних несохранённых операций над твитами."""
+
+        tweet_ids = set(tweet_ids)
+        with self.lock:
+            return {
+                key: like
+                for operations in (self.flushing, self.pending)
+                for key, like in operations.items()
+                if key[0] in tweet_ids
+            }
+
+    def take(self, token: str) -> Optional[Dict[Tuple[int, int], PendingLike]]:
+        """
+        Метод для начала записи: ожидающие операции переносятся в flushing.
+
+        Возвращает None, если запись уже ведёт другой процесс. Запись,
+        не законченная за flush_timeout секунд, считается прерванной,
+        её операции возвращаются в очередь.
+        """
+
+        with self.lock:
+            if self.flush_token is not None:
+                if time.monotonic() - self.flush_started < self.flush_timeout:
+                    return None
+                self._requeue()
+            if not self.pending:
+                return {}
+            self.flushing, self.pending = self.pending, {}
+            self.flush_token = token
+            self.flush_started = time.monotonic()
+            return dict(self.flushing)
+
+    def done(self, token: str, written: bool) -> None:
+        """Метод для окончания записи, незаписанные операции возвращаются в очередь."""
+
+        with self.lock:
+            if token != self.flush_token:
+                return
+            if not written:
+                self._requeue()
+            self.flushing = {}
+            self.flush_token = None
+
+    def _requeue(self) -> None:
+        """Метод для возврата операций из flushing, более новые операции остаются."""
+
+        for key, like in self.flushing.items():
+            self.pending.setdefault(key, like)
+        self.flushing = {}
+        self.flush_token = None
+
+
+class LikeManager(BaseManager):
+    """Менеджер процесса, хранящего общий для процессов приложения LikeStore."""
+
+
+LikeManager.register("LikeStore", LikeStore)
+
+
+class LikeBuffer:
+    """
+    Класс для отложенной записи лайков пачками.
+
+    Операции хранятся в LikeStore и записываются в БД раз
+    в LIKE_BUFFER_FLUSH_INTERVAL секунд или при накоплении
+    LIKE_BUFFER_MAX_SIZE операций. Под gunicorn хранилище общее для всех
+    процессов (см. start_shared_store), поэтому лайк и его снятие,
+    принятые разными процессами, проверяются и записываются по порядку.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = async_session,
+        max_size: int = settings.LIKE_BUFFER_MAX_SIZE,
+        interval: float = settings.LIKE_BUFFER_FLUSH_INTERVAL,
+        store: Optional[LikeStore] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.interval = interval
+        self.store = store if store is not None else LikeStore()
+        self.flush_event = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    async def get_states(
+        self, db: AsyncSession, tweet_ids: List[int], user_id: int
+    ) -> Tuple[Optional[str], Dict[int, bool]]:
+        """
+        Корутина для получения текущего состояния лайков твитов с учётом буфера.
+
+        Возвращает имя пользователя и словарь {ID твита: стоит ли лайк}
+        одним запросом, несуществующие твиты в словарь не попадают.
+        Операции буфера читаются и до запроса, и после: записанная во время
+        запроса операция могла не попасть в его результат.
+        """
+
+        keys = [(tweet_id, user_id) for tweet_id in tweet_ids]
+        operations = self.store.get_ops(keys)
+        result = await db.execute(
+            select(
+                models.Tweet.id,
+                select(models.User.name)
+                .where(models.User.id == user_id)
+                .scalar_subquery(),
+                exists().where(
+                    models.Like.tweet_id == models.Tweet.id,
+                    models.Like.user_id == user_id,
+                ),
+            ).where(models.Tweet.id.in_(tweet_ids))
+        )
+        rows = result.all()
+        operations.update(self.store.get_ops(keys))
+
+        name, states = None, {}
+        for tweet_id, name, liked in rows:
+            like = operations.get((tweet_id, user_id))
+            states[tweet_id] = like.liked if like is not None else bool(liked)
+        return name, states
+
+    async def get_state(
+        self, db: AsyncSession, tweet_id: int, user_id: int
+    ) -> Optional[Tuple[bool, str]]:
+        """
+        Корутина для получения текущего состояния лайка с учётом буфера.
+
+        Возвращает (стоит ли лайк, имя пользователя) или None, если твита нет.
+        """
+
+        name, states = await self.get_states(db, [tweet_id], user_id)
+        if tweet_id not in states:
+            return None
+        return states[tweet_id], name
+
+    def record(self, tweet_id: int, user_id: int, liked: bool, name: str) -> None:
+        """
+        Метод для добавления операции в буфер.
+
+        Операция должна быть проверена через get_state без ожиданий между
+        проверкой и записью, иначе её могут опередить другие запросы.
+        """
+
+        size = self.store.record((tweet_id, user_id), PendingLike(liked, name))
+        if size >= self.max_size:
+            self.flush_event.set()
+
+    def merge(self, likes: Dict[int, List[dict]], tweet_ids: Iterable[int]) -> None:
+        """Метод для добавления несохранённых операций к лайкам твитов из БД."""
+
+        for (tweet_id, user_id), like in self.store.get_tweet_ops(tweet_ids).items():
+            tweet_likes = [
+                item for item in likes[tweet_id] if item["user_id"] != user_id
+            ]
+            if like.liked:
+                tweet_likes.append({"name": like.name, "user_id": user_id})
+            likes[tweet_id] = tweet_likes
+
+    async def write(
+        self, db: AsyncSession, operations: Dict[Tuple[int, int], PendingLike]
+    ) -> None:
+        """
+        Корутина для записи операций двумя многострочными запросами.
+
+        Лайки на удалённые твиты пропускаются. Счётчики и версии твитов
+        обновляются по фактически вставленным и удалённым строкам, версии -
+        одним запросом на всю пачку.
+        """
+
+        likes = [key for key, like in operations.items() if like.liked]
+        unlikes = [key for key, like in operations.items() if not like.liked]
+        deltas: Counter = Counter()
+
+        if likes:
+            result = await db.execute(
+                select(models.Tweet.id).where(
+                    models.Tweet.id.in_({tweet_id for tweet_id, _ in likes})
+                )
+            )
+            existing = set(result.scalars())
+            rows = [
+                {"tweet_id": tweet_id, "user_id": user_id}
+                for tweet_id, user_id in likes
+                if tweet_id in existing
+            ]
+            if rows:
+                result = await db.execute(
+                    dialect_insert(db, models.Like)
+                    .values(rows)
+                    .on_conflict_do_nothing()
+                    .returning(models.Like.tweet_id)
+                )
+                deltas.update(result.scalars())
+
+        if unlikes:
+            result = await db.execute(
+                delete(models.Like)
+                .where(tuple_(models.Like.tweet_id, models.Like.user_id).in_(unlikes))
+                .returning(models.Like.tweet_id)
+            )
+            deltas.subtract(result.scalars())
+
+        tweet_ids_by_delta = defaultdict(list)
+        for tweet_id, delta in deltas.items():
+            if delta:
+                tweet_ids_by_delta[delta].append(tweet_id)
+        for delta, tweet_ids in tweet_ids_by_delta.items():
+            await counters.increment(db, models.Tweet.like_count, tweet_ids, delta)
+        if deltas:
+            await versions.bump_tweet_version(db, list(deltas))
+
+    async def flush(self) -> bool:
+        """
+        Корутина для записи накопленных операций в БД одной транзакцией.
+
+        При ошибке операции возвращаются в буфер и будут записаны позже.
+        Возвращает False, если запись уже ведёт другой процесс.
+        """
+
+        async with self.lock:
+            token = uuid.uuid4().hex
+            operations = self.store.take(token)
+            if not operations:
+                return operations is not None
+
+            written = False
+            try:
+                async with self.session_factory() as db:
+                    await self.write(db, operations)
+                    await db.commit()
+                written = True
+            except Exception:
+                logger.exception("Like buffer flush failed")
+            finally:
+                self.store.done(token, written)
+            return True
+
+    async def run(self) -> None:
+        """Корутина для периодической записи буфера."""
+
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.flush_event.wait(), self.interval)
+            self.flush_event.clear()
+            # запись не прерывается при остановке, её дожидается stop:
+            await asyncio.shield(self.flush())
+
+    def start(self) -> None:
+        """Метод для запуска периодической записи буфера."""
+
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Корутина для остановки периодической записи и записи остатка буфера."""
+
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        # дожидается записи, которую ведёт другой процесс, и записывает остаток:
+        while not await self.flush():
+            await asyncio.sleep(min(self.interval, STOP_POLL_INTERVAL))
+
+
+buffer: Optional[LikeBuffer] = None
+shared_store: Optional[LikeStore] = None
+
+
+def start_shared_store() -> None:
+    """
+    Функция для запуска общего для процессов приложения хранилища буфера.
+
+    Вызывается в мастер-процессе gunicorn до создания процессов приложения:
+    хранилище обслуживается потоком мастер-процесса через unix-сокет,
+    процессы приложения наследуют ссылку на него.
+    """
+
+    global shared_store
+    if not settings.LIKE_BUFFER_ENABLED or shared_store is not None:
+        return
+
+    address = os.path.join(
+        tempfile.gettempdir(), f"{settings.APP_NAME}_likes_{os.getpid()}.sock"
+    )
+    server = LikeManager(address).get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    manager = LikeManager(address)
+    manager.connect()
+    shared_store = manager.LikeStore()  # type: ignore
+
+
+def start_like_buffer() -> None:
+    """Функция для включения буфера лайков, если он включен в настройках."""
+
+    global buffer
+    if settings.LIKE_BUFFER_ENABLED and buffer is None:
+        buffer = LikeBuffer(store=shared_store)
+        buffer.start()
+
+
+async def stop_like_buffer() -> None:
+    """Корутина для записи остатка буфера лайков и его отключения."""
+
+    global buffer
+    if buffer is not None:
+        await buffer.stop()
+        buffer = None
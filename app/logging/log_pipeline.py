@@ -0,0 +1,156 @@
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import weakref
+from typing import Dict, Optional, TextIO, Union
+
+from prometheus_client import Counter
+
+# число записей по уровням, отброшенных при переполнении очереди
+# и пропущенных выборкой (SamplingFilter); метрики Prometheus, поэтому
+# при нескольких процессах суммируются по всем процессам:
+DROPPED = Counter(
+    "microblog_log_records_dropped",
+    "Log records dropped because the log queue was full.",
+    ["level"],
+)
+SAMPLED_OUT = Counter(
+    "microblog_log_records_sampled_out", "Log records skipped by sampling.", ["level"]
+)
+
+_handlers: weakref.WeakSet = weakref.WeakSet()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Фильтр для выборочной записи логов.
+
+    rates - доля сохраняемых записей по логгеру и уровню, например
+    {"uvicorn.access": {"INFO": 0.1}} сохраняет 10% записей INFO логгера
+    uvicorn.access и его потомков. Остальные записи не затрагиваются.
+    """
+
+    def __init__(self, rates: Dict[str, Dict[str, float]]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def get_rate(self, record: logging.LogRecord) -> float:
+        """Метод для получения доли сохраняемых записей для записи."""
+
+        for name, levels in self.rates.items():
+            if record.name == name or record.name.startswith(name + "."):
+                return levels.get(record.levelname, 1)
+        return 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.get_rate(record)
+        if rate >= 1 or random.random() < rate:
+            return True
+        SAMPLED_OUT.labels(record.levelname).inc()
+        return False
+
+
+class BatchQueueHandler(logging.Handler):
+    """
+    Обработчик, записывающий логи из фонового потока пачками.
+
+    Поток, который пишет в лог (например, цикл событий), только кладёт
+    запись в очередь размером maxsize. Фоновый поток форматирует записи
+    и пишет до batch_size записей одной операцией. При переполнении
+    очереди записи отбрасываются и учитываются в DROPPED - вызывающий
+    поток никогда не ждёт записи на диск.
+
+    target - путь к файлу (открывается на дозапись) или поток вывода.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, TextIO] = sys.stdout,
+        maxsize: int = 10000,
+        batch_size: int = 100,
+        sampling: Optional[Dict[str, Dict[str, float]]] = None,
+    ) -> None:
+        super().__init__()
+        self.target = target
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        if isinstance(target, str):
+            self.stream: TextIO = open(target, "a", encoding="utf-8")
+        else:
+            self.stream = target
+        if sampling:
+            self.addFilter(SamplingFilter(sampling))
+        self.start()
+        _handlers.add(self)
+
+    def start(self) -> None:
+        """Метод для создания очереди и запуска фонового потока записи."""
+
+        self.queue: queue.Queue = queue.Queue(self.maxsize)
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.labels(record.levelname).inc()
+
+    def write(self, records: list) -> None:
+        """Метод для форматирования и записи пачки записей."""
+
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + "\n")
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        try:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+        except Exception:
+            self.handleError(records[0])
+
+    def run(self) -> None:
+        """Метод фонового потока: запись очереди до получения None."""
+
+        while True:
+            records = [self.queue.get()]
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.write([record for record in records if record is not None])
+            if None in records:
+                return
+
+    def close(self) -> None:
+        """Метод для записи остатка очереди и остановки фонового потока."""
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if isinstance(self.target, str):
+            self.stream.close()
+        super().close()
+
+
+def restart_handlers() -> None:
+    """
+    Функция для перезапуска фоновых потоков в дочернем процессе.
+
+    Потоки не переживают fork (например, воркеры gunicorn с preload_app),
+    поэтому каждый процесс запускает свои.
+    """
+
+    for handler in list(_handlers):
+        handler.start()
+
+
+os.register_at_fork(after_in_child=restart_handlers)
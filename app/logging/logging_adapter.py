@@ -3,8 +3,46 @@ import logging
 
 
 class JsonAdapter(logging.LoggerAdapter):
-    """Адаптер для преобразования логов в валидную JSON-строку."""
+    """
+    Адаптер для передачи в лог дополнительных полей.
+
+    Поля из аргумента fields дописываются к сообщению в виде key=value
+    и передаются в запись лога как атрибуты, JsonFormatter выводит их
+    отдельными ключами.
+    """
 
     def process(self, message, kwargs):
-        new_message = json.dumps(message, ensure_ascii=False)[1:-1]
-        return new_message, kwargs
+        fields = kwargs.pop("fields", None)
+        if fields:
+            pairs = (f"{key}={value}" for key, value in fields.items())
+            message = " ".join((message, *pairs))
+            kwargs["extra"] = {
+                **kwargs.get("extra", {}),
+                **fields,
+                "fields": tuple(fields),
+            }
+        return message, kwargs
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматтер записи лога в JSON-строку.
+
+    Кроме времени, логгера, уровня и сообщения в строку попадают поля,
+    переданные через JsonAdapter, и traceback исключения.
+    """
+
+    def format(self, record):
+        data = {
+            "asctime": self.formatTime(record, self.datefmt),
+            "name": record.name,
+            "levelname": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key in getattr(record, "fields", ()):
+            data[key] = getattr(record, key)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
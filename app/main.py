@@ -1,12 +1,171 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from typing import Any, Dict, Optional, Sequence
+
 import uvicorn
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
 
 from config import settings
 
-if __name__ == "__main__":
-    uvicorn.run(
-        "routes:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_config=settings.LOGGING_CONFIG_PATH,
+# для классов обработчиков и форматтеров из logging_config.ini:
+sys.path.append(settings.LOGGING_DIR)
+
+APP = "routes:app"
+# задаются явно, чтобы без uvloop и httptools сервер не запускался,
+# а не переходил незаметно на asyncio и h11:
+SERVER_LOOP = "uvloop"
+SERVER_HTTP = "httptools"
+
+
+class Worker(UvicornWorker):
+    """Процесс uvicorn для gunicorn с uvloop и httptools."""
+
+    CONFIG_KWARGS = {"loop": SERVER_LOOP, "http": SERVER_HTTP}
+
+
+def get_workers() -> int:
+    """Функция для получения числа процессов: SERVER_WORKERS или число ядер."""
+
+    return settings.SERVER_WORKERS or multiprocessing.cpu_count()
+
+
+def get_max_requests() -> int:
+    """
+    Функция для получения числа запросов до перезапуска процесса.
+
+    При FOLLOW_GRAPH_ENABLED каждый новый процесс заново читает всю таблицу
+    подписок, поэтому перезапуск по числу запросов выключается (0).
+    """
+
+    return 0 if settings.FOLLOW_GRAPH_ENABLED else settings.SERVER_MAX_REQUESTS
+
+
+def prepare_metrics_dir() -> None:
+    """
+    Функция для подготовки директории метрик Prometheus в режиме нескольких процессов.
+
+    Должна вызываться до импорта prometheus_client. Директория очищается
+    при каждом запуске, чтобы не учитывать метрики прошлых процессов.
+    """
+
+    path = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), f"{settings.APP_NAME}_metrics"),
     )
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def on_starting(server: Any) -> None:
+    """Хук gunicorn до создания процессов: запуск общего буфера лайков."""
+
+    from likes_buffer import start_shared_store
+
+    start_shared_store()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """
+    Хук gunicorn после создания процесса.
+
+    Приложение импортируется в мастер-процессе (preload_app), поэтому
+    пулы соединений БД сбрасываются, чтобы процессы не делили соединения.
+    """
+
+    from database.config import async_engine, replica_engines
+
+    for engine in [async_engine, *replica_engines]:
+        engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    """Хук gunicorn для удаления метрик завершившегося процесса."""
+
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def get_options() -> Dict[str, Any]:
+    """Функция для получения настроек gunicorn."""
+
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": get_workers(),
+        "worker_class": Worker,
+        "preload_app": True,
+        "max_requests": get_max_requests(),
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "backlog": settings.SERVER_BACKLOG,
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "logconfig": settings.LOGGING_CONFIG_PATH,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+
+
+class Application(BaseApplication):
+    """Приложение gunicorn с настройками из Settings вместо командной строки."""
+
+    def __init__(self, app: str, options: Dict[str, Any]) -> None:
+        self.app = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        from gunicorn.util import import_app
+
+        return import_app(self.app)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Функция для разбора аргументов командной строки."""
+
+    parser = argparse.ArgumentParser(description="Запуск сервера микроблога.")
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        help="один процесс uvicorn с перезагрузкой при изменении кода",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Функция для запуска сервера.
+
+    По умолчанию запускается gunicorn с SERVER_WORKERS процессами uvicorn,
+    с --dev - uvicorn с перезагрузкой, как раньше.
+    """
+
+    args = parse_args(argv)
+    if args.dev:
+        uvicorn.run(
+            APP,
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            reload=True,
+            loop=SERVER_LOOP,
+            http=SERVER_HTTP,
+            log_config=settings.LOGGING_CONFIG_PATH,
+        )
+        return
+
+    prepare_metrics_dir()
+    Application(APP, get_options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import suppress
+from typing import Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image, ImageOps
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import versions
+from common import MicroblogException
+from config import settings
+from database import models
+from database.config import async_session
+from metrics import ERRORS, UPLOAD_BYTES
+
+MAX_EXTENSION_LENGTH = 10
+# сигнатуры начала файлов и расширения, под которыми такие файлы хранятся:
+SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+HEAD_SIZE = 12
+
+logger = logging.getLogger(__name__)
+
+variants_executor: Optional[ProcessPoolExecutor] = None
+# фоновые задачи создания копий по хэшу содержимого:
+variants_tasks: Dict[str, asyncio.Task] = {}
+
+
+def raise_too_large() -> None:
+    """Функция для вызова ошибки о превышении размера файла."""
+
+    raise MicroblogException(
+        status_code=413, error_type=ValueError, error_message="File is too large"
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware для ограничения размера тела запроса.
+
+    Предел - UPLOAD_MAX_SIZE плюс UPLOAD_MAX_OVERHEAD на заголовки и границы
+    multipart. Запрос с большим Content-Length отклоняется с ошибкой 413
+    до чтения тела, без Content-Length - как только прочитанная часть тела
+    превысит предел, поэтому большой файл не читается и не сохраняется
+    разборщиком multipart целиком.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_size = settings.UPLOAD_MAX_SIZE + settings.UPLOAD_MAX_OVERHEAD
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_size:
+            await self.reject(scope, receive, send)
+            return
+
+        size = 0
+        rejected = False
+        response_started = False
+
+        async def receive_wrapper() -> Message:
+            nonlocal size, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                size += len(message.get("body", b""))
+                if size > max_size:
+                    rejected = True
+                    if not response_started:
+                        await self.reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            response_started = True
+            await send(message)
+
+        await self.app(scope, receive_wrapper, send_wrapper)
+
+    @staticmethod
+    async def reject(scope: Scope, receive: Receive, send: Send) -> None:
+        """Метод для отправки ответа с ошибкой 413 в формате приложения."""
+
+        ERRORS.labels(413).inc()
+        response = JSONResponse(
+            content={
+                "result": False,
+                "error_type": ValueError.__name__,
+                "error_message": "File is too large",
+            },
+            status_code=413,
+        )
+        await response(scope, receive, send)
+
+
+def get_media_path(content_hash: str, extension: str) -> str:
+    """
+    Функция для получения пути файла относительно MEDIA_DIR.
+
+    Файлы раскладываются по двум уровням поддиректорий по первым символам
+    хэша содержимого, например ab/cd/abcd...ef.png.
+    """
+
+    return os.path.join(
+        content_hash[:2], content_hash[2:4], f"{content_hash}{extension}"
+    )
+
+
+def get_extension(head: bytes, filename: Optional[str]) -> str:
+    """
+    Функция для получения расширения файла по его содержимому.
+
+    Расширение определяется по первым HEAD_SIZE байтам файла, для других
+    типов - по типу, соответствующему расширению имени файла, поэтому
+    одинаковое содержимое с именами image.jpeg и IMAGE.JPG хранится
+    в одном файле.
+    """
+
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+
+    content_type, _ = mimetypes.guess_type(str(filename).lower())
+    extension = mimetypes.guess_extension(content_type) if content_type else None
+    if extension is None or len(extension) > MAX_EXTENSION_LENGTH:
+        return ""
+    return extension
+
+
+async def save_upload(file: UploadFile) -> Tuple[str, str]:
+    """
+    Корутина для потоковой записи загруженного файла в MEDIA_DIR.
+
+    Файл читается частями по UPLOAD_CHUNK_SIZE байт во временный файл
+    в UPLOAD_TMP_DIR с одновременным подсчетом SHA-256. Если файл с таким
+    содержимым уже есть, временный файл удаляется, иначе атомарно
+    переименовывается в MEDIA_DIR, поэтому недописанные файлы не раздаются.
+    UPLOAD_TMP_DIR должна быть на той же файловой системе, что и MEDIA_DIR.
+    При превышении UPLOAD_MAX_SIZE запись прерывается с ошибкой 413.
+    Возвращает хэш содержимого и путь файла относительно MEDIA_DIR.
+    """
+
+    if file.size is not None and file.size > settings.UPLOAD_MAX_SIZE:
+        raise_too_large()
+
+    await aiofiles.os.makedirs(settings.UPLOAD_TMP_DIR, exist_ok=True)
+    tmp_link = os.path.join(settings.UPLOAD_TMP_DIR, f"{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        async with aiofiles.open(tmp_link, "wb") as async_file:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                if len(head) < HEAD_SIZE:
+                    head += chunk[: HEAD_SIZE - len(head)]
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_SIZE:
+                    raise_too_large()
+                digest.update(chunk)
+                await async_file.write(chunk)
+
+        extension = get_extension(head, file.filename)
+        content_hash = digest.hexdigest()
+        media_path = get_media_path(content_hash, extension)
+        link = os.path.join(settings.MEDIA_DIR, media_path)
+
+        if await aiofiles.os.path.exists(link):
+            await aiofiles.os.remove(tmp_link)
+        else:
+            await aiofiles.os.makedirs(os.path.dirname(link), exist_ok=True)
+            await aiofiles.os.replace(tmp_link, link)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            await aiofiles.os.remove(tmp_link)
+        raise
+
+    UPLOAD_BYTES.inc(size)
+    return content_hash, media_path
+
+
+def make_variants(
+    media_dir: str, media_path: str, sizes: Dict[str, int], quality: int
+) -> Dict[str, str]:
+    """
+    Функция для создания уменьшенных копий изображения в формате WebP.
+
+    Выполняется в отдельном процессе. Копии сохраняются рядом с оригиналом
+    под именами <хэш>_<название>.webp, уже существующие копии не пересоздаются.
+    Возвращает пути копий относительно media_dir по их названиям,
+    для файлов, не являющихся изображениями, - пустой словарь.
+    """
+
+    base_path = os.path.splitext(media_path)[0]
+    variants = {}
+    try:
+        with Image.open(os.path.join(media_dir, media_path)) as source:
+            source.draft("RGB", (max(sizes.values()),) * 2)
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+            for name, size in sizes.items():
+                variant_path = f"{base_path}_{name}.webp"
+                link = os.path.join(media_dir, variant_path)
+                if not os.path.exists(link):
+                    variant = image.copy()
+                    variant.thumbnail((size, size))
+                    tmp_link = f"{link}.{os.getpid()}.tmp"
+                    variant.save(tmp_link, "WEBP", quality=quality)
+                    os.replace(tmp_link, link)
+                variants[name] = variant_path
+    except (OSError, Image.DecompressionBombError):
+        return {}
+
+    return variants
+
+
+async def generate_variants(
+    content_hash: str,
+    media_path: str,
+    executor: Optional[Executor] = None,
+    session_maker: async_sessionmaker = async_session,
+) -> None:
+    """
+    Корутина для создания уменьшенных копий изображения и сохранения их в БД.
+
+    Копии записываются во все вложения с тем же хэшем содержимого,
+    для файлов, не являющихся изображениями, записывается пустой словарь,
+    чтобы повторные загрузки не создавали копии заново.
+    """
+
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(
+        executor,
+        make_variants,
+        settings.MEDIA_DIR,
+        media_path,
+        {"thumbnail": settings.MEDIA_THUMBNAIL_SIZE, "web": settings.MEDIA_WEB_SIZE},
+        settings.MEDIA_VARIANTS_QUALITY,
+    )
+    links = {
+        name: os.path.join(settings.MEDIA_PATH, path) for name, path in variants.items()
+    }
+    async with session_maker.begin() as db:
+        await db.execute(
+            update(models.Attachment)
+            .where(models.Attachment.content_hash == content_hash)
+            .values(variants=links)
+        )
+        if not links:
+            return
+        await versions.bump_tweet_version(
+            db,
+            select(models.Attachment.tweet_id).where(
+                models.Attachment.content_hash == content_hash
+            ),
+        )
+
+
+def schedule_variants(content_hash: str, media_path: str) -> None:
+    """
+    Функция для запуска фонового создания уменьшенных копий изображения.
+
+    Если копии этого содержимого уже создаются, новая задача не запускается:
+    копии будут записаны и в только что добавленное вложение.
+    """
+
+    if variants_executor is None or content_hash in variants_tasks:
+        return
+
+    task = asyncio.create_task(
+        generate_variants(content_hash, media_path, variants_executor)
+    )
+    variants_tasks[content_hash] = task
+    task.add_done_callback(lambda task: on_variants_done(content_hash, task))
+
+
+def on_variants_done(content_hash: str, task: asyncio.Task) -> None:
+    """Функция для логирования ошибок фонового создания копий изображения."""
+
+    variants_tasks.pop(content_hash, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Media variants generation failed", exc_info=task.exception())
+
+
+def start_variants_executor() -> None:
+    """Функция для запуска пула процессов, создающих копии изображений."""
+
+    global variants_executor
+    if settings.MEDIA_VARIANTS_ENABLED and variants_executor is None:
+        variants_executor = ProcessPoolExecutor(
+            max_workers=settings.MEDIA_VARIANTS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+
+async def stop_variants_executor() -> None:
+    """Корутина для ожидания фоновых задач и остановки пула процессов."""
+
+    global variants_executor
+    if variants_tasks:
+        await asyncio.gather(*variants_tasks.values(), return_exceptions=True)
+    if variants_executor is not None:
+        variants_executor.shutdown()
+        variants_executor = None
@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import REGISTRY
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from database.config import async_engine
+
+# метрики отброшенных записей лога объявлены в log_pipeline:
+sys.path.append(settings.LOGGING_DIR)
+import log_pipeline  # noqa: F401
+
+# маршрут для запросов, не попавших ни в один endpoint (статика, 404):
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "microblog_request_duration_seconds",
+    "Request latency by route template.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "microblog_requests_in_progress",
+    "Requests being processed.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+ERRORS = Counter(
+    "microblog_errors_total", "Application errors by status code.", ["status_code"]
+)
+UPLOAD_BYTES = Counter("microblog_upload_bytes_total", "Bytes of uploaded files.")
+
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "microblog_db_pool_checked_out",
+    "Connections currently checked out from the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "microblog_db_pool_overflow",
+    "Connections checked out above the pool size.",
+    multiprocess_mode="livesum",
+)
+
+
+def instrument_pool(engine: AsyncEngine) -> None:
+    """
+    Функция для учёта занятых соединений пула БД в метриках.
+
+    Значения обновляются при выдаче и возврате соединения, а не при запросе
+    метрик, поэтому при нескольких процессах они суммируются по живым
+    процессам, как и число запросов в работе.
+    """
+
+    pool = engine.sync_engine.pool
+    size = pool.size() if hasattr(pool, "size") else 0
+    checked_out = 0
+
+    def update(delta: int) -> None:
+        nonlocal checked_out
+        checked_out += delta
+        DB_POOL_CHECKED_OUT.set(checked_out)
+        DB_POOL_OVERFLOW.set(max(checked_out - size, 0))
+
+    event.listen(engine.sync_engine, "checkout", lambda *args: update(1))
+    event.listen(engine.sync_engine, "checkin", lambda *args: update(-1))
+
+
+instrument_pool(async_engine)
+
+
+def get_route(scope: Scope) -> str:
+    """
+    Функция для получения шаблона маршрута запроса.
+
+    Метки строятся по шаблону, а не по пути, чтобы их число было ограничено.
+    """
+
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Функция для получения реестра метрик.
+
+    При нескольких процессах (задана PROMETHEUS_MULTIPROC_DIR) метрики
+    собираются из файлов всех процессов.
+    """
+
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_response() -> Response:
+    """Функция для формирования ответа с метриками в формате Prometheus."""
+
+    return Response(generate_latest(get_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """ASGI middleware для учёта времени обработки и числа запросов в работе."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            REQUEST_LATENCY.labels(method, get_route(scope), status_code).observe(
+                time.perf_counter() - start
+            )
@@ -1,45 +1,105 @@
 import os
 from datetime import datetime
-
-import aiofiles
-from fastapi import Depends, FastAPI, File, Header, Path, Request, UploadFile
-from fastapi.encoders import jsonable_encoder
+from typing import Literal, Optional, Union
+
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Header,
+    Path,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy import Integer, and_, delete, insert, literal, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import counters
+import follow_graph
+import likes_buffer
 import schemas
+import search
+import tags
+import timelines
+import versions
 from common import (
     MicroblogException,
     get_async_session,
-    get_user_id_from_api_key,
+    get_batch_results,
+    get_current_user_id,
+    get_next_cursor,
+    get_read_session,
+    get_tweets_response,
     get_user_info,
+    paginate_tweets,
+    select_tweets,
 )
 from config import settings
 from database import models
+from database.bulk import dialect_insert
+from instrumentation import InstrumentationMiddleware
+from likes_buffer import start_like_buffer, stop_like_buffer
+from media import (
+    UploadSizeLimitMiddleware,
+    save_upload,
+    schedule_variants,
+    start_variants_executor,
+    stop_variants_executor,
+)
+from metrics import ERRORS, MetricsMiddleware, metrics_response
 
 app = FastAPI(title=settings.APP_NAME, description="Twitter-clone")
+app.add_middleware(UploadSizeLimitMiddleware)
+app.add_middleware(InstrumentationMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.mount(
     settings.STATIC_PATH, StaticFiles(directory=settings.STATIC_DIR), name="static"
 )
 
 
-@app.post("/api/tweets", response_model=schemas.ResultCreateTweet, status_code=201)
+@app.on_event("startup")
+async def startup() -> None:
+    """Обработчик запуска приложения."""
+
+    start_variants_executor()
+    start_like_buffer()
+    await follow_graph.start_follow_graph()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """Обработчик остановки приложения."""
+
+    await follow_graph.stop_follow_graph()
+    await stop_like_buffer()
+    await stop_variants_executor()
+
+
+@app.post(
+    "/api/tweets",
+    response_model=schemas.ResultCreateTweet,
+    status_code=201,
+    responses={401: {"model": schemas.ResultUnsuccess}},
+)
 async def create_tweet(
     body: schemas.TweetIn,
-    api_key: str = Header(alias="api-key"),
+    user_id: int = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_async_session),
 ) -> schemas.ResultCreateTweet:
     """Endpoint для получения и сохранения твита."""
 
+    date_time = datetime.now()
     query = (
         insert(models.Tweet)
         .values(
             content=body.content,
-            date_time=datetime.now(),
-            author_id=(get_user_id_from_api_key(api_key)).scalar_subquery(),  # type: ignore
+            date_time=date_time,
+            author_id=user_id,
         )
         .returning(models.Tweet.id)
     )
@@ -53,29 +113,55 @@ async def create_tweet(
             .values(tweet_id=tweet_id)
         )
 
+    await tags.save_tags(db, [(tweet_id, body.content, date_time)])
+    await counters.increment(db, models.User.tweet_count, [user_id])
+    if settings.TIMELINE_ENABLED:
+        await timelines.push_tweet(db, tweet_id, user_id, date_time)
+    await versions.bump_content_version(db, [user_id])
+
     await db.commit()
     return schemas.ResultCreateTweet(tweet_id=tweet_id)
 
 
-@app.post("/api/medias", response_model=schemas.ResultAddMedia, status_code=201)
+@app.post(
+    "/api/medias",
+    response_model=schemas.ResultAddMedia,
+    status_code=201,
+    responses={413: {"model": schemas.ResultUnsuccess}},
+)
 async def add_file_media(
     file: UploadFile = File(...), db: AsyncSession = Depends(get_async_session)
 ) -> schemas.ResultAddMedia:
-    """Endpoint для получения файла и добавления его в БД."""
+    """
+    Endpoint для получения файла и добавления его в БД.
 
-    filename = str(file.filename)
-    link = os.path.join(settings.MEDIA_DIR, filename)
-    path = os.path.join(settings.MEDIA_PATH, filename)
+    Для уже загруженного содержимого уменьшенные копии берутся из вложения
+    с тем же хэшем и не создаются заново.
+    """
 
-    async with aiofiles.open(link, "wb") as async_file:
-        content = await file.read()
-        await async_file.write(content)
+    content_hash, media_path = await save_upload(file)
+    path = os.path.join(settings.MEDIA_PATH, media_path)
 
-    query = insert(models.Attachment).values(link=path).returning(models.Attachment.id)
+    variants = (
+        select(models.Attachment.variants)
+        .where(
+            models.Attachment.content_hash == content_hash,
+            models.Attachment.variants.is_not(None),
+        )
+        .limit(1)
+        .scalar_subquery()
+    )
+    query = (
+        insert(models.Attachment)
+        .values(link=path, content_hash=content_hash, variants=variants)
+        .returning(models.Attachment.id, models.Attachment.variants)
+    )
     result = await db.execute(query)
-    media_id = result.scalars().first()
+    media_id, variants = result.one()
 
     await db.commit()
+    if variants is None:
+        schedule_variants(content_hash, media_path)
 
     return schemas.ResultAddMedia(media_id=media_id)
 
@@ -85,12 +171,13 @@ async def add_file_media(
     response_model=schemas.ResultSuccess,
     status_code=200,
     responses={
+        401: {"model": schemas.ResultUnsuccess},
         403: {"model": schemas.ResultUnsuccess},
         404: {"model": schemas.ResultUnsuccess},
     },
 )
 async def delete_tweet(
-    api_key: str = Header(alias="api-key"),
+    user_id: int = Depends(get_current_user_id),
     id: int = Path(...),
     db: AsyncSession = Depends(get_async_session),
 ) -> schemas.ResultSuccess:
@@ -107,8 +194,7 @@ async def delete_tweet(
         .where(
             and_(
                 models.Tweet.id == id,
-                models.Tweet.author_id
-                == (get_user_id_from_api_key(api_key)).scalar_subquery(),  # type: ignore
+                models.Tweet.author_id == user_id,
             )
         )
         .returning(models.Tweet.id)
@@ -123,6 +209,11 @@ async def delete_tweet(
             error_message="You are not author of the tweet",
         )
 
+    await counters.increment(db, models.User.tweet_count, [user_id], -1)
+    if settings.TIMELINE_ENABLED:
+        await timelines.remove_tweet(db, id)
+    await versions.bump_content_version(db, [user_id])
+
     await db.commit()
 
     return schemas.ResultSuccess()
@@ -134,15 +225,36 @@ async def delete_tweet(
     status_code=201,
     responses={
         400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
         404: {"model": schemas.ResultUnsuccess},
     },
 )
 async def add_like_tweet(
-    api_key: str = Header(alias="api-key"),
+    user_id: int = Depends(get_current_user_id),
     id: int = Path(...),
     db: AsyncSession = Depends(get_async_session),
 ) -> schemas.ResultSuccess:
-    """Endpoint для проставления лайка на твит."""
+    """
+    Endpoint для проставления лайка на твит.
+
+    При включенном буфере лайков лайк записывается в БД позже пачкой.
+    """
+
+    if likes_buffer.buffer is not None:
+        state = await likes_buffer.buffer.get_state(db, id, user_id)
+        if state is None:
+            raise MicroblogException(
+                status_code=404, error_type=ValueError, error_message="No such tweet"
+            )
+        liked, name = state
+        if liked:
+            raise MicroblogException(
+                status_code=400,
+                error_type=IntegrityError,
+                error_message="You already liked this tweet",
+            )
+        likes_buffer.buffer.record(id, user_id, True, name)
+        return schemas.ResultSuccess()
 
     response = await db.execute(select(models.Tweet).where(models.Tweet.id == id))
     if not response.scalars().first():
@@ -150,14 +262,9 @@ async def add_like_tweet(
             status_code=404, error_type=ValueError, error_message="No such tweet"
         )
 
-    query = insert(models.Like).values(
-        tweet_id=id, user_id=(get_user_id_from_api_key(api_key).scalar_subquery())  # type: ignore
-    )
+    query = insert(models.Like).values(tweet_id=id, user_id=user_id)
     try:
         await db.execute(query)
-        await db.commit()
-        return schemas.ResultSuccess()
-
     except IntegrityError:
         raise MicroblogException(
             status_code=400,
@@ -165,6 +272,11 @@ async def add_like_tweet(
             error_message="You already liked this tweet",
         )
 
+    await counters.increment(db, models.Tweet.like_count, [id])
+    await versions.bump_tweet_version(db, [id])
+    await db.commit()
+    return schemas.ResultSuccess()
+
 
 @app.delete(
     "/api/tweets/{id}/likes",
@@ -172,15 +284,36 @@ async def add_like_tweet(
     status_code=200,
     responses={
         400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
         404: {"model": schemas.ResultUnsuccess},
     },
 )
 async def delete_like_tweet(
-    api_key: str = Header(alias="api-key"),
+    user_id: int = Depends(get_current_user_id),
     id: int = Path(...),
     db: AsyncSession = Depends(get_async_session),
 ) -> schemas.ResultSuccess:
-    """Endpoint для снятия лайка с твита."""
+    """
+    Endpoint для снятия лайка с твита.
+
+    При включенном буфере лайков лайк удаляется из БД позже пачкой.
+    """
+
+    if likes_buffer.buffer is not None:
+        state = await likes_buffer.buffer.get_state(db, id, user_id)
+        if state is None:
+            raise MicroblogException(
+                status_code=404, error_type=ValueError, error_message="No such tweet"
+            )
+        liked, name = state
+        if not liked:
+            raise MicroblogException(
+                status_code=400,
+                error_type=IntegrityError,
+                error_message="You didn't like this tweet",
+            )
+        likes_buffer.buffer.record(id, user_id, False, name)
+        return schemas.ResultSuccess()
 
     response = await db.execute(select(models.Tweet).where(models.Tweet.id == id))
     if not response.scalars().first():
@@ -193,8 +326,7 @@ async def delete_like_tweet(
         .where(
             and_(
                 models.Like.tweet_id == id,
-                models.Like.user_id
-                == (get_user_id_from_api_key(api_key)).scalar_subquery(),  # type: ignore
+                models.Like.user_id == user_id,
             )
         )
         .returning(models.Like.tweet_id)
@@ -209,22 +341,83 @@ async def delete_like_tweet(
             error_message="You didn't like this tweet",
         )
 
+    await counters.increment(db, models.Tweet.like_count, [id], -1)
+    await versions.bump_tweet_version(db, [id])
     await db.commit()
 
     return schemas.ResultSuccess()
 
 
+@app.post(
+    "/api/tweets/likes/batch",
+    response_model=schemas.ResultBatch,
+    status_code=200,
+    responses={401: {"model": schemas.ResultUnsuccess}},
+)
+async def add_likes_batch(
+    body: schemas.BatchIn,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_session),
+) -> schemas.ResultBatch:
+    """
+    Endpoint для проставления лайков на несколько твитов одним запросом.
+
+    Лайки вставляются одним INSERT ... SELECT, уже существующие пропускаются
+    через ON CONFLICT DO NOTHING. При включенном буфере лайков лайки
+    записываются через него, как в add_like_tweet.
+    """
+
+    ids = list(dict.fromkeys(body.ids))
+    if likes_buffer.buffer is not None:
+        name, states = await likes_buffer.buffer.get_states(db, ids, user_id)
+        created = [id for id in ids if id in states and not states[id]]
+        for id in created:
+            likes_buffer.buffer.record(id, user_id, True, name)
+        return schemas.ResultBatch(
+            results=get_batch_results(ids, created, list(states))
+        )
+
+    query = (
+        dialect_insert(db, models.Like)
+        .from_select(
+            ["tweet_id", "user_id"],
+            select(models.Tweet.id, literal(user_id, Integer)).where(
+                models.Tweet.id.in_(ids)
+            ),
+        )
+        .on_conflict_do_nothing()
+        .returning(models.Like.tweet_id)
+    )
+    response = await db.execute(query)
+    created = response.scalars().all()
+
+    found = created
+    if len(created) < len(ids):
+        response = await db.execute(
+            select(models.Tweet.id).where(models.Tweet.id.in_(ids))
+        )
+        found = response.scalars().all()
+
+    if created:
+        await counters.increment(db, models.Tweet.like_count, created)
+        await versions.bump_tweet_version(db, created)
+
+    await db.commit()
+    return schemas.ResultBatch(results=get_batch_results(ids, created, found))
+
+
 @app.post(
     "/api/users/{id}/follow",
     response_model=schemas.ResultSuccess,
     status_code=201,
     responses={
         400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
         404: {"model": schemas.ResultUnsuccess},
     },
 )
 async def start_following(
-    api_key: str = Header(alias="api-key"),
+    user_id: int = Depends(get_current_user_id),
     id: int = Path(...),
     db: AsyncSession = Depends(get_async_session),
 ) -> schemas.ResultSuccess:
@@ -236,16 +429,10 @@ async def start_following(
             status_code=404, error_type=ValueError, error_message="No such user"
         )
 
-    query = insert(models.Follow).values(
-        follower_user_id=(get_user_id_from_api_key(api_key).scalar_subquery()),  # type: ignore
-        following_user_id=id,
-    )
+    query = insert(models.Follow).values(follower_user_id=user_id, following_user_id=id)
 
     try:
         await db.execute(query)
-        await db.commit()
-        return schemas.ResultSuccess()
-
     except IntegrityError:
         raise MicroblogException(
             status_code=400,
@@ -253,6 +440,16 @@ async def start_following(
             error_message="You already follower this user",
         )
 
+    await counters.increment(db, models.User.following_count, [user_id])
+    await counters.increment(db, models.User.follower_count, [id])
+    if settings.TIMELINE_ENABLED:
+        await timelines.pull_author_tweets(db, user_id, id)
+    await versions.bump_follow_version(db, [user_id, id])
+
+    await db.commit()
+    follow_graph.add_follows(user_id, [id])
+    return schemas.ResultSuccess()
+
 
 @app.delete(
     "/api/users/{id}/follow",
@@ -260,11 +457,12 @@ async def start_following(
     status_code=200,
     responses={
         400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
         404: {"model": schemas.ResultUnsuccess},
     },
 )
 async def stop_following(
-    api_key: str = Header(alias="api-key"),
+    user_id: int = Depends(get_current_user_id),
     id: int = Path(...),
     db: AsyncSession = Depends(get_async_session),
 ) -> schemas.ResultSuccess:
@@ -280,8 +478,7 @@ async def stop_following(
         delete(models.Follow)
         .where(
             and_(
-                models.Follow.follower_user_id
-                == (get_user_id_from_api_key(api_key)).scalar_subquery(),  # type: ignore
+                models.Follow.follower_user_id == user_id,
                 models.Follow.following_user_id == id,
             )
         )
@@ -297,90 +494,313 @@ async def stop_following(
             error_message="You didn't followers this user",
         )
 
+    await counters.increment(db, models.User.following_count, [user_id], -1)
+    await counters.increment(db, models.User.follower_count, [id], -1)
+    if settings.TIMELINE_ENABLED:
+        await timelines.remove_author_tweets(db, user_id, id)
+        await timelines.fan_out_author_tweets(db, id)
+    await versions.bump_follow_version(db, [user_id, id])
+
     await db.commit()
+    follow_graph.remove_follow(user_id, id)
 
     return schemas.ResultSuccess()
 
 
-@app.get("/api/tweets", response_model=schemas.ResultTweets, status_code=200)
-async def get_tweet_feed(
-    api_key: str = Header(alias="api-key"),
+@app.post(
+    "/api/users/follow/batch",
+    response_model=schemas.ResultBatch,
+    status_code=200,
+    responses={401: {"model": schemas.ResultUnsuccess}},
+)
+async def start_following_batch(
+    body: schemas.BatchIn,
+    user_id: int = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_async_session),
-) -> schemas.ResultTweets:
-    """Endpoint для получения ленты с твитами."""
+) -> schemas.ResultBatch:
+    """
+    Endpoint для подписки на нескольких пользователей одним запросом.
+
+    Подписки вставляются одним INSERT ... SELECT, уже существующие
+    пропускаются через ON CONFLICT DO NOTHING.
+    """
+
+    ids = list(dict.fromkeys(body.ids))
     query = (
-        select(models.Tweet)
-        .where(
-            or_(
-                models.Tweet.author_id.in_(
-                    select(models.Follow.following_user_id).where(
-                        models.Follow.follower_user_id
-                        == (get_user_id_from_api_key(api_key)).scalar_subquery()  # type: ignore
-                    )
-                ),
-                models.Tweet.author_id
-                == (get_user_id_from_api_key(api_key)).scalar_subquery(),  # type: ignore
-            )
+        dialect_insert(db, models.Follow)
+        .from_select(
+            ["follower_user_id", "following_user_id"],
+            select(literal(user_id, Integer), models.User.id).where(
+                models.User.id.in_(ids)
+            ),
         )
-        .order_by(models.Tweet.date_time.desc())
+        .on_conflict_do_nothing()
+        .returning(models.Follow.following_user_id)
     )
+    response = await db.execute(query)
+    created = response.scalars().all()
+
+    found = created
+    if len(created) < len(ids):
+        response = await db.execute(
+            select(models.User.id).where(models.User.id.in_(ids))
+        )
+        found = response.scalars().all()
+
+    if created:
+        await counters.increment(
+            db, models.User.following_count, [user_id], len(created)
+        )
+        await counters.increment(db, models.User.follower_count, created)
+        if settings.TIMELINE_ENABLED:
+            for author_id in created:
+                await timelines.pull_author_tweets(db, user_id, author_id)
+        await versions.bump_follow_version(db, [user_id, *created])
+
+    await db.commit()
+    follow_graph.add_follows(user_id, created)
+    return schemas.ResultBatch(results=get_batch_results(ids, created, found))
+
+
+@app.get(
+    "/api/tweets",
+    response_model=schemas.ResultTweets,
+    response_model_exclude_none=True,
+    status_code=200,
+    responses={
+        304: {"description": "Not Modified"},
+        400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
+    },
+)
+async def get_tweet_feed(
+    response: Response,
+    user_id: int = Depends(get_current_user_id),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.FEED_MAX_PAGE_SIZE,
+        description="Page size. Without limit and cursor the whole feed is returned.",
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor returned in next_cursor of the previous page."
+    ),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session),
+) -> Union[schemas.ResultTweets, Response]:
+    """Endpoint для получения ленты с твитами."""
+
+    if cursor is not None and limit is None:
+        limit = settings.FEED_PAGE_SIZE
+
+    feed_filter = timelines.get_feed_filter(user_id, limit, cursor)
+    page = select(models.Tweet.id, models.Tweet.version).where(feed_filter)
+    etag = await versions.get_feed_etag(
+        db, user_id, paginate_tweets(page, limit, cursor), limit, cursor
+    )
+    if versions.etag_matches(etag, if_none_match):
+        return versions.not_modified(etag)
+
+    query = paginate_tweets(select_tweets().where(feed_filter), limit, cursor)
     result = await db.execute(query)
-    tweets = result.scalars().all()
-
-    tweets = [
-        schemas.Tweet(
-            id=tweet.id,
-            content=tweet.content,
-            attachments=[attachment.link for attachment in tweet.attachments],
-            author=schemas.UserShort(**jsonable_encoder(tweet.author)),
-            likes=[
-                schemas.UserForLikes(**jsonable_encoder(like.user))
-                for like in tweet.likes
-            ],
+    tweets, next_cursor = get_next_cursor(result.all(), limit)
+
+    tweets_response = await get_tweets_response(tweets, db, next_cursor)
+    # при FEED_FAST_SERIALIZATION ответ уже собран и заголовки ставятся в него:
+    if isinstance(tweets_response, Response):
+        response = tweets_response
+    versions.set_etag(response, etag)
+    return tweets_response
+
+
+@app.get(
+    "/api/tweets/search",
+    response_model=schemas.ResultTweets,
+    response_model_exclude_none=True,
+    status_code=200,
+    responses={
+        400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
+    },
+)
+async def search_tweets(
+    q: str = Query(..., min_length=1, max_length=settings.SEARCH_MAX_QUERY_LENGTH),
+    order: Literal["relevance", "recent"] = Query(
+        "relevance", description="Most relevant or most recent tweets first."
+    ),
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(
+        None, description="Cursor returned in next_cursor of the previous page."
+    ),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_session),
+) -> Union[schemas.ResultTweets, Response]:
+    """Endpoint для полнотекстового поиска твитов."""
+
+    if not q.split():
+        raise MicroblogException(
+            status_code=400, error_type=ValueError, error_message="Empty search query"
         )
-        for tweet in tweets
-    ]
 
-    return schemas.ResultTweets(tweets=tweets)
+    query, rank = search.search_tweets(select_tweets(), db.bind.dialect.name, q)
+    if order == "relevance":
+        query = search.paginate_by_rank(query, rank, limit, cursor)
+        result = await db.execute(query)
+        tweets, next_cursor = search.get_next_search_cursor(result.all(), limit)
+    else:
+        query = paginate_tweets(query, limit, cursor)
+        result = await db.execute(query)
+        tweets, next_cursor = get_next_cursor(result.all(), limit)
+
+    return await get_tweets_response(tweets, db, next_cursor)
 
 
-@app.get("/api/users/me", response_model=schemas.ResultUser, status_code=200)
+@app.get(
+    "/api/tags/{tag}/tweets",
+    response_model=schemas.ResultTweets,
+    response_model_exclude_none=True,
+    status_code=200,
+    responses={
+        400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
+    },
+)
+async def get_tag_tweets(
+    tag: str = Path(..., description="Hashtag without #, case-insensitive."),
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(
+        None, description="Cursor returned in next_cursor of the previous page."
+    ),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_session),
+) -> Union[schemas.ResultTweets, Response]:
+    """Endpoint для получения твитов с хэштегом, новые первыми."""
+
+    query = (
+        select_tweets()
+        .join(models.TweetTag, models.TweetTag.tweet_id == models.Tweet.id)
+        .where(models.TweetTag.tag == tag.lower())
+    )
+    query = paginate_tweets(
+        query, limit, cursor, models.TweetTag.date_time, models.TweetTag.tweet_id
+    )
+    result = await db.execute(query)
+    tweets, next_cursor = get_next_cursor(result.all(), limit)
+    return await get_tweets_response(tweets, db, next_cursor)
+
+
+@app.get(
+    "/api/users/me",
+    response_model=schemas.ResultUser,
+    response_model_exclude_none=True,
+    status_code=200,
+    responses={
+        304: {"description": "Not Modified"},
+        401: {"model": schemas.ResultUnsuccess},
+    },
+)
 async def get_user_info_about_self(
-    api_key: str = Header(alias="api-key"),
-    db: AsyncSession = Depends(get_async_session),
+    response: Response,
+    user_id: int = Depends(get_current_user_id),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PROFILE_MAX_FOLLOWS_LIMIT),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """Endpoint для получения информации о своём профиле."""
 
-    query = select(models.User).where(
-        models.User.id == (get_user_id_from_api_key(api_key)).scalar_subquery()  # type: ignore
-    )
-    return await get_user_info(query, db)
+    etag = await versions.get_profile_etag(db, user_id, limit)
+    if etag is not None:
+        if versions.etag_matches(etag, if_none_match):
+            return versions.not_modified(etag)
+        versions.set_etag(response, etag)
+
+    return await get_user_info(user_id, db, limit)
 
 
 @app.get(
     "/api/users/{id}",
     response_model=schemas.ResultUser,
+    response_model_exclude_none=True,
     status_code=200,
-    responses={404: {"model": schemas.ResultUnsuccess}},
+    responses={
+        304: {"description": "Not Modified"},
+        404: {"model": schemas.ResultUnsuccess},
+    },
 )
 async def get_user_info_about_another(
-    id: int = Path(...), db: AsyncSession = Depends(get_async_session)
+    response: Response,
+    id: int = Path(...),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PROFILE_MAX_FOLLOWS_LIMIT),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """Endpoint для получения информации о профиле другого пользователя."""
 
-    try:
-        query = select(models.User).where(models.User.id == id)
-        return await get_user_info(query, db)
-    except AttributeError:
+    etag = await versions.get_profile_etag(db, id, limit)
+    if etag is None:
+        raise MicroblogException(
+            status_code=404, error_type=ValueError, error_message="No such user"
+        )
+    if versions.etag_matches(etag, if_none_match):
+        return versions.not_modified(etag)
+    versions.set_etag(response, etag)
+
+    return await get_user_info(id, db, limit)
+
+
+@app.get(
+    "/api/users/{id}/mentions",
+    response_model=schemas.ResultTweets,
+    response_model_exclude_none=True,
+    status_code=200,
+    responses={
+        400: {"model": schemas.ResultUnsuccess},
+        401: {"model": schemas.ResultUnsuccess},
+        404: {"model": schemas.ResultUnsuccess},
+    },
+)
+async def get_user_mentions(
+    id: int = Path(...),
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(
+        None, description="Cursor returned in next_cursor of the previous page."
+    ),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_session),
+) -> Union[schemas.ResultTweets, Response]:
+    """Endpoint для получения твитов, упоминающих пользователя, новые первыми."""
+
+    result = await db.execute(select(models.User.id).where(models.User.id == id))
+    if result.scalar() is None:
         raise MicroblogException(
             status_code=404, error_type=ValueError, error_message="No such user"
         )
 
+    query = (
+        select_tweets()
+        .join(models.Mention, models.Mention.tweet_id == models.Tweet.id)
+        .where(models.Mention.user_id == id)
+    )
+    query = paginate_tweets(
+        query, limit, cursor, models.Mention.date_time, models.Mention.tweet_id
+    )
+    result = await db.execute(query)
+    tweets, next_cursor = get_next_cursor(result.all(), limit)
+    return await get_tweets_response(tweets, db, next_cursor)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """Endpoint для получения метрик приложения в формате Prometheus."""
+
+    return metrics_response()
+
 
 @app.exception_handler(MicroblogException)
 async def all_error(request: Request, exc: MicroblogException) -> JSONResponse:
     """Обработчик исключений."""
 
+    ERRORS.labels(exc.status_code).inc()
     return JSONResponse(
         content={
             "result": False,
@@ -1,7 +1,9 @@
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
+from config import settings
+
 """Схемы для обработки входных данных от пользователя."""
 
 
@@ -12,6 +14,12 @@ class TweetIn(BaseModel):
     tweet_media_ids: List[int] = list()
 
 
+class BatchIn(BaseModel):
+    """Схема для списка ID в пакетных запросах."""
+
+    ids: List[int] = Field(..., min_length=1, max_length=settings.BATCH_MAX_SIZE)
+
+
 """Схемы для подготовки выходных данных о пользователе."""
 
 
@@ -42,6 +50,9 @@ class UserFull(UserShort):
 
     followers: List[UserShort]
     following: List[UserShort]
+    followers_count: int
+    following_count: int
+    tweets_count: int
 
 
 """Схемы для подготовки выходных данных о твите."""
@@ -55,6 +66,11 @@ class Tweet(BaseModel):
     attachments: List[str] = Field(
         ..., description="List of paths to files that were attached to the tweet."
     )
+    attachment_variants: List[Dict[str, str]] = Field(
+        ...,
+        description="Paths to reduced copies of each attachment by their names "
+        "('thumbnail', 'web'). Empty until the copies are generated.",
+    )
     author: UserShort
     likes: List[UserForLikes] = Field(
         ..., description="List of users who liked the tweet."
@@ -86,6 +102,10 @@ class ResultTweets(ResultSuccess):
     """Схема для ответа при запросе ленты твитов."""
 
     tweets: List[Tweet]
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor of the next page, absent when there are no more tweets.",
+    )
 
 
 class ResultUser(ResultSuccess):
@@ -94,6 +114,21 @@ class ResultUser(ResultSuccess):
     user: UserFull
 
 
+class BatchItemResult(BaseModel):
+    """Схема для результата обработки одного ID в пакетном запросе."""
+
+    id: int
+    status: Literal["created", "exists", "not_found"]
+
+
+class ResultBatch(ResultSuccess):
+    """Схема для ответа на пакетный запрос."""
+
+    results: List[BatchItemResult] = Field(
+        ..., description="Result for each unique ID in the order of the request."
+    )
+
+
 class ResultUnsuccess(BaseModel):
     """Базовая схема для ответа при неуспешном результате запроса."""
 
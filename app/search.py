@@ -0,0 +1,108 @@
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+from sqlalchemy.engine import Row
+from sqlalchemy.sql.elements import ColumnElement
+
+from common import MicroblogException
+from database import models
+from database.models import SEARCH_CONFIG
+
+# внешняя таблица FTS5 в SQLite, см. database/models.py:
+tweets_fts = table("tweets_fts", column("rowid"), column("rank"))
+
+
+def get_fts_query(q: str) -> str:
+    """
+    Функция для преобразования поисковой строки в запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому спецсимволы синтаксиса FTS5
+    не влияют на запрос, а твит должен содержать все слова.
+    """
+
+    return " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+
+
+def search_tweets(query: select, dialect: str, q: str) -> Tuple[select, ColumnElement]:
+    """
+    Функция для ограничения запроса твитов найденными по строке q.
+
+    Возвращает запрос и релевантность твита (больше - лучше): ts_rank
+    в PostgreSQL и bm25 со знаком минус в SQLite.
+    """
+
+    if dialect == "postgresql":
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        search_vector = literal_column("tweets.search_vector")
+        rank = func.ts_rank(search_vector, ts_query)
+        return query.where(search_vector.op("@@")(ts_query)), rank
+
+    query = query.join(tweets_fts, tweets_fts.c.rowid == models.Tweet.id).where(
+        literal_column("tweets_fts").match(get_fts_query(q))
+    )
+    return query, -tweets_fts.c.rank
+
+
+def encode_search_cursor(rank: float, date_time: datetime, tweet_id: int) -> str:
+    """Функция для формирования курсора по релевантности, дате и ID твита."""
+
+    raw = f"{rank!r}|{date_time.isoformat()}|{tweet_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, datetime, int]:
+    """Функция для получения релевантности, даты и ID твита из курсора."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        rank, date_time, tweet_id = raw.split("|")
+        return float(rank), datetime.fromisoformat(date_time), int(tweet_id)
+    except ValueError:
+        raise MicroblogException(
+            status_code=400, error_type=ValueError, error_message="Invalid cursor"
+        )
+
+
+def paginate_by_rank(
+    query: select, rank: ColumnElement, limit: int, cursor: Optional[str]
+) -> select:
+    """
+    Функция для постраничной (keyset) выборки твитов по релевантности.
+
+    Твиты упорядочиваются по релевантности, затем по дате и ID, поэтому
+    из одинаково релевантных первыми идут новые. Запрашивается на один
+    твит больше лимита, чтобы определить наличие следующей страницы.
+    """
+
+    query = query.add_columns(rank.label("rank")).order_by(
+        rank.desc(), models.Tweet.date_time.desc(), models.Tweet.id.desc()
+    )
+    if cursor is not None:
+        last_rank, date_time, tweet_id = decode_search_cursor(cursor)
+        query = query.where(
+            or_(
+                rank < last_rank,
+                and_(rank == last_rank, models.Tweet.date_time < date_time),
+                and_(
+                    rank == last_rank,
+                    models.Tweet.date_time == date_time,
+                    models.Tweet.id < tweet_id,
+                ),
+            )
+        )
+    return query.limit(limit + 1)
+
+
+def get_next_search_cursor(
+    tweets: Sequence[Row], limit: int
+) -> Tuple[Sequence[Row], Optional[str]]:
+    """Функция для формирования курсора следующей страницы поиска."""
+
+    if len(tweets) <= limit:
+        return tweets, None
+    tweets = tweets[:limit]
+    last = tweets[-1]
+    return tweets, encode_search_cursor(last.rank, last.date_time, last.id)
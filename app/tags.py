@@ -0,0 +1,122 @@
+import asyncio
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import models
+from database.bulk import dialect_insert
+from database.config import async_session
+
+TAG_MAX_LENGTH = models.TweetTag.tag.type.length
+NAME_MAX_LENGTH = models.User.name.type.length
+HASHTAG = re.compile(r"(?<![\w#])#(\w+)")
+MENTION = re.compile(r"(?<![\w@])@(\w+)")
+
+
+def parse_tags(content: str) -> List[str]:
+    """
+    Функция для получения хэштегов твита в нижнем регистре без повторов.
+
+    Слишком длинные хэштеги пропускаются.
+    """
+
+    tags = (tag.lower() for tag in HASHTAG.findall(content))
+    return list(dict.fromkeys(tag for tag in tags if len(tag) <= TAG_MAX_LENGTH))
+
+
+def parse_mentions(content: str) -> List[str]:
+    """Функция для получения имён упомянутых в твите пользователей без повторов."""
+
+    names = MENTION.findall(content)
+    return list(dict.fromkeys(name for name in names if len(name) <= NAME_MAX_LENGTH))
+
+
+async def get_users_by_names(
+    db: AsyncSession, names: Sequence[str]
+) -> Dict[str, List[int]]:
+    """Корутина для получения ID пользователей по именам одним запросом."""
+
+    users = defaultdict(list)
+    if names:
+        result = await db.execute(
+            select(models.User.name, models.User.id).where(models.User.name.in_(names))
+        )
+        for name, user_id in result:
+            users[name].append(user_id)
+    return users
+
+
+async def save_tags(
+    db: AsyncSession, tweets: Sequence[Tuple[int, str, datetime]]
+) -> None:
+    """
+    Корутина для сохранения хэштегов и упоминаний твитов.
+
+    tweets - (ID, текст, дата) твитов. Упоминание относится ко всем
+    пользователям с таким именем, несуществующие имена пропускаются.
+    Уже сохранённые хэштеги и упоминания не дублируются, поэтому твиты
+    можно обрабатывать повторно. Если в твитах нет ни хэштегов, ни
+    упоминаний, обращений к БД нет.
+    """
+
+    tag_rows = [
+        {"tweet_id": tweet_id, "tag": tag, "date_time": date_time}
+        for tweet_id, content, date_time in tweets
+        for tag in parse_tags(content)
+    ]
+    mentioned = [
+        (tweet_id, name, date_time)
+        for tweet_id, content, date_time in tweets
+        for name in parse_mentions(content)
+    ]
+    users = await get_users_by_names(db, list({name for _, name, _ in mentioned}))
+    mention_rows = [
+        {"tweet_id": tweet_id, "user_id": user_id, "date_time": date_time}
+        for tweet_id, name, date_time in mentioned
+        for user_id in users.get(name, ())
+    ]
+
+    for model, rows in ((models.TweetTag, tag_rows), (models.Mention, mention_rows)):
+        if rows:
+            await db.execute(dialect_insert(db, model).on_conflict_do_nothing(), rows)
+
+
+async def backfill_tags(db: AsyncSession, batch_size: int = 1000) -> None:
+    """
+    Корутина для заполнения хэштегов и упоминаний по существующим твитам.
+
+    Твиты читаются пачками по batch_size в порядке ID, каждая пачка
+    фиксируется отдельной транзакцией, поэтому расход памяти не зависит
+    от числа твитов, а прерванное заполнение можно запустить заново.
+    """
+
+    last_tweet_id = 0
+    while True:
+        result = await db.execute(
+            select(models.Tweet.id, models.Tweet.content, models.Tweet.date_time)
+            .where(models.Tweet.id > last_tweet_id)
+            .order_by(models.Tweet.id)
+            .limit(batch_size)
+        )
+        tweets = result.all()
+        if not tweets:
+            break
+
+        await save_tags(db, tweets)
+        await db.commit()
+        last_tweet_id = tweets[-1].id
+
+
+async def main() -> None:
+    """Корутина для запуска заполнения хэштегов и упоминаний из командной строки."""
+
+    async with async_session() as db:
+        await backfill_tags(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
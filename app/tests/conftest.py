@@ -12,8 +12,11 @@ from sqlalchemy_utils.functions import drop_database
 PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
 sys.path.append(PARENT_DIR)
 
-from common import get_async_session
+from common import api_keys_cache, get_async_session, get_read_session
+from config import settings
+from counters import recount_counters
 from database import models
+from instrumentation import instrument_engine
 from routes import app as _app
 from tests.data_test_db import DATA_TEST_DB
 
@@ -21,6 +24,7 @@ TESTS_DIR = os.path.dirname(__file__)
 DB_URL = f"sqlite+aiosqlite:///{TESTS_DIR}/test_microblog.db"
 
 async_engine = create_async_engine(DB_URL, echo=True)
+instrument_engine(async_engine)
 TestingSession = async_sessionmaker(
     async_engine, expire_on_commit=False, autocommit=False, autoflush=False
 )
@@ -51,17 +55,40 @@ async def create_db() -> AsyncGenerator:
                 lambda session: session.bulk_save_objects(DATA_TEST_DB)
             )
 
+    async with TestingSession() as session:
+        await recount_counters(session)
+
     yield
 
     drop_database(DB_URL)
 
 
+@pytest.fixture(autouse=True)
+def media_dir(tmp_path, monkeypatch) -> str:
+    """Фикстура, перенаправляющая сохранение файлов во временную директорию."""
+
+    media_dir = tmp_path / "images"
+    media_dir.mkdir()
+    monkeypatch.setattr(settings, "MEDIA_DIR", str(media_dir))
+    monkeypatch.setattr(settings, "UPLOAD_TMP_DIR", str(tmp_path / "uploads"))
+    return str(media_dir)
+
+
+@pytest.fixture
+def session_maker() -> async_sessionmaker:
+    """Фикстура, возвращающая фабрику сессий тестовой БД."""
+
+    return TestingSession
+
+
 @pytest.fixture
 def app() -> Generator:
     """Фикстура, 'подменяющая' сессию приложения на тестовую."""
 
     _app.dependency_overrides[get_async_session] = override_get_async_session
+    _app.dependency_overrides[get_read_session] = override_get_async_session
     yield _app
+    api_keys_cache.clear()
 
 
 @pytest.fixture
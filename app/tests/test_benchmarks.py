@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from benchmarks.dataset import get_users
+from benchmarks.run import SCENARIOS, BenchmarkConfig, Workload, main
+from database.dataset import (
+    DatasetConfig,
+    generate_follows,
+    get_api_key,
+    seed_dataset,
+)
+
+
+def test_generate_follows() -> None:
+    """Тест по проверке воспроизводимости и неравномерности графа подписок."""
+
+    config = DatasetConfig(users=200, avg_follows=10)
+    follows = list(generate_follows(config))
+    assert follows == list(generate_follows(config))
+    assert len(set(follows)) == len(follows)
+    assert all(follower != following for follower, following in follows)
+
+    followers = [following for _, following in follows]
+    assert followers.count(1) > followers.count(config.users) * 5
+
+
+def test_benchmark_run(app: FastAPI, tmp_path) -> None:
+    """Тест по проверке запуска нагрузочного теста на небольшом наборе данных."""
+
+    overrides = dict(app.dependency_overrides)
+    report_path = tmp_path / "report.json"
+    argv = ["--users", "20", "--requests", "60", "--json", str(report_path)]
+    report = asyncio.run(main(argv))
+
+    assert set(report) == {*SCENARIOS, "total"}
+    assert report["total"]["requests"] == 60
+    assert report["total"]["errors"] == 0
+    assert report["feed"]["queries"] > 0
+    assert json.loads(report_path.read_text()) == report
+    assert app.dependency_overrides == overrides
+
+
+def test_workload_users(client: TestClient, session_maker: async_sessionmaker) -> None:
+    """Тест по проверке api-key нагрузки при сдвиге ID синтетических пользователей."""
+
+    config = DatasetConfig(users=10, avg_follows=2, tweets_per_user=1)
+    asyncio.run(seed_dataset(session_maker, config))
+    users = asyncio.run(get_users(session_maker))
+    assert users[0] == (5, get_api_key(1))
+    assert len(users) == config.users + 4
+
+    workload = Workload(users, config.users, BenchmarkConfig(), seed=0)
+    for _ in range(20):
+        headers = workload.headers()
+        response = client.get("/api/users/me", headers=headers)
+        assert response.status_code == 200
+        user_id = response.json()["user"]["id"]
+        assert (user_id, headers["api-key"]) in users
+    assert workload.popular_user() in workload.users
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from database import bulk, create_users, models
+from database.dataset import DatasetConfig, generate_follows, seed_dataset
+
+
+def test_seed_dataset(client: TestClient, session_maker: async_sessionmaker) -> None:
+    """Тест по проверке загрузки синтетических данных рядом с тестовыми."""
+
+    expected = client.get("/api/users/me", headers={"api-key": "test"}).json()
+    config = DatasetConfig(users=10, avg_follows=3, tweets_per_user=2)
+
+    counts = asyncio.run(seed_dataset(session_maker, config, batch_size=4))
+    assert counts["users"] == 10
+    assert counts["follows"] == len(list(generate_follows(config)))
+    assert counts["tweets"] == 20
+
+    response = client.get("/api/users/me", headers={"api-key": "bench1"})
+    user = response.json()["user"]
+    assert user["id"] == 5
+    assert user["name"] == "user1"
+    assert all(follower["id"] > 4 for follower in user["followers"])
+
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.json() == expected
+
+
+def test_import_csv(session_maker: async_sessionmaker, tmp_path) -> None:
+    """Тест по проверке загрузки строк из CSV-файлов."""
+
+    (tmp_path / "users.csv").write_text("id,name\n1,Anna\n2,Boris\n")
+    (tmp_path / "follows.csv").write_text(
+        "follower_user_id,following_user_id\n1,2\n2,1\n"
+    )
+    (tmp_path / "tweets.csv").write_text(
+        'id,content,date_time,author_id\n1,"hello, world",2024-01-01 10:00:00,2\n'
+    )
+
+    async def import_csv() -> None:
+        tables = [
+            (model, *bulk.read_csv(model, str(tmp_path / f"{model.__tablename__}.csv")))
+            for model in (models.User, models.Follow, models.Tweet)
+        ]
+        async with session_maker() as db:
+            counts = await bulk.load_tables(db, tables, batch_size=1)
+            assert counts == {"users": 2, "follows": 2, "tweets": 1}
+
+            result = await db.execute(
+                select(models.Tweet.author_id, models.Tweet.content).where(
+                    models.Tweet.id == 6
+                )
+            )
+            assert result.one() == (6, "hello, world")
+
+            result = await db.execute(
+                select(func.count()).where(
+                    models.Follow.follower_user_id == 5,
+                    models.Follow.following_user_id == 6,
+                )
+            )
+            assert result.scalar() == 1
+
+    asyncio.run(import_csv())
+
+
+def test_import_csv_rerun(
+    session_maker: async_sessionmaker, tmp_path, monkeypatch
+) -> None:
+    """Тест по проверке пропуска повторной загрузки CSV-файлов."""
+
+    monkeypatch.setattr(create_users, "async_session", session_maker)
+    (tmp_path / "users.csv").write_text("id,name\n1,Anna\n2,Boris\n")
+    (tmp_path / "api_keys.csv").write_text("id,api_key,user_id\n1,anna,1\n2,boris,2\n")
+
+    async def count_users() -> int:
+        async with session_maker() as db:
+            return (await db.execute(select(func.count(models.User.id)))).scalar()
+
+    for _ in range(2):
+        asyncio.run(create_users.import_csv(str(tmp_path), batch_size=10))
+        assert asyncio.run(count_users()) == 6
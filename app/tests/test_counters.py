@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+from typing import Dict
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from counters import recount_counters
+from database import models
+
+
+async def get_counters(session_maker: async_sessionmaker) -> Dict:
+    """Корутина для получения всех счётчиков из тестовой БД."""
+
+    async with session_maker() as db:
+        users = await db.execute(
+            select(
+                models.User.id,
+                models.User.follower_count,
+                models.User.following_count,
+                models.User.tweet_count,
+            ).order_by(models.User.id)
+        )
+        tweets = await db.execute(
+            select(models.Tweet.id, models.Tweet.like_count).order_by(models.Tweet.id)
+        )
+        return {
+            "users": [tuple(row) for row in users],
+            "tweets": [tuple(row) for row in tweets],
+        }
+
+
+async def run_recount(session_maker: async_sessionmaker) -> None:
+    """Корутина для пересчёта счётчиков в тестовой БД."""
+
+    async with session_maker() as db:
+        await recount_counters(db, batch_size=2)
+
+
+def test_counters_consistent_with_endpoints(
+    client: TestClient, session_maker: async_sessionmaker
+) -> None:
+    """Тест по проверке совпадения счётчиков endpoint-ов с пересчитанными."""
+
+    response = client.post(
+        "/api/tweets", json={"tweet_data": "new tweet"}, headers={"api-key": "test"}
+    )
+    tweet_id = response.json()["tweet_id"]
+    client.post(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "test2"})
+    client.post("/api/tweets/1/likes", headers={"api-key": "test2"})
+    client.delete("/api/tweets/1/likes", headers={"api-key": "test"})
+    client.post("/api/users/4/follow", headers={"api-key": "test"})
+    client.delete("/api/users/2/follow", headers={"api-key": "test"})
+    client.delete("/api/tweets/4", headers={"api-key": "test"})
+    client.post(
+        "/api/tweets/likes/batch", json={"ids": [1, 2, 3]}, headers={"api-key": "test"}
+    )
+    client.post(
+        "/api/users/follow/batch", json={"ids": [2, 4]}, headers={"api-key": "test3"}
+    )
+
+    counters = asyncio.run(get_counters(session_maker))
+    asyncio.run(run_recount(session_maker))
+    assert asyncio.run(get_counters(session_maker)) == counters
+
+    user = client.get("/api/users/me", headers={"api-key": "test"}).json()["user"]
+    assert user["followers_count"] == 2
+    assert user["following_count"] == 2
+    assert user["tweets_count"] == 1
+
+
+def test_recount_counters(session_maker: async_sessionmaker) -> None:
+    """Тест по проверке восстановления испорченных счётчиков."""
+
+    async def break_counters() -> None:
+        async with session_maker.begin() as db:
+            await db.execute(update(models.Tweet).values(like_count=100))
+            await db.execute(update(models.User).values(follower_count=-1))
+
+    counters = asyncio.run(get_counters(session_maker))
+    asyncio.run(break_counters())
+    assert asyncio.run(get_counters(session_maker)) != counters
+
+    asyncio.run(run_recount(session_maker))
+    assert asyncio.run(get_counters(session_maker)) == counters
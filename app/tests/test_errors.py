@@ -1,5 +1,15 @@
+import io
+import os
+import sys
+from typing import Iterator
+
 from fastapi.testclient import TestClient
 
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from config import settings
+
 
 def test_validation_create_tweet(client: TestClient) -> None:
     """Тест по проверке валидации endpoint '/api/tweets', метод post."""
@@ -25,6 +35,18 @@ def test_validation_create_tweet(client: TestClient) -> None:
     assert response.status_code == 422
 
 
+def test_errors_invalid_api_key(client: TestClient) -> None:
+    """Тест по проверке ошибки при запросе с несуществующим api-key."""
+
+    response = client.get("/api/tweets", headers={"api-key": "unknown"})
+    assert response.json() == {
+        "result": False,
+        "error_type": "PermissionError",
+        "error_message": "Invalid api-key",
+    }
+    assert response.status_code == 401
+
+
 def test_validation_add_file_media(client: TestClient) -> None:
     """Тест по проверке валидации endpoint '/api/medias', метод post."""
 
@@ -33,6 +55,49 @@ def test_validation_add_file_media(client: TestClient) -> None:
     assert response.status_code == 422
 
 
+def test_errors_add_file_media(client: TestClient, media_dir: str, monkeypatch) -> None:
+    """Тест по проверке ошибок endpoint '/api/medias', метод post."""
+
+    monkeypatch.setattr(settings, "UPLOAD_MAX_SIZE", 10)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4)
+
+    file = ("big_file", io.BytesIO(b"t" * 11))
+    response = client.post("/api/medias", files={"file": file})
+    assert response.json() == {
+        "result": False,
+        "error_type": "ValueError",
+        "error_message": "File is too large",
+    }
+    assert response.status_code == 413
+    assert os.listdir(media_dir) == []
+
+
+def test_errors_add_file_media_body_size(client: TestClient, monkeypatch) -> None:
+    """Тест по проверке ограничения размера тела запроса до разбора multipart."""
+
+    monkeypatch.setattr(settings, "UPLOAD_MAX_SIZE", 100)
+    monkeypatch.setattr(settings, "UPLOAD_MAX_OVERHEAD", 100)
+    error = {
+        "result": False,
+        "error_type": "ValueError",
+        "error_message": "File is too large",
+    }
+
+    response = client.post("/api/medias", files={"file": ("file", b"t" * 300)})
+    assert response.json() == error
+    assert response.status_code == 413
+
+    def chunks() -> Iterator[bytes]:
+        for _ in range(10):
+            yield b"t" * 50
+
+    headers = {"content-type": "multipart/form-data; boundary=x"}
+    response = client.post("/api/medias", content=chunks(), headers=headers)
+    assert "content-length" not in response.request.headers
+    assert response.json() == error
+    assert response.status_code == 413
+
+
 def test_errors_delete_tweet(client: TestClient) -> None:
     """Тест по проверке ошибок endpoint '/api/tweets/{id}', метод delete."""
 
@@ -151,6 +216,46 @@ def test_errors_stop_following(client: TestClient) -> None:
     assert response.status_code == 400
 
 
+def test_errors_get_tweet_feed(client: TestClient) -> None:
+    """Тест по проверке ошибок endpoint '/api/tweets', метод get."""
+
+    response = client.get(
+        "/api/tweets", params={"cursor": "invalid"}, headers={"api-key": "test"}
+    )
+    assert response.json() == {
+        "result": False,
+        "error_type": "ValueError",
+        "error_message": "Invalid cursor",
+    }
+    assert response.status_code == 400
+
+    response = client.get("/api/tweets?limit=0", headers={"api-key": "test"})
+    assert response.json()["detail"][0]["type"] == "greater_than_equal"
+    assert response.status_code == 422
+
+
+def test_errors_search_tweets(client: TestClient) -> None:
+    """Тест по проверке ошибок endpoint '/api/tweets/search', метод get."""
+
+    for params, error_message in (
+        ({"q": "   "}, "Empty search query"),
+        ({"q": "tweet1", "cursor": "invalid"}, "Invalid cursor"),
+    ):
+        response = client.get(
+            "/api/tweets/search", params=params, headers={"api-key": "test"}
+        )
+        assert response.json() == {
+            "result": False,
+            "error_type": "ValueError",
+            "error_message": error_message,
+        }
+        assert response.status_code == 400
+
+    response = client.get("/api/tweets/search", headers={"api-key": "test"})
+    assert response.json()["detail"][0]["type"] == "missing"
+    assert response.status_code == 422
+
+
 def test_errors_get_user_info_about_another(client: TestClient) -> None:
     """Тест по проверке ошибок endpoint '/api/users/me', метод get."""
 
@@ -162,3 +267,20 @@ def test_errors_get_user_info_about_another(client: TestClient) -> None:
         "error_message": "No such user",
     }
     assert response.status_code == 404
+
+    response = client.get("/api/users/2?limit=0", headers={"api-key": "test"})
+    assert response.json()["detail"][0]["type"] == "greater_than_equal"
+    assert response.status_code == 422
+
+
+def test_errors_batch(client: TestClient) -> None:
+    """Тест по проверке ошибок пакетных endpoint-ов, метод post."""
+
+    response = client.post(
+        "/api/tweets/likes/batch", json={"ids": []}, headers={"api-key": "test"}
+    )
+    assert response.json()["detail"][0]["type"] == "too_short"
+    assert response.status_code == 422
+
+    response = client.post("/api/users/follow/batch", json={"ids": [1]})
+    assert response.status_code == 422
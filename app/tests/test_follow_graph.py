@@ -0,0 +1,187 @@
+import asyncio
+import os
+import sys
+from typing import Dict, List, Set
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+import follow_graph
+from database import models
+from follow_graph import FollowGraphIndex, get_checksum, load_follow_graph
+
+HEADERS = {"api-key": "test"}
+
+
+def get_db_followings(session_maker: async_sessionmaker) -> Dict[int, Set[int]]:
+    """Функция для получения подписок всех пользователей из БД."""
+
+    async def get_rows() -> List:
+        async with session_maker() as db:
+            result = await db.execute(
+                select(models.Follow.follower_user_id, models.Follow.following_user_id)
+            )
+            return result.all()
+
+    followings = {user_id: set() for user_id in range(1, 7)}
+    for follower_id, following_id in asyncio.run(get_rows()):
+        followings[follower_id].add(following_id)
+    return followings
+
+
+def assert_graph_matches(graph: follow_graph.FollowGraph, followings: Dict) -> None:
+    """Функция для сверки графа с подписками из БД в обоих направлениях."""
+
+    for user_id, authors in followings.items():
+        assert graph.get_followings(user_id) == sorted(authors)
+        followers = [u for u, users in followings.items() if user_id in users]
+        assert graph.get_followers(user_id) == followers
+        for author_id in followings:
+            assert graph.is_following(user_id, author_id) == (author_id in authors)
+
+
+def test_load_follow_graph(session_maker: async_sessionmaker) -> None:
+    """Тест по проверке загрузки графа подписок и бюджета памяти."""
+
+    async def load(max_bytes: int) -> tuple:
+        async with session_maker() as db:
+            graph = await load_follow_graph(db, max_bytes, batch_size=2)
+            result = await db.execute(get_checksum())
+            return graph, tuple(result.one())
+
+    graph, checksum = asyncio.run(load(1024 * 1024))
+    assert_graph_matches(graph, get_db_followings(session_maker))
+    assert graph.checksum == checksum
+    assert graph.nbytes > 0
+
+    graph, _ = asyncio.run(load(graph.nbytes - 1))
+    assert graph is None
+
+
+def test_follow_graph_changes(session_maker: async_sessionmaker) -> None:
+    """Тест по проверке изменения графа после загрузки."""
+
+    async def load() -> follow_graph.FollowGraph:
+        async with session_maker() as db:
+            return await load_follow_graph(db, 1024 * 1024)
+
+    graph = asyncio.run(load())
+    followings = get_db_followings(session_maker)
+    checksum = graph.checksum
+
+    graph.remove(1, 2)
+    graph.remove(1, 2)
+    graph.add(1, 4)
+    graph.add(1, 4)
+    followings[1] = (followings[1] - {2}) | {4}
+    assert_graph_matches(graph, followings)
+    graph.add(3, 100)
+    assert graph.get_followings(3) == [2, 100]
+    assert graph.get_followers(100) == [3]
+    assert graph.delta_size == 3
+
+    graph.remove(3, 100)
+    graph.remove(1, 4)
+    graph.add(1, 2)
+    assert graph.checksum == checksum
+
+
+def test_follow_graph_check(session_maker: async_sessionmaker) -> None:
+    """Тест по проверке сверки графа с БД и его перезагрузки."""
+
+    index = FollowGraphIndex(session_maker, 1024 * 1024, max_delta=2)
+
+    async def follow_in_db() -> None:
+        async with session_maker.begin() as db:
+            await db.execute(
+                insert(models.Follow).values(follower_user_id=3, following_user_id=4)
+            )
+
+    asyncio.run(index.reload())
+    assert asyncio.run(index.check())
+
+    asyncio.run(follow_in_db())
+    assert not asyncio.run(index.check())
+    asyncio.run(index.reload())
+    assert asyncio.run(index.check())
+    assert index.graph.is_following(3, 4)
+
+    index.add(4, [2])
+    assert not asyncio.run(index.check())
+    assert not index.reload_event.is_set()
+    index.remove(4, 2)
+    assert index.reload_event.is_set()
+
+
+def test_follow_graph_background_start(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Тест по проверке загрузки графа в фоне без ожидания при запуске."""
+
+    index = FollowGraphIndex(session_maker, 1024 * 1024)
+    monkeypatch.setattr(follow_graph, "index", index)
+
+    async def start() -> None:
+        await index.start()
+        assert index.graph is None
+        assert follow_graph.get_followings(1) is None
+
+        async def wait_loaded() -> None:
+            while index.graph is None:
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(wait_loaded(), 5)
+        await index.stop()
+
+    asyncio.run(start())
+    assert follow_graph.get_followings(1) == [2, 3]
+
+
+def test_endpoints_with_follow_graph(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Тест по проверке ленты и профилей при включенном графе подписок."""
+
+    index = FollowGraphIndex(session_maker, 1024 * 1024)
+    asyncio.run(index.reload())
+    monkeypatch.setattr(follow_graph, "index", index)
+
+    client.delete("/api/users/2/follow", headers=HEADERS)
+    client.post("/api/users/follow/batch", json={"ids": [4, 3]}, headers=HEADERS)
+    assert_graph_matches(index.graph, get_db_followings(session_maker))
+
+    responses = [
+        client.get(url, headers=HEADERS).json()
+        for url in ("/api/tweets", "/api/users/me", "/api/users/4")
+    ]
+    assert [u["id"] for u in responses[1]["user"]["following"]] == [3, 4]
+    assert [u["id"] for u in responses[2]["user"]["followers"]] == [1]
+
+    monkeypatch.setattr(follow_graph, "index", None)
+    assert responses == [
+        client.get(url, headers=HEADERS).json()
+        for url in ("/api/tweets", "/api/users/me", "/api/users/4")
+    ]
+
+
+def test_likes_batch_keeps_follow_graph(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Тест по проверке, что лайки не меняют граф подписок."""
+
+    index = FollowGraphIndex(session_maker, 1024 * 1024)
+    asyncio.run(index.reload())
+    monkeypatch.setattr(follow_graph, "index", index)
+    followings = index.graph.get_followings(1)
+
+    client.post("/api/tweets/likes/batch", json={"ids": [1, 2, 3]}, headers=HEADERS)
+    assert index.graph.get_followings(1) == followings
+    assert index.graph.delta_size == 0
+
+    user = client.get("/api/users/me", headers=HEADERS).json()["user"]
+    assert [u["id"] for u in user["following"]] == followings
+    assert 1 not in [u["id"] for u in user["followers"]]
@@ -0,0 +1,80 @@
+import asyncio
+import configparser
+import logging
+import os
+import re
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from config import settings
+from tests.conftest import async_engine
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(?P<queries>\d+) queries", total;dur=[\d.]+'
+)
+
+
+def test_server_timing(client: TestClient, caplog) -> None:
+    """Тест по проверке заголовка Server-Timing и записи запроса в лог."""
+
+    caplog.set_level(logging.INFO, logger="instrumentation")
+    response = client.get("/api/users/2?limit=1", headers={"api-key": "test"})
+
+    match = SERVER_TIMING.fullmatch(response.headers["Server-Timing"])
+    assert match is not None
+    # ETag профиля, пользователь, подписчики и подписки:
+    assert int(match["queries"]) == 4
+
+    record = caplog.records[-1]
+    assert record.levelno == logging.INFO
+    assert record.path == "/api/users/2"
+    assert record.status == 200
+    assert record.queries == 4
+    assert "queries=4" in record.getMessage()
+
+
+def test_query_budget(client: TestClient, caplog, monkeypatch) -> None:
+    """Тест по проверке предупреждения о превышении числа запросов к БД."""
+
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 4)
+    caplog.set_level(logging.INFO, logger="instrumentation")
+
+    client.get("/api/users/2", headers={"api-key": "test"})
+    assert caplog.records[-1].levelno == logging.INFO
+
+    # api-key, ETag ленты, твиты, вложения и лайки:
+    client.get("/api/tweets", headers={"api-key": "test"})
+    assert caplog.records[-1].levelno == logging.WARNING
+
+
+def test_query_start_on_error() -> None:
+    """Тест по проверке очистки времени начала запроса при ошибке."""
+
+    async def execute_invalid() -> list:
+        async with async_engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing_table"))
+            return (await conn.get_raw_connection()).info["query_start"]
+
+    assert asyncio.run(execute_invalid()) == []
+
+
+def test_logging_config() -> None:
+    """Тест по проверке записи лога запросов в JSON-файл, а не только в консоль."""
+
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(settings.LOGGING_CONFIG_PATH)
+    section = next(
+        config[name]
+        for name in config.sections()
+        if config[name].get("qualname") == "instrumentation"
+    )
+    assert "fileHandler" in section["handlers"]
+    assert config["handler_fileHandler"]["formatter"] == "fileFormatter"
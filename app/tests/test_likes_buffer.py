@@ -0,0 +1,232 @@
+import asyncio
+import os
+import sys
+from typing import Any, List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Result, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+import likes_buffer
+from config import settings
+from database import models
+from likes_buffer import LikeBuffer, PendingLike
+
+
+@pytest.fixture
+def buffer(session_maker: async_sessionmaker, monkeypatch) -> LikeBuffer:
+    """Фикстура, включающая буфер лайков без периодической записи."""
+
+    buffer = LikeBuffer(session_maker, max_size=100, interval=60)
+    monkeypatch.setattr(likes_buffer, "buffer", buffer)
+    return buffer
+
+
+def get_likes(client: TestClient, tweet_id: int) -> List[int]:
+    """Функция для получения ID лайкнувших твит пользователей из ленты."""
+
+    response = client.get("/api/tweets", headers={"api-key": "test"})
+    tweet = next(
+        tweet for tweet in response.json()["tweets"] if tweet["id"] == tweet_id
+    )
+    return [like["user_id"] for like in tweet["likes"]]
+
+
+def get_db_likes(session_maker: async_sessionmaker, tweet_id: int) -> List[int]:
+    """Функция для получения ID лайкнувших твит пользователей из БД."""
+
+    async def select_likes() -> List[int]:
+        async with session_maker() as db:
+            result = await db.execute(
+                select(models.Like.user_id)
+                .where(models.Like.tweet_id == tweet_id)
+                .order_by(models.Like.id)
+            )
+            return list(result.scalars())
+
+    return asyncio.run(select_likes())
+
+
+def test_like_buffer(
+    client: TestClient, session_maker: async_sessionmaker, buffer: LikeBuffer
+) -> None:
+    """Тест по проверке отложенной записи лайков и их видимости до записи."""
+
+    etag = client.get("/api/tweets", headers={"api-key": "test"}).headers["ETag"]
+    response = client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 201
+    assert get_likes(client, 1) == [2, 1]
+    assert get_db_likes(session_maker, 1) == [2]
+
+    # ETag учитывает только состояние БД и меняется после записи буфера:
+    headers = {"api-key": "test", "If-None-Match": etag}
+    assert client.get("/api/tweets", headers=headers).status_code == 304
+
+    response = client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 400
+
+    response = client.delete("/api/tweets/3/likes", headers={"api-key": "test"})
+    assert response.status_code == 200
+    assert get_likes(client, 3) == []
+    assert get_db_likes(session_maker, 3) == [1]
+
+    asyncio.run(buffer.flush())
+    assert buffer.store.pending == {}
+    assert get_db_likes(session_maker, 1) == [2, 1]
+    assert get_db_likes(session_maker, 3) == []
+    assert get_likes(client, 1) == [2, 1]
+    assert client.get("/api/tweets", headers=headers).status_code == 200
+
+
+def test_like_buffer_collapse(
+    client: TestClient, session_maker: async_sessionmaker, buffer: LikeBuffer
+) -> None:
+    """Тест по проверке схлопывания противоположных операций в последнюю."""
+
+    client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    client.delete("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert buffer.store.pending == {(1, 1): PendingLike(False, "Irina")}
+
+    response = client.delete("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 400
+
+    client.delete("/api/tweets/3/likes", headers={"api-key": "test"})
+    client.post("/api/tweets/3/likes", headers={"api-key": "test"})
+    assert len(buffer.store.pending) == 2
+
+    response = client.post("/api/tweets/100/likes", headers={"api-key": "test"})
+    assert response.status_code == 404
+
+    asyncio.run(buffer.flush())
+    assert get_db_likes(session_maker, 1) == [2]
+    assert get_db_likes(session_maker, 3) == [1]
+    assert get_likes(client, 3) == [1]
+
+
+def test_like_buffer_shared_store(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Тест по проверке лайка и его снятия, принятых разными процессами."""
+
+    monkeypatch.setattr(settings, "LIKE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(likes_buffer, "shared_store", None)
+    likes_buffer.start_shared_store()
+    store = likes_buffer.shared_store
+    buffers = [
+        LikeBuffer(session_maker, max_size=100, interval=60, store=store)
+        for _ in range(2)
+    ]
+
+    monkeypatch.setattr(likes_buffer, "buffer", buffers[0])
+    response = client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 201
+
+    monkeypatch.setattr(likes_buffer, "buffer", buffers[1])
+    assert get_likes(client, 1) == [2, 1]
+    response = client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 400
+    response = client.delete("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 200
+
+    assert store.take("other") == {(1, 1): PendingLike(False, "Irina")}
+    assert asyncio.run(buffers[0].flush()) is False
+    store.done("other", False)
+    assert asyncio.run(buffers[0].flush()) is True
+    assert get_db_likes(session_maker, 1) == [2]
+
+
+def test_like_state_flushed_during_read(
+    session_maker: async_sessionmaker, buffer: LikeBuffer
+) -> None:
+    """Тест по проверке состояния лайка, записанного в БД во время чтения."""
+
+    class FlushDuringRead:
+        """Сессия, результат запроса которой получен до записи буфера."""
+
+        def __init__(self, db: AsyncSession) -> None:
+            self.db = db
+
+        async def execute(self, query: Any) -> Result:
+            result = (await self.db.execute(query)).freeze()
+            await buffer.flush()
+            return result()
+
+    async def get_state() -> Any:
+        buffer.record(1, 1, True, "Irina")
+        async with session_maker() as db:
+            return await buffer.get_state(FlushDuringRead(db), 1, 1)
+
+    assert asyncio.run(get_state()) == (True, "Irina")
+    assert buffer.store.pending == buffer.store.flushing == {}
+    assert get_db_likes(session_maker, 1) == [2, 1]
+
+
+def test_like_buffer_batch(
+    client: TestClient, session_maker: async_sessionmaker, buffer: LikeBuffer
+) -> None:
+    """Тест по проверке пакетных лайков через буфер после несохранённого снятия."""
+
+    client.delete("/api/tweets/3/likes", headers={"api-key": "test"})
+    response = client.post(
+        "/api/tweets/likes/batch",
+        json={"ids": [3, 1, 3, 100]},
+        headers={"api-key": "test"},
+    )
+    assert [item["status"] for item in response.json()["results"]] == [
+        "created",
+        "created",
+        "not_found",
+    ]
+    assert get_likes(client, 3) == [1]
+
+    response = client.post(
+        "/api/tweets/likes/batch", json={"ids": [1, 3]}, headers={"api-key": "test"}
+    )
+    assert [item["status"] for item in response.json()["results"]] == [
+        "exists",
+        "exists",
+    ]
+
+    asyncio.run(buffer.flush())
+    assert get_db_likes(session_maker, 3) == [1]
+    assert get_db_likes(session_maker, 1) == [2, 1]
+
+    async def get_like_counts() -> List[int]:
+        async with session_maker() as db:
+            result = await db.execute(
+                select(models.Tweet.like_count)
+                .where(models.Tweet.id.in_([1, 3]))
+                .order_by(models.Tweet.id)
+            )
+            return list(result.scalars())
+
+    assert asyncio.run(get_like_counts()) == [2, 1]
+
+
+def test_like_buffer_drain_on_stop(
+    session_maker: async_sessionmaker, buffer: LikeBuffer
+) -> None:
+    """Тест по проверке записи остатка буфера и счётчиков при остановке."""
+
+    async def record_and_stop() -> None:
+        buffer.start()
+        buffer.record(2, 1, True, "Irina")
+        buffer.record(2, 3, False, "Olga")
+        await buffer.stop()
+
+    asyncio.run(record_and_stop())
+    assert buffer.task is None
+    assert get_db_likes(session_maker, 2) == [1]
+
+    async def get_like_count() -> int:
+        async with session_maker() as db:
+            result = await db.execute(
+                select(models.Tweet.like_count).where(models.Tweet.id == 2)
+            )
+            return result.scalar()
+
+    assert asyncio.run(get_like_count()) == 1
@@ -0,0 +1,117 @@
+import io
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Generator
+
+import pytest
+from prometheus_client import REGISTRY
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from config import settings
+
+sys.path.append(settings.LOGGING_DIR)
+import log_pipeline
+from log_pipeline import BatchQueueHandler
+from logging_adapter import JsonAdapter, JsonFormatter
+
+
+def get_sample(name: str, level: str) -> float:
+    """Функция для получения текущего значения метрики лога по уровню."""
+
+    return REGISTRY.get_sample_value(name, {"level": level}) or 0
+
+
+class BlockingStream(io.StringIO):
+    """Поток вывода, запись в который ждёт разрешения."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writing = threading.Event()
+        self.allowed = threading.Event()
+
+    def write(self, text: str) -> int:
+        self.writing.set()
+        self.allowed.wait()
+        return super().write(text)
+
+
+@pytest.fixture
+def logger() -> Generator:
+    """Фикстура с отдельным логгером без родительских обработчиков."""
+
+    logger = logging.getLogger("tests.log_pipeline")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger
+    logger.handlers.clear()
+
+
+def test_json_lines(logger: logging.Logger) -> None:
+    """Тест по проверке записи логов в JSON из фонового потока."""
+
+    stream = io.StringIO()
+    handler = BatchQueueHandler(stream, batch_size=2)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+
+    adapter = JsonAdapter(logger, {})
+    adapter.info('say "hi"', fields={"path": "/api/tweets", "queries": 3})
+    for number in range(4):
+        logger.debug("record %s", number)
+    handler.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 5
+    assert lines[0]["message"] == 'say "hi" path=/api/tweets queries=3'
+    assert lines[0]["path"] == "/api/tweets"
+    assert lines[0]["queries"] == 3
+    assert lines[0]["levelname"] == "INFO"
+    assert [line["message"] for line in lines[1:]] == [
+        f"record {number}" for number in range(4)
+    ]
+
+
+def test_drop_on_full_queue(logger: logging.Logger) -> None:
+    """Тест по проверке отбрасывания записей без ожидания при переполнении очереди."""
+
+    stream = BlockingStream()
+    handler = BatchQueueHandler(stream, maxsize=2, batch_size=1)
+    logger.addHandler(handler)
+    dropped = get_sample("microblog_log_records_dropped_total", "WARNING")
+
+    logger.warning("first")
+    assert stream.writing.wait(5)
+    for number in range(5):
+        logger.warning("queued %s", number)
+    assert get_sample("microblog_log_records_dropped_total", "WARNING") == dropped + 3
+
+    stream.allowed.set()
+    handler.close()
+    assert stream.getvalue().splitlines() == ["first", "queued 0", "queued 1"]
+
+
+def test_sampling(logger: logging.Logger, monkeypatch) -> None:
+    """Тест по проверке выборочной записи по логгеру и уровню."""
+
+    stream = io.StringIO()
+    handler = BatchQueueHandler(
+        stream, sampling={"tests.log_pipeline": {"INFO": 0, "DEBUG": 0.5}}
+    )
+    logger.addHandler(handler)
+    sampled_out = get_sample("microblog_log_records_sampled_out_total", "INFO")
+    monkeypatch.setattr(log_pipeline.random, "random", lambda: 0.4)
+
+    logger.info("info")
+    logger.debug("debug")
+    logger.warning("warning")
+    handler.close()
+
+    assert stream.getvalue().splitlines() == ["debug", "warning"]
+    assert (
+        get_sample("microblog_log_records_sampled_out_total", "INFO") == sampled_out + 1
+    )
@@ -1,13 +1,21 @@
+import asyncio
+import hashlib
 import io
 import os
 import sys
+import time
 
 from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
 sys.path.append(PARENT_DIR)
 
+import common
+from config import settings
+from database import models
 from schemas import ResultAddMedia, ResultCreateTweet, ResultSuccess
 
 
@@ -39,14 +47,25 @@ def test_create_tweet(client: TestClient) -> None:
     assert response.status_code == 201
 
 
-def test_add_file_media(client: TestClient) -> None:
+def test_add_file_media(client: TestClient, media_dir: str) -> None:
     """Тест по проверке endpoint '/api/medias', добавление нового файла, метод post."""
 
-    file = ("test_file", io.BytesIO())
+    file = ("test_file", io.BytesIO(b"test content"))
     response = client.post("/api/medias", files={"file": file})
     correct_response = jsonable_encoder(ResultAddMedia(media_id=4))
     assert response.json() == correct_response
     assert response.status_code == 201
+    content_hash = hashlib.sha256(b"test content").hexdigest()
+    link = os.path.join(media_dir, content_hash[:2], content_hash[2:4], content_hash)
+    with open(link, "rb") as saved_file:
+        assert saved_file.read() == b"test content"
+
+    file = ("other_name", io.BytesIO(b"test content"))
+    response = client.post("/api/medias", files={"file": file})
+    correct_response = jsonable_encoder(ResultAddMedia(media_id=5))
+    assert response.json() == correct_response
+    assert response.status_code == 201
+    assert [files for _, _, files in os.walk(media_dir)] == [[], [], [content_hash]]
 
 
 def test_delete_tweet(client: TestClient) -> None:
@@ -107,6 +126,51 @@ def test_stop_following(client: TestClient) -> None:
     client.post(f"/api/users/{user_id}/follow")
 
 
+def test_add_likes_batch(client: TestClient) -> None:
+    """Тест по проверке endpoint '/api/tweets/likes/batch', метод post."""
+
+    body = {"ids": [1, 3, 100, 1]}
+    response = client.post(
+        "/api/tweets/likes/batch", json=body, headers={"api-key": "test"}
+    )
+    assert response.json() == {
+        "result": True,
+        "results": [
+            {"id": 1, "status": "created"},
+            {"id": 3, "status": "exists"},
+            {"id": 100, "status": "not_found"},
+        ],
+    }
+    assert response.status_code == 200
+
+    response = client.get("/api/tweets", headers={"api-key": "test"})
+    tweet = next(tweet for tweet in response.json()["tweets"] if tweet["id"] == 1)
+    assert {"user_id": 1, "name": "Irina"} in tweet["likes"]
+
+
+def test_start_following_batch(client: TestClient) -> None:
+    """Тест по проверке endpoint '/api/users/follow/batch', метод post."""
+
+    body = {"ids": [4, 2, 100]}
+    response = client.post(
+        "/api/users/follow/batch", json=body, headers={"api-key": "test"}
+    )
+    assert response.json() == {
+        "result": True,
+        "results": [
+            {"id": 4, "status": "created"},
+            {"id": 2, "status": "exists"},
+            {"id": 100, "status": "not_found"},
+        ],
+    }
+    assert response.status_code == 200
+
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    user = response.json()["user"]
+    assert [following["id"] for following in user["following"]] == [2, 3, 4]
+    assert user["following_count"] == 3
+
+
 def test_get_tweet_feed(client: TestClient) -> None:
     """Тест по проверке endpoint '/api/tweets', лента твитов, метод get."""
 
@@ -118,6 +182,7 @@ def test_get_tweet_feed(client: TestClient) -> None:
                 "id": 4,
                 "content": "tweet4",
                 "attachments": [],
+                "attachment_variants": [],
                 "author": {"id": 1, "name": "Irina"},
                 "likes": [
                     {"user_id": 1, "name": "Irina"},
@@ -128,6 +193,7 @@ def test_get_tweet_feed(client: TestClient) -> None:
                 "id": 3,
                 "content": "tweet3",
                 "attachments": [],
+                "attachment_variants": [],
                 "author": {"id": 3, "name": "Olga"},
                 "likes": [{"user_id": 1, "name": "Irina"}],
             },
@@ -135,6 +201,7 @@ def test_get_tweet_feed(client: TestClient) -> None:
                 "id": 2,
                 "content": "tweet2",
                 "attachments": ["link3"],
+                "attachment_variants": [{}],
                 "author": {"id": 3, "name": "Olga"},
                 "likes": [{"user_id": 3, "name": "Olga"}],
             },
@@ -142,6 +209,7 @@ def test_get_tweet_feed(client: TestClient) -> None:
                 "id": 1,
                 "content": "tweet1",
                 "attachments": ["link1", "link2"],
+                "attachment_variants": [{}, {}],
                 "author": {"id": 2, "name": "Alex"},
                 "likes": [{"user_id": 2, "name": "Alex"}],
             },
@@ -151,6 +219,26 @@ def test_get_tweet_feed(client: TestClient) -> None:
     assert response.status_code == 200
 
 
+def test_get_tweet_feed_pagination(client: TestClient) -> None:
+    """Тест по проверке постраничного вывода ленты твитов, метод get."""
+
+    response = client.get("/api/tweets?limit=3", headers={"api-key": "test"})
+    first_page = response.json()
+    assert [tweet["id"] for tweet in first_page["tweets"]] == [4, 3, 2]
+    assert first_page["next_cursor"]
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/tweets",
+        params={"limit": 3, "cursor": first_page["next_cursor"]},
+        headers={"api-key": "test"},
+    )
+    second_page = response.json()
+    assert [tweet["id"] for tweet in second_page["tweets"]] == [1]
+    assert "next_cursor" not in second_page
+    assert response.status_code == 200
+
+
 def test_get_user_info_about_self(client: TestClient) -> None:
     """Тест по проверке endpoint '/api/users/me', информация о себе, метод get."""
 
@@ -162,6 +250,9 @@ def test_get_user_info_about_self(client: TestClient) -> None:
             "name": "Irina",
             "followers": [{"id": 2, "name": "Alex"}, {"id": 4, "name": "John"}],
             "following": [{"id": 2, "name": "Alex"}, {"id": 3, "name": "Olga"}],
+            "followers_count": 2,
+            "following_count": 2,
+            "tweets_count": 1,
         },
     }
     assert response.json() == correct_response
@@ -180,7 +271,160 @@ def test_get_user_info_about_another(client: TestClient) -> None:
             "name": "Alex",
             "followers": [{"id": 1, "name": "Irina"}, {"id": 3, "name": "Olga"}],
             "following": [{"id": 1, "name": "Irina"}, {"id": 3, "name": "Olga"}],
+            "followers_count": 2,
+            "following_count": 2,
+            "tweets_count": 1,
+        },
+    }
+    assert response.json() == correct_response
+    assert response.status_code == 200
+
+
+def test_get_user_info_with_limit(client: TestClient) -> None:
+    """Тест по проверке ограничения списков подписок и подписчиков в профиле."""
+
+    response = client.get("/api/users/me?limit=1", headers={"api-key": "test"})
+    correct_response = {
+        "result": True,
+        "user": {
+            "id": 1,
+            "name": "Irina",
+            "followers": [{"id": 2, "name": "Alex"}],
+            "following": [{"id": 2, "name": "Alex"}],
+            "followers_count": 2,
+            "following_count": 2,
+            "tweets_count": 1,
         },
     }
     assert response.json() == correct_response
     assert response.status_code == 200
+
+
+def test_api_key_cache_ttl(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Тест по проверке смены владельца api-key после истечения TTL кэша."""
+
+    now = [time.monotonic()]
+    monkeypatch.setattr(common.api_keys_cache, "clock", lambda: now[0])
+
+    async def change_api_key_owner() -> None:
+        async with session_maker.begin() as session:
+            await session.execute(
+                update(models.UserApiKey)
+                .where(models.UserApiKey.api_key == "test")
+                .values(user_id=2)
+            )
+
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.json()["user"]["id"] == 1
+
+    asyncio.run(change_api_key_owner())
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.json()["user"]["id"] == 1
+
+    now[0] += settings.API_KEY_CACHE_TTL + 1
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.json()["user"]["id"] == 2
+
+
+def test_invalidate_api_key(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Тест по проверке отзыва api-key в кэшах всех процессов."""
+
+    now = [time.monotonic()]
+    monkeypatch.setattr(common.api_keys_cache, "clock", lambda: now[0])
+
+    async def revoke_api_key() -> None:
+        async with session_maker.begin() as session:
+            await session.execute(
+                delete(models.UserApiKey).where(models.UserApiKey.api_key == "test")
+            )
+            await common.invalidate_api_key(session, "test")
+
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.json()["user"]["id"] == 1
+
+    asyncio.run(revoke_api_key())
+    assert common.api_keys_cache.get("test") is None
+    # кэш другого процесса, в котором ключ ещё не сброшен:
+    common.api_keys_cache.set("test", 1)
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.json()["user"]["id"] == 1
+
+    now[0] += settings.API_KEY_CACHE_CHECK_INTERVAL
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    assert response.status_code == 401
+
+
+def test_get_tweet_feed_not_modified(
+    client: TestClient, session_maker: async_sessionmaker
+) -> None:
+    """Тест по проверке условного запроса ленты твитов по ETag."""
+
+    response = client.get("/api/tweets", headers={"api-key": "test"})
+    etag = response.headers["ETag"]
+
+    headers = {"api-key": "test", "If-None-Match": etag}
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = client.get("/api/tweets?limit=2", headers=headers)
+    assert response.status_code == 200
+
+    client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    response = client.get("/api/tweets", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    async def get_versions() -> tuple:
+        async with session_maker() as session:
+            result = await session.execute(
+                select(models.Tweet.version, models.User.content_version)
+                .join(models.User, models.User.id == models.Tweet.author_id)
+                .where(models.Tweet.id == 1)
+            )
+            return tuple(result.one())
+
+    # лайк меняет версию твита, а не версию твитов автора:
+    assert asyncio.run(get_versions()) == (1, 0)
+
+
+def test_get_user_info_not_modified(client: TestClient) -> None:
+    """Тест по проверке условного запроса информации о пользователе по ETag."""
+
+    response = client.get("/api/users/me", headers={"api-key": "test"})
+    etag = response.headers["ETag"]
+
+    headers = {"api-key": "test", "If-None-Match": etag}
+    response = client.get("/api/users/me", headers=headers)
+    assert response.status_code == 304
+
+    response = client.get("/api/users/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/api/users/4/follow", headers={"api-key": "test"})
+    response = client.get("/api/users/me", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_tweet_feed_fast_serialization(client: TestClient, monkeypatch) -> None:
+    """Тест по проверке совпадения быстрой сериализации ленты со схемой."""
+
+    body = {"tweet_data": 'текст "в кавычках" \\ \n \x01 \U0001f600'}
+    client.post("/api/tweets", json=body, headers={"api-key": "test"})
+
+    # Server-Timing различается от запроса к запросу:
+    monkeypatch.setattr(settings, "INSTRUMENTATION_ENABLED", False)
+
+    for url in ("/api/tweets", "/api/tweets?limit=2"):
+        monkeypatch.setattr(settings, "FEED_FAST_SERIALIZATION", True)
+        fast_response = client.get(url, headers={"api-key": "test"})
+        monkeypatch.setattr(settings, "FEED_FAST_SERIALIZATION", False)
+        response = client.get(url, headers={"api-key": "test"})
+
+        assert fast_response.content == response.content
+        assert fast_response.headers == response.headers
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import os
+import sys
+from typing import List, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+import routes
+from config import settings
+from database import models
+from media import generate_variants, get_extension, make_variants
+
+
+def create_image(width: int, height: int) -> bytes:
+    """Функция для создания тестового изображения в формате PNG."""
+
+    content = io.BytesIO()
+    Image.new("RGB", (width, height), color="red").save(content, "PNG")
+    return content.getvalue()
+
+
+def test_make_variants(media_dir: str) -> None:
+    """Тест по проверке создания уменьшенных копий изображения."""
+
+    with open(os.path.join(media_dir, "image.png"), "wb") as image_file:
+        image_file.write(create_image(400, 200))
+    with open(os.path.join(media_dir, "text"), "wb") as text_file:
+        text_file.write(b"not an image")
+
+    variants = make_variants(media_dir, "image.png", {"thumbnail": 100}, 80)
+    assert variants == {"thumbnail": "image_thumbnail.webp"}
+    with Image.open(os.path.join(media_dir, "image_thumbnail.webp")) as thumbnail:
+        assert thumbnail.size == (100, 50)
+
+    assert make_variants(media_dir, "text", {"thumbnail": 100}, 80) == {}
+
+
+def test_generate_variants(
+    client: TestClient, session_maker: async_sessionmaker
+) -> None:
+    """Тест по проверке вывода уменьшенных копий вложений в ленте."""
+
+    file = ("image.png", io.BytesIO(create_image(2000, 1000)))
+    media_id = client.post("/api/medias", files={"file": file}).json()["media_id"]
+    body = {"tweet_data": "tweet with image", "tweet_media_ids": [media_id]}
+    client.post("/api/tweets", json=body, headers={"api-key": "test"})
+
+    tweet = client.get("/api/tweets", headers={"api-key": "test"}).json()["tweets"][0]
+    assert tweet["attachment_variants"] == [{}]
+
+    link = tweet["attachments"][0]
+    media_path = os.path.relpath(link, settings.MEDIA_PATH)
+    content_hash = os.path.splitext(os.path.basename(link))[0]
+    asyncio.run(
+        generate_variants(content_hash, media_path, session_maker=session_maker)
+    )
+
+    tweet = client.get("/api/tweets", headers={"api-key": "test"}).json()["tweets"][0]
+    base_link = os.path.splitext(link)[0]
+    assert tweet["attachment_variants"] == [
+        {"thumbnail": f"{base_link}_thumbnail.webp", "web": f"{base_link}_web.webp"}
+    ]
+    with Image.open(
+        os.path.join(settings.MEDIA_DIR, f"{os.path.splitext(media_path)[0]}_web.webp")
+    ) as web_image:
+        assert web_image.size == (settings.MEDIA_WEB_SIZE, settings.MEDIA_WEB_SIZE // 2)
+
+
+def test_upload_dedup_copies_variants(
+    client: TestClient,
+    session_maker: async_sessionmaker,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Тест по проверке копирования уменьшенных копий при повторной загрузке."""
+
+    scheduled: List[Tuple[str, str]] = []
+    monkeypatch.setattr(
+        routes, "schedule_variants", lambda *args: scheduled.append(args)
+    )
+
+    image = create_image(2000, 1000)
+    files = {"file": ("image.png", io.BytesIO(image))}
+    first_id = client.post("/api/medias", files=files).json()["media_id"]
+    assert len(scheduled) == 1
+
+    content_hash, media_path = scheduled[0]
+    asyncio.run(
+        generate_variants(content_hash, media_path, session_maker=session_maker)
+    )
+
+    files = {"file": ("copy.png", io.BytesIO(image))}
+    second_id = client.post("/api/medias", files=files).json()["media_id"]
+    assert len(scheduled) == 1
+
+    async def get_variants(media_id: int) -> dict:
+        async with session_maker() as db:
+            query = select(models.Attachment.variants).where(
+                models.Attachment.id == media_id
+            )
+            return (await db.execute(query)).scalar_one()
+
+    variants = asyncio.run(get_variants(second_id))
+    assert set(variants) == {"thumbnail", "web"}
+    assert variants == asyncio.run(get_variants(first_id))
+
+
+def test_upload_dedup_by_content(client: TestClient, media_dir: str) -> None:
+    """Тест по проверке хранения одинакового содержимого в одном файле."""
+
+    image = create_image(10, 10)
+    for name in ("image.jpg", "image.JPEG", "image.png", "image"):
+        client.post("/api/medias", files={"file": (name, io.BytesIO(image))})
+    files = [name for _, _, names in os.walk(media_dir) for name in names]
+    assert len(files) == 1
+    assert files[0].endswith(".png")
+
+    assert get_extension(b"text", "notes.TXT") == ".txt"
+    assert get_extension(b"text", "notes") == ""
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from metrics import get_registry, instrument_pool
+from tests.conftest import DB_URL
+
+
+def get_sample(name: str, **labels: str) -> float:
+    """Функция для получения текущего значения метрики."""
+
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics(client: TestClient) -> None:
+    """Тест по проверке endpoint '/metrics', метод get."""
+
+    route_labels = {"method": "GET", "route": "/api/users/{id}", "status": "404"}
+    requests = get_sample("microblog_request_duration_seconds_count", **route_labels)
+    errors = get_sample("microblog_errors_total", status_code="404")
+    uploaded = get_sample("microblog_upload_bytes_total")
+
+    client.get("/api/users/100", headers={"api-key": "test"})
+    files = {"file": ("image.jpg", b"content", "image/jpeg")}
+    client.post("/api/medias", files=files, headers={"api-key": "test"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert "microblog_db_pool_checked_out" in response.text
+    assert "/api/users/100" not in response.text
+
+    assert (
+        get_sample("microblog_request_duration_seconds_count", **route_labels)
+        == requests + 1
+    )
+    assert get_sample("microblog_errors_total", status_code="404") == errors + 1
+    assert get_sample("microblog_upload_bytes_total") == uploaded + len(b"content")
+
+
+def test_multiprocess_registry(tmp_path, monkeypatch) -> None:
+    """Тест по проверке сбора метрик из директории процессов."""
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert get_registry() is not REGISTRY
+
+
+def test_pool_metrics() -> None:
+    """Тест по проверке учёта занятых соединений пула при выдаче и возврате."""
+
+    engine = create_async_engine(
+        DB_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=1
+    )
+    instrument_pool(engine)
+
+    async def check_out() -> list:
+        async with engine.connect(), engine.connect():
+            busy = [
+                get_sample("microblog_db_pool_checked_out"),
+                get_sample("microblog_db_pool_overflow"),
+            ]
+        await engine.dispose()
+        return busy
+
+    assert asyncio.run(check_out()) == [2, 1]
+    assert get_sample("microblog_db_pool_checked_out") == 0
+    assert get_sample("microblog_db_pool_overflow") == 0
+
+
+def test_multiprocess_metrics(tmp_path) -> None:
+    """Тест по проверке метрик пула и логов в режиме нескольких процессов."""
+
+    code = (
+        "import metrics, log_pipeline; "
+        "log_pipeline.DROPPED.labels('INFO').inc(); "
+        "metrics.DB_POOL_CHECKED_OUT.set(1); "
+        "from prometheus_client import generate_latest; "
+        "print(generate_latest(metrics.get_registry()).decode())"
+    )
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PARENT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert "microblog_db_pool_checked_out 1.0" in output
+    assert 'microblog_log_records_dropped_total{level="INFO"} 1.0' in output
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+from typing import Generator, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+import common
+from common import ReplicaPool, get_read_session
+from tests.conftest import DB_URL
+
+
+@pytest.fixture
+def replica_pool() -> Generator:
+    """Фикстура с пулом из двух 'реплик' - движков тестовой БД."""
+
+    engines = [
+        create_async_engine(DB_URL, poolclass=AsyncAdaptedQueuePool) for _ in range(2)
+    ]
+    yield ReplicaPool(engines, "round_robin")
+    for engine in engines:
+        asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def sessions(
+    app: FastAPI,
+    session_maker: async_sessionmaker,
+    replica_pool: ReplicaPool,
+    monkeypatch,
+) -> Generator:
+    """
+    Фикстура, включающая реплики для приложения.
+
+    Основная БД и реплики - тестовая БД, возвращается список,
+    в который записывается, откуда читал каждый запрос.
+    """
+
+    sessions: List[str] = []
+    choose = replica_pool.choose
+
+    def choose_replica() -> async_sessionmaker:
+        sessions.append("replica")
+        return choose()
+
+    def primary_session() -> async_sessionmaker:
+        sessions.append("primary")
+        return session_maker()
+
+    monkeypatch.setattr(replica_pool, "choose", choose_replica)
+    monkeypatch.setattr(common, "replica_pool", replica_pool)
+    monkeypatch.setattr(common, "async_session", primary_session)
+    monkeypatch.delitem(app.dependency_overrides, get_read_session)
+    yield sessions
+
+
+def test_replica_pool_round_robin(replica_pool: ReplicaPool) -> None:
+    """Тест по проверке выбора реплик по очереди."""
+
+    chosen = [replica_pool.choose() for _ in range(4)]
+    assert chosen == replica_pool.session_makers * 2
+
+
+def test_replica_pool_least_busy(replica_pool: ReplicaPool) -> None:
+    """Тест по проверке выбора наименее загруженной реплики."""
+
+    replica_pool.strategy = "least_busy"
+
+    async def choose_while_busy() -> List[async_sessionmaker]:
+        async with replica_pool.engines[0].connect():
+            return [replica_pool.choose() for _ in range(3)]
+
+    assert asyncio.run(choose_while_busy()) == [replica_pool.session_makers[1]] * 3
+    assert replica_pool.choose() != replica_pool.choose()
+
+
+def test_read_your_writes(
+    app: FastAPI, client: TestClient, sessions: List[str], monkeypatch
+) -> None:
+    """Тест по проверке чтения из основной БД после изменения данных."""
+
+    response = client.get("/api/tweets", headers={"api-key": "test"})
+    assert response.status_code == 200
+    response = client.get("/api/users/2")
+    assert response.status_code == 200
+    assert sessions == ["replica", "replica"]
+
+    response = client.post("/api/tweets/1/likes", headers={"api-key": "unknown"})
+    assert response.status_code == 401
+    assert common.LAST_WRITE_COOKIE not in response.cookies
+
+    response = client.post("/api/tweets/1/likes", headers={"api-key": "test"})
+    assert response.status_code == 201
+    last_write = response.cookies[common.LAST_WRITE_COOKIE]
+    sessions.clear()
+
+    # следующий запрос может попасть в другой процесс, окно передаётся в cookie:
+    other_client = TestClient(app, cookies={common.LAST_WRITE_COOKIE: last_write})
+    other_client.get("/api/tweets", headers={"api-key": "test"})
+    client.get("/api/users/me", headers={"api-key": "test"})
+    TestClient(app).get("/api/tweets", headers={"api-key": "test"})
+    assert sessions == ["primary", "primary", "replica"]
+
+    window = common.settings.DB_READ_YOUR_WRITES_WINDOW
+    monkeypatch.setattr(common.time, "time", lambda: float(last_write) + window)
+    sessions.clear()
+    client.get("/api/tweets", headers={"api-key": "test"})
+    assert sessions == ["replica"]
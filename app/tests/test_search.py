@@ -0,0 +1,81 @@
+import os
+import sys
+from typing import List
+
+from fastapi.testclient import TestClient
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+HEADERS = {"api-key": "test"}
+
+
+def create_tweets(client: TestClient, contents: List[str]) -> List[int]:
+    """Функция для создания твитов, возвращает их ID."""
+
+    return [
+        client.post(
+            "/api/tweets", json={"tweet_data": content}, headers=HEADERS
+        ).json()["tweet_id"]
+        for content in contents
+    ]
+
+
+def search(client: TestClient, **params) -> dict:
+    """Функция для поиска твитов."""
+
+    response = client.get("/api/tweets/search", params=params, headers=HEADERS)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_search_tweets(client: TestClient) -> None:
+    """Тест по проверке endpoint '/api/tweets/search', метод get."""
+
+    relevant, recent, other = create_tweets(
+        client,
+        [
+            "Кофе, кофе и ещё раз КОФЕ",
+            "Утренний кофе с молоком",
+            "Чай с молоком",
+        ],
+    )
+
+    response = search(client, q="кофе")
+    assert [tweet["id"] for tweet in response["tweets"]] == [relevant, recent]
+    assert response["tweets"][0]["author"] == {"name": "Irina", "id": 1}
+    assert "next_cursor" not in response
+
+    response = search(client, q="кофе", order="recent")
+    assert [tweet["id"] for tweet in response["tweets"]] == [recent, relevant]
+
+    response = search(client, q="молоком кофе")
+    assert [tweet["id"] for tweet in response["tweets"]] == [recent]
+
+    response = search(client, q='"tweet1" OR *')
+    assert response["tweets"] == []
+
+    response = search(client, q="tweet1")
+    assert response["tweets"][0]["attachments"] == ["link1", "link2"]
+    assert response["tweets"][0]["likes"] == [{"name": "Alex", "user_id": 2}]
+
+
+def test_search_tweets_pagination(client: TestClient) -> None:
+    """Тест по проверке постраничного поиска твитов."""
+
+    ids = create_tweets(client, [f"новость {number}" for number in range(5)])
+    client.delete(f"/api/tweets/{ids[2]}", headers=HEADERS)
+    expected = [ids[4], ids[3], ids[1], ids[0]]
+
+    for order in ("relevance", "recent"):
+        found, cursor = [], None
+        while True:
+            params = {"q": "новость", "order": order, "limit": 3}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = search(client, **params)
+            found += [tweet["id"] for tweet in response["tweets"]]
+            cursor = response.get("next_cursor")
+            if cursor is None:
+                break
+        assert found == expected
@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import sys
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from config import settings
+from main import (
+    Worker,
+    get_max_requests,
+    get_options,
+    get_workers,
+    on_starting,
+    parse_args,
+)
+
+
+def test_workers(monkeypatch) -> None:
+    """Тест по проверке числа процессов по числу ядер и из настроек."""
+
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 0)
+    assert get_workers() == multiprocessing.cpu_count()
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 3)
+    assert get_workers() == 3
+
+
+def test_options(monkeypatch) -> None:
+    """Тест по проверке настроек gunicorn."""
+
+    monkeypatch.setattr(settings, "SERVER_PORT", 8080)
+    options = get_options()
+    assert options["bind"] == "0.0.0.0:8080"
+    assert options["worker_class"] is Worker
+    assert Worker.CONFIG_KWARGS == {"loop": "uvloop", "http": "httptools"}
+    assert options["preload_app"] is True
+    assert options["max_requests"] == settings.SERVER_MAX_REQUESTS
+    assert options["keepalive"] == settings.SERVER_KEEPALIVE
+    assert options["backlog"] == settings.SERVER_BACKLOG
+    assert options["on_starting"] is on_starting
+
+
+def test_max_requests_with_follow_graph(monkeypatch) -> None:
+    """Тест по проверке отключения перезапуска процессов при графе подписок."""
+
+    monkeypatch.setattr(settings, "FOLLOW_GRAPH_ENABLED", False)
+    assert get_max_requests() == settings.SERVER_MAX_REQUESTS
+    monkeypatch.setattr(settings, "FOLLOW_GRAPH_ENABLED", True)
+    assert get_max_requests() == 0
+    assert get_options()["max_requests"] == 0
+
+
+def test_dev_flag() -> None:
+    """Тест по проверке выбора режима разработки."""
+
+    assert parse_args(["--dev"]).dev is True
+    assert parse_args([]).dev is False
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+from typing import List
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from database import models
+from tags import backfill_tags, parse_mentions, parse_tags
+
+HEADERS = {"api-key": "test"}
+
+
+def create_tweets(client: TestClient, contents: List[str]) -> List[int]:
+    """Функция для создания твитов, возвращает их ID."""
+
+    return [
+        client.post(
+            "/api/tweets", json={"tweet_data": content}, headers=HEADERS
+        ).json()["tweet_id"]
+        for content in contents
+    ]
+
+
+def get_pages(client: TestClient, url: str, limit: int) -> List[int]:
+    """Функция для получения ID твитов всех страниц."""
+
+    found, params = [], {"limit": limit}
+    while True:
+        response = client.get(url, params=params, headers=HEADERS)
+        assert response.status_code == 200
+        found += [tweet["id"] for tweet in response.json()["tweets"]]
+        if "next_cursor" not in response.json():
+            return found
+        params["cursor"] = response.json()["next_cursor"]
+
+
+def test_parse() -> None:
+    """Тест по проверке разбора хэштегов и упоминаний."""
+
+    content = "#Python и #python, #кофе! a#b ##x @Alex @Olga,@Alex mail@host"
+    assert parse_tags(content) == ["python", "кофе"]
+    assert parse_mentions(content) == ["Alex", "Olga"]
+    assert parse_tags("#" + "a" * 101) == []
+
+
+def test_tag_tweets(client: TestClient) -> None:
+    """Тест по проверке endpoint '/api/tags/{tag}/tweets', метод get."""
+
+    ids = create_tweets(
+        client, ["#Кофе утром", "чай #чай", "#кофе и #чай", "#КОФЕ снова"]
+    )
+    client.delete(f"/api/tweets/{ids[3]}", headers=HEADERS)
+
+    assert get_pages(client, "/api/tags/кофе/tweets", 1) == [ids[2], ids[0]]
+    assert get_pages(client, "/api/tags/ЧАЙ/tweets", 5) == [ids[2], ids[1]]
+    assert get_pages(client, "/api/tags/other/tweets", 5) == []
+
+
+def test_user_mentions(client: TestClient) -> None:
+    """Тест по проверке endpoint '/api/users/{id}/mentions', метод get."""
+
+    ids = create_tweets(client, ["@Alex привет", "@Olga и @Alex", "@Nobody", "@alex"])
+
+    assert get_pages(client, "/api/users/2/mentions", 1) == [ids[1], ids[0]]
+    assert get_pages(client, "/api/users/3/mentions", 5) == [ids[1]]
+
+    response = client.get("/api/users/100/mentions", headers=HEADERS)
+    assert response.json()["error_message"] == "No such user"
+    assert response.status_code == 404
+
+
+def test_backfill_tags(client: TestClient, session_maker: async_sessionmaker) -> None:
+    """Тест по проверке заполнения хэштегов и упоминаний существующих твитов."""
+
+    ids = create_tweets(client, [f"#tag{number % 2} @Irina" for number in range(5)])
+
+    async def backfill() -> int:
+        async with session_maker() as db:
+            await db.execute(delete(models.TweetTag))
+            await db.execute(delete(models.Mention))
+            await db.commit()
+            await backfill_tags(db, batch_size=2)
+            await backfill_tags(db, batch_size=2)
+            result = await db.execute(select(func.count(models.TweetTag.id)))
+            return result.scalar()
+
+    assert asyncio.run(backfill()) == 5
+    assert get_pages(client, "/api/tags/tag0/tweets", 2) == ids[4::-2]
+    assert get_pages(client, "/api/users/1/mentions", 2) == ids[::-1]
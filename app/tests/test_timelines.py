@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sys
+from typing import Dict, List, Union
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+PARENT_DIR = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(PARENT_DIR)
+
+from config import settings
+from database import models
+from timelines import backfill_timelines
+
+
+async def run_backfill(session_maker: async_sessionmaker) -> None:
+    """Корутина для заполнения лент в тестовой БД."""
+
+    async with session_maker() as db:
+        await backfill_timelines(db, batch_size=3)
+
+
+def get_feed_ids(client: TestClient) -> List[int]:
+    """Функция для получения ID твитов из ленты пользователя с api-key 'test'."""
+
+    response = client.get("/api/tweets", headers={"api-key": "test"})
+    assert response.status_code == 200
+    return [tweet["id"] for tweet in response.json()["tweets"]]
+
+
+def get_feed_pages(client: TestClient, limit: int) -> List[int]:
+    """Функция для получения ID твитов ленты пользователя 'test' по страницам."""
+
+    found: List[int] = []
+    params: Dict[str, Union[int, str]] = {"limit": limit}
+    while True:
+        response = client.get("/api/tweets", params=params, headers={"api-key": "test"})
+        found += [tweet["id"] for tweet in response.json()["tweets"]]
+        if "next_cursor" not in response.json():
+            return found
+        params["cursor"] = response.json()["next_cursor"]
+
+
+@pytest.fixture
+def timelines_enabled(
+    client: TestClient, session_maker: async_sessionmaker, monkeypatch
+) -> None:
+    """Фикстура, включающая материализованные ленты и заполняющая их."""
+
+    monkeypatch.setattr(settings, "TIMELINE_ENABLED", True)
+    asyncio.run(run_backfill(session_maker))
+
+
+def test_backfill_timelines(client: TestClient, session_maker, monkeypatch) -> None:
+    """Тест по проверке совпадения материализованной ленты с обычной."""
+
+    expected = client.get("/api/tweets", headers={"api-key": "test"}).json()
+
+    monkeypatch.setattr(settings, "TIMELINE_ENABLED", True)
+    assert get_feed_ids(client) == []
+
+    asyncio.run(run_backfill(session_maker))
+    response = client.get("/api/tweets", headers={"api-key": "test"})
+    assert response.json() == expected
+
+
+def test_timeline_fan_out_on_write(client: TestClient, timelines_enabled) -> None:
+    """Тест по проверке обновления лент при изменении твитов и подписок."""
+
+    body = {"tweet_data": "new tweet"}
+    response = client.post("/api/tweets", json=body, headers={"api-key": "test4"})
+    tweet_id = response.json()["tweet_id"]
+    assert get_feed_ids(client) == [tweet_id, 4, 3, 2, 1]
+
+    client.delete(f"/api/tweets/{tweet_id}", headers={"api-key": "test4"})
+    assert get_feed_ids(client) == [4, 3, 2, 1]
+
+    client.delete("/api/users/3/follow", headers={"api-key": "test"})
+    assert get_feed_ids(client) == [4, 1]
+
+    client.post("/api/users/3/follow", headers={"api-key": "test"})
+    assert get_feed_ids(client) == [4, 3, 2, 1]
+
+
+def test_timeline_fan_out_on_read(
+    client: TestClient, timelines_enabled, monkeypatch
+) -> None:
+    """Тест по проверке чтения твитов авторов с большим числом подписчиков."""
+
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT_THRESHOLD", 1)
+
+    body = {"tweet_data": "popular tweet"}
+    response = client.post("/api/tweets", json=body, headers={"api-key": "test4"})
+    tweet_id = response.json()["tweet_id"]
+    assert get_feed_ids(client) == [tweet_id, 4, 3, 2, 1]
+
+
+def test_timeline_trim(
+    client: TestClient,
+    session_maker: async_sessionmaker,
+    timelines_enabled,
+    monkeypatch,
+) -> None:
+    """
+    Тест по проверке ограничения длины материализованной ленты
+    и чтения более старых твитов по подпискам.
+    """
+
+    monkeypatch.setattr(settings, "TIMELINE_MAX_LENGTH", 2)
+    monkeypatch.setattr(settings, "TIMELINE_TRIM_INTERVAL", 1)
+
+    body = {"tweet_data": "new tweet"}
+    response = client.post("/api/tweets", json=body, headers={"api-key": "test4"})
+    tweet_id = response.json()["tweet_id"]
+
+    async def get_timeline_ids() -> List[int]:
+        async with session_maker() as db:
+            query = select(models.TimelineEntry.tweet_id).where(
+                models.TimelineEntry.user_id == 1
+            )
+            return sorted((await db.execute(query)).scalars().all())
+
+    assert asyncio.run(get_timeline_ids()) == [4, tweet_id]
+    assert get_feed_ids(client) == [tweet_id, 4, 3, 2, 1]
+    for limit in (1, 2, 3):
+        assert get_feed_pages(client, limit) == [tweet_id, 4, 3, 2, 1]
+
+
+def test_timeline_pages(client: TestClient, timelines_enabled, monkeypatch) -> None:
+    """Тест по проверке постраничной ленты из материализованной и популярных частей."""
+
+    expected = get_feed_ids(client)
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT_THRESHOLD", 1)
+    for content in ("popular 1", "popular 2"):
+        response = client.post(
+            "/api/tweets", json={"tweet_data": content}, headers={"api-key": "test4"}
+        )
+        expected.insert(0, response.json()["tweet_id"])
+    assert get_feed_ids(client) == expected
+    assert get_feed_pages(client, 2) == expected
+
+
+def test_timeline_author_no_longer_popular(
+    client: TestClient, timelines_enabled, monkeypatch
+) -> None:
+    """Тест по проверке раскладки твитов автора, переставшего быть популярным."""
+
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT_THRESHOLD", 1)
+    body = {"tweet_data": "popular tweet"}
+    response = client.post("/api/tweets", json=body, headers={"api-key": "test4"})
+    tweet_id = response.json()["tweet_id"]
+
+    client.delete("/api/users/2/follow", headers={"api-key": "test2"})
+    assert get_feed_ids(client) == [tweet_id, 4, 3, 2, 1]
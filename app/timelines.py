@@ -0,0 +1,393 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    and_,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    union,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Subquery
+from sqlalchemy.sql.elements import ColumnElement
+
+import follow_graph
+from common import paginate_tweets
+from config import settings
+from database import models
+from database.config import async_session
+
+TIMELINE_COLUMNS = ["user_id", "tweet_id", "author_id", "date_time"]
+
+
+def get_followers_count(author_id: int) -> select:
+    """Функция для получения числа подписчиков автора из счётчика."""
+
+    return select(models.User.follower_count).where(models.User.id == author_id)
+
+
+def get_popular_followings(user_id: int) -> select:
+    """
+    Функция для получения ID авторов, на которых подписан пользователь
+    и чьи твиты не раскладываются по лентам подписчиков.
+    """
+
+    return (
+        select(models.Follow.following_user_id)
+        .join(models.User, models.User.id == models.Follow.following_user_id)
+        .where(
+            models.Follow.follower_user_id == user_id,
+            models.User.follower_count > settings.TIMELINE_FANOUT_THRESHOLD,
+        )
+    )
+
+
+def get_followings_filter(user_id: int) -> ColumnElement:
+    """Функция для получения условия выборки твитов подписок и самого пользователя."""
+
+    return or_(
+        models.Tweet.author_id.in_(
+            select(models.Follow.following_user_id).where(
+                models.Follow.follower_user_id == user_id
+            )
+        ),
+        models.Tweet.author_id == user_id,
+    )
+
+
+def get_older_tweets(
+    user_id: int, limit: Optional[int], cursor: Optional[str], timeline: Subquery
+) -> Subquery:
+    """
+    Функция для получения твитов старше самой старой записи ленты.
+
+    Лента хранит не больше TIMELINE_MAX_LENGTH записей, поэтому более старые
+    твиты выбираются по подпискам при чтении. Выборка выполняется, только
+    если страница из ленты неполная, поэтому первые страницы её не затрагивают.
+    """
+
+    oldest = (
+        select(models.TimelineEntry.date_time, models.TimelineEntry.tweet_id)
+        .where(models.TimelineEntry.user_id == user_id)
+        .order_by(models.TimelineEntry.date_time, models.TimelineEntry.tweet_id)
+        .limit(1)
+        .subquery()
+    )
+    oldest_date_time = select(oldest.c.date_time).scalar_subquery()
+    oldest_tweet_id = select(oldest.c.tweet_id).scalar_subquery()
+    query = select(models.Tweet.id).where(
+        get_followings_filter(user_id),
+        or_(
+            models.Tweet.date_time < oldest_date_time,
+            and_(
+                models.Tweet.date_time == oldest_date_time,
+                models.Tweet.id < oldest_tweet_id,
+            ),
+        ),
+    )
+    if limit is not None:
+        page_size = select(func.count()).select_from(timeline).scalar_subquery()
+        query = query.where(page_size <= limit)
+    return paginate_tweets(query, limit, cursor).subquery()
+
+
+def get_timeline_filter(
+    user_id: int, limit: Optional[int], cursor: Optional[str]
+) -> ColumnElement:
+    """
+    Функция для получения условия выборки страницы твитов из материализованной ленты.
+
+    Твиты авторов с большим числом подписчиков не хранятся в лентах
+    и добавляются при чтении. Обе части выбираются с тем же курсором
+    и лимитом, лента - по индексу (user_id, date_time), твиты популярных
+    авторов - по индексу (author_id, date_time), поэтому число читаемых
+    твитов ограничено размером страницы. Твит, попавший в ленту до того,
+    как автор стал популярным, не дублируется. Страницы старше самой
+    старой записи ленты дополняются твитами подписок (fan-out on read).
+    """
+
+    timeline = paginate_tweets(
+        select(models.TimelineEntry.tweet_id).where(
+            models.TimelineEntry.user_id == user_id
+        ),
+        limit,
+        cursor,
+        models.TimelineEntry.date_time,
+        models.TimelineEntry.tweet_id,
+    ).subquery()
+    popular = paginate_tweets(
+        select(models.Tweet.id).where(
+            models.Tweet.author_id.in_(get_popular_followings(user_id))
+        ),
+        limit,
+        cursor,
+    ).subquery()
+    return models.Tweet.id.in_(
+        union(
+            select(timeline.c.tweet_id),
+            select(popular.c.id),
+            select(get_older_tweets(user_id, limit, cursor, timeline).c.id),
+        )
+    )
+
+
+def get_feed_filter(
+    user_id: int, limit: Optional[int], cursor: Optional[str]
+) -> ColumnElement:
+    """
+    Функция для получения условия выборки твитов ленты пользователя.
+
+    При TIMELINE_ENABLED твиты берутся из материализованной ленты, иначе -
+    по подпискам из графа подписок или, если он не загружен, из БД.
+    """
+
+    if settings.TIMELINE_ENABLED:
+        return get_timeline_filter(user_id, limit, cursor)
+
+    authors = follow_graph.get_followings(user_id)
+    if authors is not None:
+        return models.Tweet.author_id.in_([*authors, user_id])
+    return get_followings_filter(user_id)
+
+
+async def trim_timelines(db: AsyncSession, user_ids: select) -> None:
+    """Корутина для удаления из лент записей сверх TIMELINE_MAX_LENGTH."""
+
+    ranked = (
+        select(
+            models.TimelineEntry.id,
+            func.row_number()
+            .over(
+                partition_by=models.TimelineEntry.user_id,
+                order_by=(
+                    models.TimelineEntry.date_time.desc(),
+                    models.TimelineEntry.tweet_id.desc(),
+                ),
+            )
+            .label("position"),
+        )
+        .where(models.TimelineEntry.user_id.in_(user_ids))
+        .subquery()
+    )
+    await db.execute(
+        delete(models.TimelineEntry).where(
+            models.TimelineEntry.id.in_(
+                select(ranked.c.id).where(
+                    ranked.c.position > settings.TIMELINE_MAX_LENGTH
+                )
+            )
+        )
+    )
+
+
+async def push_tweet(
+    db: AsyncSession, tweet_id: int, author_id: int, date_time: datetime
+) -> None:
+    """
+    Корутина для добавления нового твита в ленты автора и его подписчиков.
+
+    Если подписчиков больше TIMELINE_FANOUT_THRESHOLD, твит попадает только
+    в ленту автора, подписчики получают его при чтении ленты. Ленты обрезаются
+    в среднем раз в TIMELINE_TRIM_INTERVAL твитов, поэтому их длина может
+    ненадолго превышать TIMELINE_MAX_LENGTH.
+    """
+
+    await db.execute(
+        insert(models.TimelineEntry).values(
+            user_id=author_id,
+            tweet_id=tweet_id,
+            author_id=author_id,
+            date_time=date_time,
+        )
+    )
+    followers = select(models.Follow.follower_user_id).where(
+        models.Follow.following_user_id == author_id
+    )
+    await db.execute(
+        insert(models.TimelineEntry).from_select(
+            TIMELINE_COLUMNS,
+            select(
+                models.Follow.follower_user_id,
+                literal(tweet_id, Integer),
+                literal(author_id, Integer),
+                literal(date_time, DateTime),
+            ).where(
+                models.Follow.following_user_id == author_id,
+                get_followers_count(author_id).scalar_subquery()
+                <= settings.TIMELINE_FANOUT_THRESHOLD,
+            ),
+        )
+    )
+
+    if tweet_id % settings.TIMELINE_TRIM_INTERVAL == 0:
+        await trim_timelines(
+            db, followers.union(select(literal(author_id, Integer)))  # type: ignore
+        )
+
+
+async def pull_author_tweets(db: AsyncSession, user_id: int, author_id: int) -> None:
+    """Корутина для добавления в ленту пользователя последних твитов нового автора."""
+
+    await db.execute(
+        insert(models.TimelineEntry).from_select(
+            TIMELINE_COLUMNS,
+            select(
+                literal(user_id, Integer),
+                models.Tweet.id,
+                models.Tweet.author_id,
+                models.Tweet.date_time,
+            )
+            .where(
+                models.Tweet.author_id == author_id,
+                get_followers_count(author_id).scalar_subquery()
+                <= settings.TIMELINE_FANOUT_THRESHOLD,
+                ~exists().where(
+                    and_(
+                        models.TimelineEntry.user_id == user_id,
+                        models.TimelineEntry.tweet_id == models.Tweet.id,
+                    )
+                ),
+            )
+            .order_by(models.Tweet.date_time.desc(), models.Tweet.id.desc())
+            .limit(settings.TIMELINE_MAX_LENGTH),
+        )
+    )
+
+
+async def fan_out_author_tweets(db: AsyncSession, author_id: int) -> None:
+    """
+    Корутина для раскладки последних твитов автора по лентам подписчиков.
+
+    Вызывается после отписки: если подписчиков стало ровно
+    TIMELINE_FANOUT_THRESHOLD, автор перестаёт быть популярным и его твиты
+    больше не добавляются при чтении, поэтому твиты, написанные, пока он
+    был популярным, раскладываются по лентам. Число подписчиков в этот
+    момент ограничено порогом.
+    """
+
+    recent = (
+        select(models.Tweet.id, models.Tweet.date_time)
+        .where(models.Tweet.author_id == author_id)
+        .order_by(models.Tweet.date_time.desc(), models.Tweet.id.desc())
+        .limit(settings.TIMELINE_MAX_LENGTH)
+        .subquery()
+    )
+    followers = select(models.Follow.follower_user_id).where(
+        models.Follow.following_user_id == author_id
+    )
+    result = await db.execute(
+        insert(models.TimelineEntry).from_select(
+            TIMELINE_COLUMNS,
+            select(
+                models.Follow.follower_user_id,
+                recent.c.id,
+                literal(author_id, Integer),
+                recent.c.date_time,
+            )
+            .join(recent, true())
+            .where(
+                models.Follow.following_user_id == author_id,
+                get_followers_count(author_id).scalar_subquery()
+                == settings.TIMELINE_FANOUT_THRESHOLD,
+                ~exists().where(
+                    and_(
+                        models.TimelineEntry.user_id == models.Follow.follower_user_id,
+                        models.TimelineEntry.tweet_id == recent.c.id,
+                    )
+                ),
+            ),
+        )
+    )
+    if result.rowcount:
+        await trim_timelines(db, followers)
+
+
+async def remove_tweet(db: AsyncSession, tweet_id: int) -> None:
+    """Корутина для удаления твита из всех лент."""
+
+    await db.execute(
+        delete(models.TimelineEntry).where(models.TimelineEntry.tweet_id == tweet_id)
+    )
+
+
+async def remove_author_tweets(db: AsyncSession, user_id: int, author_id: int) -> None:
+    """Корутина для удаления твитов автора из ленты пользователя."""
+
+    await db.execute(
+        delete(models.TimelineEntry).where(
+            models.TimelineEntry.user_id == user_id,
+            models.TimelineEntry.author_id == author_id,
+        )
+    )
+
+
+async def backfill_timelines(db: AsyncSession, batch_size: int = 500) -> None:
+    """
+    Корутина для заполнения лент по существующим подпискам и твитам.
+
+    Пользователи обрабатываются пачками по batch_size, ленты каждого
+    пользователя пересобираются полностью.
+    """
+
+    last_user_id = 0
+    while True:
+        result = await db.execute(
+            select(models.User.id)
+            .where(models.User.id > last_user_id)
+            .order_by(models.User.id)
+            .limit(batch_size)
+        )
+        user_ids = result.scalars().all()
+        if not user_ids:
+            break
+
+        await db.execute(
+            delete(models.TimelineEntry).where(
+                models.TimelineEntry.user_id.in_(user_ids)
+            )
+        )
+        for user_id in user_ids:
+            followings = select(models.Follow.following_user_id).where(
+                models.Follow.follower_user_id == user_id
+            )
+            await db.execute(
+                insert(models.TimelineEntry).from_select(
+                    TIMELINE_COLUMNS,
+                    select(
+                        literal(user_id, Integer),
+                        models.Tweet.id,
+                        models.Tweet.author_id,
+                        models.Tweet.date_time,
+                    )
+                    .where(
+                        or_(
+                            models.Tweet.author_id == user_id,
+                            models.Tweet.author_id.in_(followings),
+                        )
+                    )
+                    .order_by(models.Tweet.date_time.desc(), models.Tweet.id.desc())
+                    .limit(settings.TIMELINE_MAX_LENGTH),
+                )
+            )
+        await db.commit()
+        last_user_id = user_ids[-1]
+
+
+async def main() -> None:
+    """Корутина для запуска заполнения лент из командной строки."""
+
+    async with async_session() as db:
+        await backfill_timelines(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+import follow_graph
+from database import models
+
+# меняется при изменении формата ответов, чтобы старые ETag стали невалидными
+SCHEMA_VERSION = 1
+CACHE_HEADERS = {"Cache-Control": "no-cache", "Vary": "api-key"}
+
+
+def make_etag(*parts: Any) -> str:
+    """Функция для формирования ETag из составляющих версии ресурса."""
+
+    raw = ":".join(str(part) for part in (SCHEMA_VERSION, *parts))
+    return f'"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Функция для сравнения ETag с заголовком If-None-Match."""
+
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Функция для добавления ETag и заголовков кэширования в ответ."""
+
+    response.headers["ETag"] = etag
+    response.headers.update(CACHE_HEADERS)
+
+
+def not_modified(etag: str) -> Response:
+    """Функция для формирования ответа 304 Not Modified."""
+
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+
+async def bump_content_version(db: AsyncSession, user_ids: Any) -> None:
+    """
+    Корутина для увеличения версии твитов пользователей.
+
+    Вызывается при создании и удалении твита автором. user_ids - список ID
+    или подзапрос.
+    """
+
+    await db.execute(
+        update(models.User)
+        .where(models.User.id.in_(user_ids))
+        .values(content_version=models.User.content_version + 1)
+    )
+
+
+async def bump_tweet_version(db: AsyncSession, tweet_ids: Any) -> None:
+    """
+    Корутина для увеличения версии твитов при изменении их лайков или вложений.
+
+    Версия хранится в самих твитах, а не у их авторов, поэтому лайки
+    популярного автора не обновляют одну и ту же строку users.
+    tweet_ids - список ID или подзапрос.
+    """
+
+    await db.execute(
+        update(models.Tweet)
+        .where(models.Tweet.id.in_(tweet_ids))
+        .values(version=models.Tweet.version + 1)
+    )
+
+
+async def bump_follow_version(db: AsyncSession, user_ids: Any) -> None:
+    """Корутина для увеличения версии подписок и подписчиков пользователей."""
+
+    await db.execute(
+        update(models.User)
+        .where(models.User.id.in_(user_ids))
+        .values(follow_version=models.User.follow_version + 1)
+    )
+
+
+async def get_feed_etag(
+    db: AsyncSession, user_id: int, page: select, *params: Any
+) -> str:
+    """
+    Корутина для получения ETag ленты пользователя.
+
+    Версия ленты складывается из версии подписок пользователя, суммы версий
+    твитов его авторов (создание и удаление твитов) и суммы версий твитов
+    страницы page (лайки и вложения): любое изменение твитов, лайков или
+    подписок меняет её. page - запрос страницы с колонкой Tweet.version.
+    Учитывается только состояние БД, поэтому ETag одинаков во всех процессах.
+    """
+
+    user = aliased(models.User)
+    follow_version = (
+        select(user.follow_version).where(user.id == user_id).scalar_subquery()
+    )
+    page = page.subquery()
+    page_version = select(func.coalesce(func.sum(page.c.version), 0)).scalar_subquery()
+    authors = follow_graph.get_followings(user_id)
+    if authors is None:
+        authors = select(models.Follow.following_user_id).where(
+            models.Follow.follower_user_id == user_id
+        )
+    result = await db.execute(
+        select(
+            follow_version,
+            page_version,
+            func.count(models.User.id),
+            func.coalesce(func.sum(models.User.content_version), 0),
+        ).where(or_(models.User.id == user_id, models.User.id.in_(authors)))
+    )
+    return make_etag("feed", user_id, *result.one(), *params)
+
+
+async def get_profile_etag(
+    db: AsyncSession, user_id: int, *params: Any
+) -> Optional[str]:
+    """
+    Корутина для получения ETag профиля пользователя, None - если его нет.
+
+    Подписки и подписчики меняют follow_version, твиты - счётчик tweet_count.
+    """
+
+    result = await db.execute(
+        select(models.User.follow_version, models.User.tweet_count).where(
+            models.User.id == user_id
+        )
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return make_etag("profile", user_id, *row, *params)